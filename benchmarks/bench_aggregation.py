@@ -0,0 +1,68 @@
+# benchmarks/bench_aggregation.py
+#
+# Mede o tempo de Server.aggregate_parameters em função do número de clientes, do modelo e do
+# número de processos da agregação paralela por fatias (0 = agregação na thread do servidor).
+#
+# Uso: python benchmarks/bench_aggregation.py [--clients 2 8 32] [--models cnn resnet20] [--workers 0 2 4]
+
+import argparse
+import contextlib
+import io
+
+import torch
+
+from bench_utils import time_call, write_results
+from common.federated_net import available_models
+from server.server import Server
+
+# Prepara um servidor com 'num_clients' atualizações aleatórias já recebidas na rodada atual.
+def prepare_server(model_name, num_clients, seed=0, workers=0):
+    server = Server(num_rounds=1, num_clients=num_clients, model_name=model_name, aggregation_workers=workers)
+    generator = torch.Generator().manual_seed(seed)
+    for client_id in range(num_clients):
+        row = server.client_updates[server.client_slot(client_id)]
+        row.copy_(torch.randn(row.shape, generator=generator))
+        server.round_client_parameters[server.current_round][client_id] = row
+        server.round_sample_counts[server.current_round][client_id] = 5000
+    return server
+
+# Uma agregação completa. Na agregação paralela, as linhas são acumuladas ao chegar; aqui todas são
+# submetidas de uma vez, medindo o custo da redução sem a sobreposição com a rede.
+def aggregate_once(server):
+    if server.sharded is not None:
+        for client_id, num_samples in server.round_sample_counts[server.current_round].items():
+            server.sharded.add(server.client_slots[client_id], num_samples)
+    server.aggregate_parameters()
+
+# Executa o benchmark para cada combinação de modelo e número de clientes.
+def run_benchmark(args):
+    results = []
+    for model_name in args.models:
+        for num_clients in args.clients:
+            for workers in args.workers:
+                server = prepare_server(model_name, num_clients, args.seed, workers)
+                # Suprime as mensagens impressas a cada agregação durante a medição.
+                with contextlib.redirect_stdout(io.StringIO()):
+                    timing = time_call(lambda: aggregate_once(server), args.repeat)
+                server.close_aggregation()
+                results.append({'model': model_name, 'num_clients': num_clients, 'workers': workers,
+                                'num_parameters': server.num_parameters, 'aggregate': timing,
+                                'values_per_s': num_clients * server.num_parameters / timing['median_s']})
+                print(f"{model_name} x {num_clients} clientes, {workers} workers: {timing['median_s'] * 1e3:.3f} ms")
+    return results
+
+# Opções de linha de comando do benchmark.
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark da agregação FedAVG no servidor.")
+    parser.add_argument("--models", nargs="+", default=['cnn', 'resnet20'], choices=available_models())
+    parser.add_argument("--clients", nargs="+", type=int, default=[2, 4, 8, 16, 32])
+    parser.add_argument("--workers", nargs="+", type=int, default=[0, 2, 4],
+                        help="Processos da agregação paralela (0 = agregação na thread do servidor).")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: benchmarks/results/).")
+    return parser
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    write_results('aggregation', vars(args), run_benchmark(args), args.output)
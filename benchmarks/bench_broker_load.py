@@ -0,0 +1,183 @@
+# benchmarks/bench_broker_load.py
+#
+# Teste de carga do broker MQTT: N publicadores simulados enviam atualizações no formato dos clientes
+# (common/codec.py, tópico client/updated_parameters/<id>, como Client) para um assinante no papel do
+# servidor. Para cada combinação de tamanho de payload, QoS, janela de mensagens em trânsito por cliente
+# (inflight) e sessão limpa/persistente, mede a latência da publicação até a entrega no assinante e até a
+# confirmação do broker (percentis), a vazão entregue e as mensagens perdidas. Ajuda a escolher QoS 0/1 e
+# a configuração do broker (ex.: max_inflight_messages, max_queued_messages e message_size_limit do
+# mosquitto.conf) com dados.
+#
+# Sem --broker usa o broker em memória, útil apenas para validar o harness: nele QoS, inflight e sessão
+# não têm efeito e não há confirmações.
+#
+# Uso: python benchmarks/bench_broker_load.py --broker localhost --clients 4 16 --qos 0 1 [--payload-kb 256 4096]
+#      [--inflight 20] [--clean-session 1 0] [--messages 5] [--interval 0]
+
+import argparse
+import itertools
+import os
+import threading
+import time
+
+import numpy as np
+import paho.mqtt.client as mqtt
+
+from bench_utils import write_results
+from common.codec import decode_message, encode_parameters
+from inmemory_broker import InMemoryBroker
+
+# Percentis de uma lista de tempos (em segundos), ou None se vazia.
+def latency_stats(samples):
+    if not samples:
+        return None
+    values = np.sort(np.asarray(samples))
+    return {
+        'count': len(values),
+        'p50_s': float(np.percentile(values, 50)),
+        'p90_s': float(np.percentile(values, 90)),
+        'p99_s': float(np.percentile(values, 99)),
+        'max_s': float(values[-1]),
+    }
+
+# Cria e conecta um cliente MQTT (paho, ou do broker em memória). 'on_connect' roda a cada conexão.
+def connect_client(args, broker, client_id, clean_session, inflight, on_connect=None):
+    if broker is not None:
+        client = broker.client(client_id)
+    else:
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id, clean_session=clean_session)
+        # Mensagens QoS > 0 sem confirmação ao mesmo tempo; as demais esperam na fila do cliente.
+        client.max_inflight_messages_set(inflight)
+    connected = threading.Event()
+
+    def handle_connect(c, userdata, flags, reason_code, properties):
+        if on_connect is not None:
+            on_connect(c)
+        connected.set()
+    client.on_connect = handle_connect
+    client.connect(args.broker or "localhost", args.port, 60)
+    client.loop_start()
+    if not connected.wait(args.timeout):
+        raise TimeoutError(f"{client_id} não conectou ao broker em {args.timeout}s")
+    return client
+
+# Encerra um cliente criado por connect_client.
+def close_client(client):
+    client.disconnect()
+    client.loop_stop()
+
+# Executa um cenário: 'num_clients' publicadores enviam 'args.messages' atualizações cada.
+def run_scenario(args, num_clients, payload_kb, qos, inflight, clean_session, run_id):
+    broker = InMemoryBroker() if args.broker is None else None
+    numel = payload_kb * 1024 // 4
+    body = np.random.default_rng(args.seed).standard_normal(numel, dtype=np.float32).data
+    prefix = f"loadtest/{run_id}/"
+    expected = num_clients * args.messages
+
+    # Assinante no papel do servidor: mesmo filtro de tópicos e QoS das atualizações.
+    lock = threading.Lock()
+    sent = {}
+    received = []
+    all_received = threading.Event()
+
+    def on_message(c, userdata, msg):
+        recv_at = time.perf_counter()
+        header, _ = decode_message(msg.payload)
+        client_id = int(msg.topic.rsplit('/', 1)[1])
+        with lock:
+            received.append((recv_at, sent.get((client_id, header['round'])), len(msg.payload)))
+            if len(received) >= expected:
+                all_received.set()
+
+    # Sessão persistente: o ID precisa ser estável durante o cenário (e único entre cenários).
+    subscriber = connect_client(args, broker, f"loadtest-{run_id}-server", clean_session, inflight,
+                                on_connect=lambda c: c.subscribe(f"{prefix}client/updated_parameters/+", qos=qos))
+    subscriber.on_message = on_message
+    publishers = [connect_client(args, broker, f"loadtest-{run_id}-client-{i}", clean_session, inflight)
+                  for i in range(num_clients)]
+    # Instantes de publicação e de confirmação do broker (on_publish) por publicador, indexados pelo mid.
+    publish_times = [dict() for _ in publishers]
+    ack_times = [dict() for _ in publishers]
+    for i, publisher in enumerate(publishers):
+        publisher.on_publish = lambda c, userdata, mid, reason_code, properties, acks=ack_times[i]: acks.__setitem__(mid, time.perf_counter())
+
+    # Todos os publicadores começam juntos, como os clientes ao fim do treino de uma rodada.
+    barrier = threading.Barrier(num_clients)
+
+    def publish_all(i):
+        topic = f"{prefix}client/updated_parameters/{i}"
+        barrier.wait()
+        for seq in range(args.messages):
+            payload = encode_parameters(body, round=seq, num_samples=1, sent_at=time.time())
+            start = time.perf_counter()
+            with lock:
+                sent[(i, seq)] = start
+            info = publishers[i].publish(topic, payload, qos=qos)
+            if getattr(info, 'mid', None) is not None:
+                publish_times[i][info.mid] = start
+            if args.interval:
+                time.sleep(args.interval)
+
+    threads = [threading.Thread(target=publish_all, args=(i,), daemon=True) for i in range(num_clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    all_received.wait(args.timeout)
+
+    for client in publishers + [subscriber]:
+        close_client(client)
+
+    with lock:
+        delivered = [r for r in received if r[1] is not None]
+    start = min(sent.values())
+    elapsed = max(r[0] for r in delivered) - start if delivered else None
+    delivered_bytes = sum(r[2] for r in delivered)
+    acks = [ack_times[i][mid] - t for i in range(num_clients) for mid, t in publish_times[i].items() if mid in ack_times[i]]
+    return {
+        'num_clients': num_clients, 'payload_kb': payload_kb, 'qos': qos, 'inflight': inflight,
+        'clean_session': bool(clean_session),
+        'messages_sent': len(sent), 'messages_delivered': len(delivered), 'messages_lost': expected - len(delivered),
+        'delivery_latency': latency_stats([r[0] - r[1] for r in delivered]),
+        'publish_ack_latency': latency_stats(acks),
+        'messages_per_s': len(delivered) / elapsed if elapsed else None,
+        'megabytes_per_s': delivered_bytes / 2**20 / elapsed if elapsed else None,
+        'duration_s': elapsed,
+    }
+
+# Executa todas as combinações de parâmetros.
+def run_benchmark(args):
+    results = []
+    scenarios = itertools.product(args.payload_kb, args.qos, args.inflight, args.clean_session, args.clients)
+    for run, (payload_kb, qos, inflight, clean_session, num_clients) in enumerate(scenarios):
+        result = run_scenario(args, num_clients, payload_kb, qos, inflight, clean_session, f"{os.getpid()}-{run}")
+        results.append(result)
+        latency = result['delivery_latency']
+        print(f"{num_clients} clientes, {payload_kb} KB, QoS {qos}, inflight {inflight}, "
+              f"sessão {'limpa' if clean_session else 'persistente'}: "
+              f"{result['messages_delivered']}/{result['messages_sent']} entregues | "
+              + (f"latência p50 {latency['p50_s'] * 1e3:.1f} ms, p99 {latency['p99_s'] * 1e3:.1f} ms | "
+                 f"{result['messages_per_s']:.1f} msg/s, {result['megabytes_per_s']:.1f} MB/s" if latency else "sem entregas"))
+    return results
+
+# Opções de linha de comando do benchmark.
+def build_parser():
+    parser = argparse.ArgumentParser(description="Teste de carga do broker MQTT com atualizações no formato dos clientes.")
+    parser.add_argument("--broker", default=None, help="Endereço do broker (padrão: broker em memória).")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--clients", nargs="+", type=int, default=[4, 16], help="Números de publicadores simultâneos.")
+    parser.add_argument("--payload-kb", nargs="+", type=int, default=[256, 4096], help="Tamanhos do modelo plano enviado (KB).")
+    parser.add_argument("--qos", nargs="+", type=int, choices=[0, 1, 2], default=[0, 1])
+    parser.add_argument("--inflight", nargs="+", type=int, default=[20], help="Mensagens QoS > 0 em trânsito por cliente.")
+    parser.add_argument("--clean-session", nargs="+", type=int, choices=[0, 1], default=[1],
+                        help="1: sessão limpa; 0: sessão persistente no broker.")
+    parser.add_argument("--messages", type=int, default=5, help="Atualizações enviadas por publicador.")
+    parser.add_argument("--interval", type=float, default=0.0, help="Pausa entre as atualizações de um publicador (s).")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Espera máxima pelas entregas de um cenário (s).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: benchmarks/results/).")
+    return parser
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    write_results('broker_load', vars(args), run_benchmark(args), args.output)
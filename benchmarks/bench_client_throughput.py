@@ -0,0 +1,58 @@
+# benchmarks/bench_client_throughput.py
+#
+# Mede a vazão do treinamento local (amostras/s por época) de Client.train em um dataset
+# sintético reprodutível, para cada modelo e configuração de aceleração.
+#
+# Uso: python benchmarks/bench_client_throughput.py [--models cnn] [--samples 2048] [--compile] [--bf16] [--no-augment]
+
+import argparse
+import time
+
+import torch
+
+from bench_utils import load_client_module, synthetic_dataset, write_results
+from common.federated_net import available_models
+
+# Executa o benchmark para cada modelo.
+def run_benchmark(args):
+    client_module = load_client_module()
+    dataset = synthetic_dataset(args.samples, seed=args.seed)
+    results = []
+    for model_name in args.models:
+        client = client_module.Client(client_id=0, epochs=1, model_name=model_name, dataset=dataset,
+                                      compile_model=args.compile, channels_last=args.channels_last,
+                                      cpu_budget=args.cpu_budget, mixed_precision=args.bf16,
+                                      augment=not args.no_augment)
+        torch.manual_seed(args.seed)
+        parameters = bytes(client.net.export_flat())
+        # Época de aquecimento (inclui a compilação, quando ativa).
+        client.train(parameters)
+        epochs = []
+        for _ in range(args.epochs):
+            start = time.perf_counter()
+            client.train(parameters)
+            epochs.append(time.perf_counter() - start)
+        best = min(epochs)
+        results.append({'model': model_name, 'samples': args.samples, 'epoch_s': best,
+                        'samples_per_s': args.samples / best})
+        print(f"{model_name}: {args.samples / best:.1f} amostras/s ({best:.2f}s por época)")
+    return results
+
+# Opções de linha de comando do benchmark.
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark de vazão do treinamento local.")
+    parser.add_argument("--models", nargs="+", default=['cnn'], choices=available_models())
+    parser.add_argument("--samples", type=int, default=2048)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--compile", action="store_true")
+    parser.add_argument("--channels-last", action="store_true")
+    parser.add_argument("--bf16", action="store_true")
+    parser.add_argument("--no-augment", action="store_true", help="Sem recorte/espelhamento (mede o custo do aumento de dados).")
+    parser.add_argument("--cpu-budget", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: benchmarks/results/).")
+    return parser
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    write_results('client_throughput', vars(args), run_benchmark(args), args.output)
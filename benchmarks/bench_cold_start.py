@@ -0,0 +1,82 @@
+# benchmarks/bench_cold_start.py
+#
+# Mede a inicialização a frio de cada ponto de entrada: um processo Python novo que apenas importa o
+# módulo, como ao iniciar muitos clientes simulados de curta duração. Registra o tempo total do processo,
+# o tempo do import, se o torchvision foi carregado (só deveria ser na distribuição do dataset e na
+# avaliação) e os pacotes de import mais lento (python -X importtime).
+#
+# Uso: python benchmarks/bench_cold_start.py [--modules clients.client server.server] [--repeat 5]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from bench_utils import ROOT_DIR, write_results
+
+# Pontos de entrada medidos por padrão.
+DEFAULT_MODULES = ['clients.client', 'server.server', 'server.edge_aggregator', 'clients.launcher',
+                   'server.evaluate_global_model']
+
+# Ambiente dos processos medidos: os pacotes do projeto importáveis a partir da raiz.
+def child_env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT_DIR, env.get('PYTHONPATH')]))
+    return env
+
+# Importa 'module' em um processo novo. Retorna (tempo do processo, tempo do import, torchvision carregado).
+def cold_import(module):
+    code = (f"import sys, time; start = time.perf_counter(); import {module}; "
+            f"print(time.perf_counter() - start, 'torchvision' in sys.modules)")
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, env=child_env(),
+                            capture_output=True, text=True, check=True)
+    process_s = time.perf_counter() - start
+    import_s, torchvision = result.stdout.split()[-2:]
+    return process_s, float(import_s), torchvision == 'True'
+
+# Pacotes de primeiro nível com maior tempo cumulativo de import (em segundos).
+def slowest_imports(module, top=5):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], cwd=ROOT_DIR,
+                            env=child_env(), capture_output=True, text=True, check=True)
+    packages = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Apenas imports de primeiro nível (sem indentação).
+        if not name.startswith('  '):
+            packages.append({'package': name.strip(), 'cumulative_s': int(cumulative) / 1e6})
+    return sorted(packages, key=lambda p: p['cumulative_s'], reverse=True)[:top]
+
+# Executa o benchmark para cada módulo.
+def run_benchmark(args):
+    results = []
+    for module in args.modules:
+        try:
+            samples = [cold_import(module) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError as e:
+            print(f"{module}: falha no import: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+            results.append({'module': module, 'skipped': True})
+            continue
+        process_s = statistics.median(s[0] for s in samples)
+        import_s = statistics.median(s[1] for s in samples)
+        results.append({'module': module, 'process_s': process_s, 'import_s': import_s,
+                        'torchvision_loaded': samples[0][2], 'slowest_imports': slowest_imports(module)})
+        print(f"{module}: processo {process_s * 1e3:.0f} ms | import {import_s * 1e3:.0f} ms | "
+              f"torchvision {'sim' if samples[0][2] else 'não'}")
+    return results
+
+# Opções de linha de comando do benchmark.
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark do tempo de inicialização a frio dos pontos de entrada.")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: benchmarks/results/).")
+    return parser
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    write_results('cold_start', vars(args), run_benchmark(args), args.output)
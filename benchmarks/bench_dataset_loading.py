@@ -0,0 +1,48 @@
+# benchmarks/bench_dataset_loading.py
+#
+# Mede o carregamento do shard de cada cliente (como em Client.load_data) e uma passada completa
+# pelo DataLoader sem treinamento. Requer os shards gerados por clients/distribute_cifar10.py.
+#
+# Uso: python benchmarks/bench_dataset_loading.py [--client-ids 0 1 2]
+
+import argparse
+import os
+import time
+
+from torch.utils.data import DataLoader
+
+from bench_utils import ROOT_DIR, write_results
+from clients.distribute_cifar10 import load_shard
+
+# Executa o benchmark para cada cliente com shard disponível.
+def run_benchmark(args):
+    results = []
+    for client_id in args.client_ids:
+        data_path = os.path.join(ROOT_DIR, 'clients', f'client_{client_id}', 'data', f'cifar10_client_{client_id}.pkl')
+        if not os.path.exists(data_path):
+            print(f"Cliente {client_id}: shard não encontrado em {data_path}; ignorado.")
+            results.append({'client_id': client_id, 'skipped': True})
+            continue
+        start = time.perf_counter()
+        dataset = load_shard(data_path)
+        load_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in DataLoader(dataset, batch_size=64, shuffle=True):
+            pass
+        iterate_s = time.perf_counter() - start
+        results.append({'client_id': client_id, 'samples': len(dataset), 'file_bytes': os.path.getsize(data_path),
+                        'load_s': load_s, 'iterate_epoch_s': iterate_s, 'samples_per_s': len(dataset) / iterate_s})
+        print(f"Cliente {client_id}: carga {load_s:.2f}s | época sem treino {iterate_s:.2f}s")
+    return results
+
+# Opções de linha de comando do benchmark.
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark de carregamento dos datasets dos clientes.")
+    parser.add_argument("--client-ids", nargs="+", type=int, default=[0])
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: benchmarks/results/).")
+    return parser
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    write_results('dataset_loading', vars(args), run_benchmark(args), args.output)
@@ -0,0 +1,97 @@
+# benchmarks/bench_end_to_end.py
+#
+# Execução ponta a ponta do pipeline federado (Server + N Clients) em um único processo,
+# com dados sintéticos reprodutíveis. Usa o broker em memória por padrão ou um broker
+# MQTT real com --broker. Com --edges N, os clientes são divididos entre N agregadores de borda
+# (topologia hierárquica) e o servidor raiz recebe uma atualização por borda.
+#
+# Uso: python benchmarks/bench_end_to_end.py --clients 3 --rounds 3 --model cnn [--edges 2] [--broker localhost]
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import torch
+
+from bench_utils import load_client_module, synthetic_dataset, write_results
+from server.edge_aggregator import EdgeAggregator, edge_topic_prefix
+from common.federated_net import available_models
+from inmemory_broker import InMemoryBroker
+from server.server import Server
+
+# Executa um cenário completo e retorna as métricas.
+def run_benchmark(args):
+    client_module = load_client_module()
+    broker = InMemoryBroker() if args.broker is None else None
+
+    # Cliente MQTT do broker em memória, ou None para que Server/Client criem um cliente paho real.
+    def mqtt_client(name):
+        return broker.client(name) if broker is not None else None
+
+    broker_address = args.broker or "localhost"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        torch.manual_seed(args.seed)
+        # Sem bordas, os clientes falam direto com o servidor raiz; com bordas, a raiz espera uma por borda
+        # e o cliente i pertence à borda i % edges.
+        server = Server(num_rounds=args.rounds, num_clients=args.edges or args.clients, broker_address=broker_address,
+                        broker_port=args.port, model_name=args.model, mqtt_client=mqtt_client("server"),
+                        output_path=os.path.join(tmp_dir, "global_parameters.pkl"))
+        edges = [EdgeAggregator(edge_id=e, client_ids=range(e, args.clients, args.edges),
+                                broker_address=broker_address, broker_port=args.port, model_name=args.model,
+                                mqtt_client=mqtt_client(f"edge_{e}"), upstream_mqtt_client=mqtt_client(f"edge_{e}_upstream"))
+                 for e in range(args.edges)]
+        clients = [client_module.Client(client_id=i, broker_address=broker_address, broker_port=args.port,
+                                        epochs=args.epochs, model_name=args.model,
+                                        dataset=synthetic_dataset(args.samples_per_client, seed=args.seed + i),
+                                        mqtt_client=mqtt_client(f"client_{i}"),
+                                        topic_prefix=edge_topic_prefix(i % args.edges) if args.edges else "")
+                   for i in range(args.clients)]
+
+        client_threads = [threading.Thread(target=c.start, daemon=True) for c in edges + clients]
+        server_thread = threading.Thread(target=server.start, daemon=True)
+        start = time.perf_counter()
+        server_thread.start()
+        for thread in client_threads:
+            thread.start()
+        server_thread.join(args.timeout)
+        total_s = time.perf_counter() - start
+        completed = server.current_round >= args.rounds
+        for thread in client_threads:
+            thread.join(5)
+
+    rounds = list(server.round_metrics)
+    results = {
+        'completed': completed,
+        'total_s': total_s,
+        'rounds': rounds,
+        'mean_round_s': statistics.fmean(r['round_duration'] for r in rounds) if rounds else None,
+        'mean_aggregation_s': statistics.fmean(r['aggregation_time'] for r in rounds) if rounds else None,
+        'samples_per_s': args.clients * args.samples_per_client * args.epochs * len(rounds) / total_s,
+    }
+    if broker is not None:
+        results['broker'] = broker.stats()
+    print(f"Concluído: {completed} | total {total_s:.2f}s | rodada média {results['mean_round_s']}")
+    return results
+
+# Opções de linha de comando do benchmark.
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta do aprendizado federado.")
+    parser.add_argument("--clients", type=int, default=3)
+    parser.add_argument("--edges", type=int, default=0, help="Número de agregadores de borda (0 = topologia plana).")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--model", default="cnn", choices=available_models())
+    parser.add_argument("--samples-per-client", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--broker", default=None, help="Endereço de um broker MQTT real (padrão: broker em memória).")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--timeout", type=float, default=3600, help="Tempo máximo de execução (segundos).")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: benchmarks/results/).")
+    return parser
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    write_results('end_to_end', vars(args), run_benchmark(args), args.output)
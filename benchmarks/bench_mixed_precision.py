@@ -0,0 +1,80 @@
+# benchmarks/bench_mixed_precision.py
+#
+# Compara o treinamento local em float32 e em precisão mista bfloat16 no mesmo shard:
+# tempo por época e acurácia final, partindo dos mesmos pesos iniciais e da mesma semente.
+#
+# Uso: python benchmarks/bench_mixed_precision.py --client-id 0 --epochs 3 [--model cnn]
+
+import argparse
+import time
+
+import torch
+from torch.utils.data import DataLoader
+
+from bench_utils import load_client_module, write_results
+from common.augmentation import BatchAugmenter
+
+# Acurácia (%) do modelo no dataset, em float32 e sem gradientes (com a normalização do treino).
+def evaluate(net, dataset):
+    net.eval()
+    normalize = BatchAugmenter().normalize
+    correct = 0
+    total = 0
+    with torch.inference_mode():
+        for inputs, labels in DataLoader(dataset, batch_size=256):
+            correct += (net(normalize(inputs)).argmax(1) == labels).sum().item()
+            total += labels.size(0)
+    return 100 * correct / total
+
+# Treina por 'epochs' épocas com a precisão escolhida e mede cada época separadamente.
+def run(client_module, args, initial_parameters, mixed_precision):
+    client = client_module.Client(client_id=args.client_id, epochs=1, model_name=args.model,
+                                  cpu_budget=args.cpu_budget, mixed_precision=mixed_precision)
+    torch.manual_seed(args.seed)
+    parameters = initial_parameters
+    epochs = []
+    for epoch in range(args.epochs):
+        start = time.perf_counter()
+        updated, loss = client.train(parameters)
+        elapsed = time.perf_counter() - start
+        # Copia o modelo atualizado: a próxima chamada de train() sobrescreve o buffer plano.
+        parameters = bytes(updated)
+        epochs.append({'epoch': epoch, 'epoch_s': elapsed, 'samples_per_s': len(client.dataset) / elapsed,
+                       'train_loss': loss})
+        print(f"{'bf16' if mixed_precision else 'fp32'} época {epoch}: {elapsed:.2f}s, perda {loss:.4f}")
+    client.net.load_flat(parameters)
+    # Acurácia no conjunto de validação local do cliente, se houver; senão, no próprio shard.
+    local = client.evaluate()
+    return {'precision': 'bf16' if mixed_precision else 'fp32', 'epochs': epochs,
+            'mean_epoch_s': sum(e['epoch_s'] for e in epochs) / len(epochs),
+            'final_accuracy': local['accuracy'] if local is not None else evaluate(client.net, client.dataset)}
+
+# Executa as duas precisões e retorna os resultados.
+def run_benchmark(args):
+    # O cliente localiza o shard de dados pelo seu ID (args.client_id).
+    client_module = load_client_module()
+    # Pesos iniciais comuns às duas execuções.
+    torch.manual_seed(args.seed)
+    initial_parameters = bytes(client_module.build_model(args.model).export_flat())
+
+    fp32 = run(client_module, args, initial_parameters, mixed_precision=False)
+    bf16 = run(client_module, args, initial_parameters, mixed_precision=True)
+    print(f"Speedup bf16: {fp32['mean_epoch_s'] / bf16['mean_epoch_s']:.2f}x | "
+          f"acurácia final fp32 {fp32['final_accuracy']:.2f}% x bf16 {bf16['final_accuracy']:.2f}%")
+    return {'fp32': fp32, 'bf16': bf16}
+
+# Opções de linha de comando do benchmark.
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark fp32 x bf16 no treinamento local de um cliente.")
+    parser.add_argument("--client-id", type=int, default=0)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--model", default="cnn")
+    parser.add_argument("--cpu-budget", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: benchmarks/results/).")
+    return parser
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+
+    write_results('mixed_precision', vars(args), run_benchmark(args), args.output)
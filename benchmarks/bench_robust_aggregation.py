@@ -0,0 +1,56 @@
+# benchmarks/bench_robust_aggregation.py
+#
+# Compara o custo das regras de agregação robustas (mediana, média aparada e Multi-Krum) com o
+# FedAvg em função do número de clientes, sobre uma matriz [clientes x parâmetros] aleatória do
+# tamanho do modelo escolhido.
+#
+# Uso: python benchmarks/bench_robust_aggregation.py [--clients 4 16 64] [--model resnet20] [--chunk-size 65536]
+
+import argparse
+
+import torch
+
+from common.aggregation import AGGREGATORS, DEFAULT_CHUNK_SIZE, aggregate, available_aggregators
+from bench_utils import time_call, write_results
+from common.federated_net import available_models, build_model
+
+# Executa o benchmark para cada combinação de regra e número de clientes.
+def run_benchmark(args):
+    num_parameters = build_model(args.model).num_tracked_values()
+    generator = torch.Generator().manual_seed(args.seed)
+    out = torch.zeros(num_parameters)
+    results = []
+    for num_clients in args.clients:
+        updates = torch.randn(num_clients, num_parameters, generator=generator)
+        weights = torch.ones(num_clients)
+        for name in args.aggregators:
+            # Apenas as regras robustas usam blocos de colunas.
+            options = {} if name == 'fedavg' else {'chunk_size': args.chunk_size}
+            try:
+                # Os pesos são normalizados no lugar pelas regras; cada execução recebe uma cópia.
+                timing = time_call(lambda: aggregate(name, updates, weights.clone(), out, **options), args.repeat)
+            except ValueError as e:
+                # Ex.: Krum com poucos clientes.
+                print(f"{name} x {num_clients} clientes: {e}")
+                continue
+            results.append({'aggregator': name, 'num_clients': num_clients, 'num_parameters': num_parameters,
+                            'aggregate': timing,
+                            'values_per_s': num_clients * num_parameters / timing['median_s']})
+            print(f"{name} x {num_clients} clientes: {timing['median_s'] * 1e3:.3f} ms")
+    return results
+
+# Opções de linha de comando do benchmark.
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark das regras de agregação robustas x FedAvg.")
+    parser.add_argument("--aggregators", nargs="+", default=available_aggregators(), choices=sorted(AGGREGATORS))
+    parser.add_argument("--clients", nargs="+", type=int, default=[4, 8, 16, 32])
+    parser.add_argument("--model", default="cnn", choices=available_models())
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Colunas por bloco nas regras robustas.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: benchmarks/results/).")
+    return parser
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    write_results('robust_aggregation', vars(args), run_benchmark(args), args.output)
@@ -0,0 +1,103 @@
+# benchmarks/bench_secure_aggregation.py
+#
+# Custo da agregação segura (common/secure_aggregation.py) em relação ao FedAvg simples, por rodada, com
+# clientes simulados no mesmo processo (sem broker): CPU do cliente (ponto fixo + máscaras), CPU do
+# servidor (soma, remoção das máscaras de quem saiu e decodificação), bytes enviados e o erro do ponto fixo.
+# O acordo de chaves (uma vez por par e por sessão) é medido à parte.
+#
+# Uso: python benchmarks/bench_secure_aggregation.py [--clients 4 8 16] [--num-parameters 1000000] [--dropouts 1]
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from bench_utils import time_call, write_results
+from common.codec import encode_masked_update, encode_parameters
+from common.secure_aggregation import DEFAULT_SCALE, PairwiseMasker, decode_fixed_point, remove_masks
+
+# Executa uma rodada simulada para cada número de clientes.
+def run_benchmark(args):
+    rng = np.random.default_rng(args.seed)
+    results = []
+    for num_clients in args.clients:
+        updates = rng.standard_normal((num_clients, args.num_parameters), dtype=np.float32) * 0.05
+        samples = rng.integers(500, 5000, num_clients)
+        weights = samples / samples.sum()
+        # Os últimos 'dropouts' clientes saem depois de receber o modelo.
+        survivors = list(range(num_clients - min(args.dropouts, num_clients - 2)))
+        dropped = [c for c in range(num_clients) if c not in survivors]
+
+        # Acordo de chaves: geração do par de chaves e derivação dos segredos com todos os pares.
+        start = time.perf_counter()
+        maskers = [PairwiseMasker(c) for c in range(num_clients)]
+        public_keys = {str(c): m.public_key_hex for c, m in enumerate(maskers)}
+        for masker in maskers:
+            masker.pair_seeds(public_keys, 0)
+        key_agreement_s = (time.perf_counter() - start) / num_clients
+        secure_header = {'public_keys': public_keys, 'weights': {str(c): w for c, w in enumerate(weights)},
+                         'scale': DEFAULT_SCALE}
+
+        # FedAvg simples: o cliente serializa o modelo plano e o servidor faz a média ponderada.
+        plain_client = time_call(lambda: encode_parameters(updates[0], round=0, num_samples=int(samples[0])), args.repeat)
+        plain_payload = len(encode_parameters(updates[0], round=0, num_samples=int(samples[0])))
+        plain_server = time_call(lambda: weights[survivors] @ updates[survivors] / weights[survivors].sum(), args.repeat)
+        reference = (weights[survivors] @ updates[survivors] / weights[survivors].sum()).astype(np.float32)
+
+        # Agregação segura: o cliente mascara e serializa; o servidor soma, desmascara e decodifica.
+        def mask_client():
+            masked = maskers[0].mask(updates[0], weights[0], DEFAULT_SCALE, public_keys, 1)
+            return encode_masked_update(masked, DEFAULT_SCALE, round=1, num_samples=int(samples[0]))
+        secure_client = time_call(mask_client, args.repeat)
+        masked = [maskers[c].mask(updates[c], weights[c], DEFAULT_SCALE, public_keys, 1).copy() for c in survivors]
+        secure_payload = len(encode_masked_update(masked[0], DEFAULT_SCALE, round=1, num_samples=int(samples[0])))
+        revealed = {c: {int(d): bytes.fromhex(seed) for d, seed in maskers[c].reveal(1, dropped).items()} for c in survivors}
+        out = np.empty(args.num_parameters, dtype=np.float32)
+
+        def aggregate_secure():
+            total = np.zeros(args.num_parameters, dtype=np.uint32)
+            for row in masked:
+                total += row
+            remove_masks(total, revealed)
+            decode_fixed_point(total, DEFAULT_SCALE, out)
+            np.divide(out, weights[survivors].sum(), out=out, casting="same_kind")
+            return out
+        secure_server = time_call(aggregate_secure, args.repeat)
+        max_error = float(np.abs(aggregate_secure() - reference).max())
+
+        # Bytes extras do modelo enviado pelo servidor (cabeçalho com chaves e pesos) e das sementes reveladas.
+        header_bytes = len(json.dumps(secure_header, separators=(',', ':')))
+        seeds_bytes = sum(len(json.dumps({'round': 1, 'seeds': maskers[c].reveal(1, dropped)})) for c in survivors) if dropped else 0
+        result = {
+            'num_clients': num_clients, 'num_parameters': args.num_parameters, 'dropouts': len(dropped),
+            'key_agreement_per_client_s': key_agreement_s,
+            'plain_client': plain_client, 'secure_client': secure_client,
+            'plain_server': plain_server, 'secure_server': secure_server,
+            'client_overhead_s': secure_client['median_s'] - plain_client['median_s'],
+            'server_overhead_s': secure_server['median_s'] - plain_server['median_s'],
+            'plain_upload_bytes': plain_payload, 'secure_upload_bytes': secure_payload,
+            'secure_header_bytes': header_bytes, 'unmask_bytes': seeds_bytes,
+            'max_abs_error': max_error,
+        }
+        results.append(result)
+        print(f"{num_clients} clientes ({len(dropped)} saíram): cliente {plain_client['median_s'] * 1e3:.1f} -> "
+              f"{secure_client['median_s'] * 1e3:.1f} ms | servidor {plain_server['median_s'] * 1e3:.1f} -> "
+              f"{secure_server['median_s'] * 1e3:.1f} ms | upload {plain_payload / 1024:.1f} -> {secure_payload / 1024:.1f} KB | "
+              f"cabeçalho +{header_bytes / 1024:.1f} KB | chaves {key_agreement_s * 1e3:.0f} ms/cliente | erro {max_error:.2e}")
+    return results
+
+# Opções de linha de comando do benchmark.
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark da agregação segura x FedAvg simples.")
+    parser.add_argument("--clients", nargs="+", type=int, default=[4, 8, 16])
+    parser.add_argument("--num-parameters", type=int, default=1_000_000, help="Tamanho do modelo plano simulado.")
+    parser.add_argument("--dropouts", type=int, default=1, help="Clientes que saem antes de enviar a atualização.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: benchmarks/results/).")
+    return parser
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    write_results('secure_aggregation', vars(args), run_benchmark(args), args.output)
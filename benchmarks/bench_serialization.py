@@ -0,0 +1,57 @@
+# benchmarks/bench_serialization.py
+#
+# Mede o custo de (de)serialização dos parâmetros para cada modelo do registro:
+# codec binário (buffer plano) e, como referência, pickle do dicionário de tensores.
+#
+# Uso: python benchmarks/bench_serialization.py [--models cnn resnet20] [--repeat 20]
+
+import argparse
+import pickle
+
+from bench_utils import time_call, write_results
+from common.federated_net import build_model, available_models
+from common.codec import encode_parameters, decode_parameters
+
+# Mede codificação/decodificação de um modelo.
+def bench_model(model_name, repeat):
+    net = build_model(model_name)
+    payload = encode_parameters(net.export_flat(), round=0)
+    # Referência: formato antigo (pickle de um dicionário com cópias dos tensores).
+    snapshot = {name: tensor.clone() for name, tensor in net.get_parameters().items()}
+    pickled = pickle.dumps(snapshot)
+
+    def decode_and_load():
+        _, body = decode_parameters(payload)
+        net.load_flat(body)
+
+    return {
+        'num_parameters': net.num_tracked_values(),
+        'payload_bytes': len(payload),
+        'pickle_bytes': len(pickled),
+        'encode': time_call(lambda: encode_parameters(net.export_flat(), round=0), repeat),
+        'decode_load': time_call(decode_and_load, repeat),
+        'pickle_dumps': time_call(lambda: pickle.dumps(snapshot), repeat),
+        'pickle_loads_apply': time_call(lambda: net.apply_parameters(pickle.loads(pickled)), repeat),
+    }
+
+# Executa o benchmark para todos os modelos pedidos.
+def run_benchmark(args):
+    results = {}
+    for model_name in args.models:
+        results[model_name] = bench_model(model_name, args.repeat)
+        r = results[model_name]
+        print(f"{model_name}: {r['payload_bytes'] / 1024:.1f} KB | encode {r['encode']['median_s'] * 1e3:.3f} ms | "
+              f"decode+load {r['decode_load']['median_s'] * 1e3:.3f} ms | pickle {r['pickle_dumps']['median_s'] * 1e3:.3f} ms")
+    return results
+
+# Opções de linha de comando do benchmark.
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark de (de)serialização dos parâmetros.")
+    parser.add_argument("--models", nargs="+", default=available_models(), choices=available_models())
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: benchmarks/results/).")
+    return parser
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    write_results('serialization', vars(args), run_benchmark(args), args.output)
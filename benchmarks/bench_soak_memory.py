@@ -0,0 +1,99 @@
+# benchmarks/bench_soak_memory.py
+#
+# Teste de resistência (soak) da memória: muitas rodadas curtas com servidor e clientes no mesmo processo
+# (broker em memória, dados sintéticos pequenos) e a telemetria de memória registrada pelo servidor a cada
+# rodada (common/memory.py). Depois do aquecimento, a RSS e o número de tensores vivos devem ficar estáveis;
+# o benchmark ajusta uma reta a cada série e reporta o crescimento por 100 rodadas. Sai com código 1 se a
+# RSS crescer mais que --max-growth-mb por 100 rodadas.
+#
+# Uso: python benchmarks/bench_soak_memory.py [--rounds 200] [--clients 4] [--model cnn] [--max-growth-mb 5]
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import torch
+
+from bench_utils import load_client_module, synthetic_dataset, write_results
+from common.federated_net import available_models
+from inmemory_broker import InMemoryBroker
+from server.server import Server
+
+# Inclinação (por rodada) da reta ajustada aos valores de 'series' (None com menos de dois pontos).
+def slope(series):
+    if len(series) < 2:
+        return None
+    return float(np.polyfit(np.arange(len(series)), series, 1)[0])
+
+# Executa o treinamento longo e analisa a memória registrada a cada rodada.
+def run_benchmark(args):
+    client_module = load_client_module()
+    broker = InMemoryBroker()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        torch.manual_seed(args.seed)
+        server = Server(num_rounds=args.rounds, num_clients=args.clients, model_name=args.model,
+                        mqtt_client=broker.client("server"), output_path=os.path.join(tmp_dir, "global_parameters.pkl"),
+                        metrics_history=args.rounds, memory_census_interval=1)
+        clients = [client_module.Client(client_id=i, epochs=1, model_name=args.model,
+                                        dataset=synthetic_dataset(args.samples_per_client, seed=args.seed + i),
+                                        mqtt_client=broker.client(f"client_{i}"))
+                   for i in range(args.clients)]
+        threads = [threading.Thread(target=c.start, daemon=True) for c in clients]
+        server_thread = threading.Thread(target=server.start, daemon=True)
+        start = time.perf_counter()
+        server_thread.start()
+        for thread in threads:
+            thread.start()
+        server_thread.join(args.timeout)
+        total_s = time.perf_counter() - start
+        for thread in threads:
+            thread.join(5)
+
+    rounds = list(server.round_metrics)
+    # Descarta as rodadas de aquecimento (alocações iniciais, caches do PyTorch e do alocador).
+    steady = rounds[min(args.warmup, max(0, len(rounds) - 2)):]
+    # O servidor faz o censo dos tensores em todas as rodadas (memory_census_interval=1); a RSS pode faltar
+    # em plataformas que não a informam.
+    rss = [r['memory']['rss_mb'] for r in steady if r['memory']['rss_mb'] is not None]
+    tensors = [r['memory']['tensors'] for r in steady]
+    rss_slope = slope(rss)
+    tensor_slope = slope(tensors)
+    result = {
+        'completed': server.current_round >= args.rounds,
+        'rounds': len(rounds),
+        'total_s': total_s,
+        'rss_mb': [r['memory']['rss_mb'] for r in rounds],
+        'tensors': [r['memory']['tensors'] for r in rounds],
+        'rss_growth_mb_per_100_rounds': rss_slope * 100 if rss_slope is not None else None,
+        'tensor_growth_per_100_rounds': tensor_slope * 100 if tensor_slope is not None else None,
+    }
+    result['flat'] = result['rss_growth_mb_per_100_rounds'] is not None and result['rss_growth_mb_per_100_rounds'] <= args.max_growth_mb
+    if rss:
+        print(f"{len(rounds)} rodadas em {total_s:.1f}s | RSS {rss[0]:.1f} -> {rss[-1]:.1f} MB "
+              f"({result['rss_growth_mb_per_100_rounds']:+.2f} MB/100 rodadas) | tensores {tensors[0]} -> {tensors[-1]} "
+              f"({result['tensor_growth_per_100_rounds']:+.1f}/100 rodadas) | {'estável' if result['flat'] else 'CRESCENDO'}")
+    return result
+
+# Opções de linha de comando do benchmark.
+def build_parser():
+    parser = argparse.ArgumentParser(description="Teste de resistência da memória do servidor em muitas rodadas.")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--model", default="cnn", choices=available_models())
+    parser.add_argument("--samples-per-client", type=int, default=64)
+    parser.add_argument("--warmup", type=int, default=20, help="Rodadas iniciais ignoradas na análise.")
+    parser.add_argument("--max-growth-mb", type=float, default=5.0, help="Crescimento máximo aceito da RSS por 100 rodadas.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=3600, help="Tempo máximo de execução (segundos).")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: benchmarks/results/).")
+    return parser
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    result = run_benchmark(args)
+    write_results('soak_memory', vars(args), result, args.output)
+    sys.exit(0 if result['flat'] else 1)
@@ -0,0 +1,99 @@
+# benchmarks/bench_utils.py
+#
+# Funções comuns aos benchmarks: caminhos do projeto, medição de tempo, dados sintéticos
+# reprodutíveis e gravação dos resultados em JSON com metadados do ambiente.
+
+import datetime
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Pasta padrão para os relatórios JSON.
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+# Os benchmarks são executados como scripts (python benchmarks/bench_x.py); a raiz do projeto
+# torna os pacotes 'common', 'server' e 'clients' importáveis mesmo sem 'pip install -e .'.
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Importa o módulo clients.client (o mesmo para todos os IDs de cliente).
+def load_client_module():
+    return importlib.import_module('clients.client')
+
+# Executa 'fn' 'repeat' vezes (após 'warmup' execuções descartadas) e retorna estatísticas em segundos.
+# Convenção dos relatórios: chaves terminadas em '_s' são tempos (menor é melhor) e em '_per_s' são vazões
+# (maior é melhor); benchmarks/compare.py usa essa convenção.
+def time_call(fn, repeat=10, warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        'repeat': repeat,
+        'min_s': samples[0],
+        'median_s': statistics.median(samples),
+        'mean_s': statistics.fmean(samples),
+        'p90_s': samples[min(len(samples) - 1, int(0.9 * len(samples)))],
+    }
+
+# Dataset sintético no formato do CIFAR-10 (imagens 3x32x32 em [0, 1] e 10 classes), reprodutível pela semente.
+def synthetic_dataset(num_samples, seed=0, input_size=32, num_classes=10):
+    import torch
+    from torch.utils.data import TensorDataset
+    generator = torch.Generator().manual_seed(seed)
+    images = torch.rand(num_samples, 3, input_size, input_size, generator=generator)
+    labels = torch.randint(0, num_classes, (num_samples,), generator=generator)
+    return TensorDataset(images, labels)
+
+# Hash do commit atual (ou None fora de um repositório git).
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Metadados do ambiente gravados junto com cada relatório, para comparar execuções entre versões.
+def environment_metadata():
+    metadata = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+    try:
+        import torch
+        metadata['torch'] = torch.__version__
+        metadata['torch_num_threads'] = torch.get_num_threads()
+    except ImportError:
+        metadata['torch'] = None
+    try:
+        import numpy
+        metadata['numpy'] = numpy.__version__
+    except ImportError:
+        metadata['numpy'] = None
+    return metadata
+
+# Grava o relatório JSON de um benchmark e retorna o caminho do arquivo.
+def write_results(name, config, results, output=None):
+    report = {'benchmark': name, 'config': config, 'environment': environment_metadata(), 'results': results}
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f'{name}-{stamp}.json')
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados de '{name}' salvos em {output}")
+    return output
@@ -0,0 +1,60 @@
+# benchmarks/compare.py
+#
+# Compara dois relatórios JSON dos benchmarks e aponta regressões de desempenho.
+# Chaves terminadas em '_s' são tempos (menor é melhor) e em '_per_s' são vazões (maior é melhor).
+# Sai com código 1 se alguma métrica piorar além do limite.
+#
+# Uso: python benchmarks/compare.py base.json novo.json [--threshold 0.10]
+
+import argparse
+import json
+import sys
+
+# Achata o relatório em {caminho: valor} apenas para as métricas de desempenho.
+def collect_metrics(node, prefix=''):
+    metrics = {}
+    if isinstance(node, dict):
+        for key, value in node.items():
+            path = f"{prefix}.{key}" if prefix else str(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and (key.endswith('_s') or key.endswith('_per_s')):
+                metrics[path] = value
+            else:
+                metrics.update(collect_metrics(value, path))
+    elif isinstance(node, list):
+        for index, value in enumerate(node):
+            metrics.update(collect_metrics(value, f"{prefix}[{index}]"))
+    return metrics
+
+# Retorna a lista de (métrica, base, novo, variação relativa) que pioraram além do limite.
+def find_regressions(base, new, threshold):
+    regressions = []
+    base_metrics = collect_metrics(base['results'])
+    new_metrics = collect_metrics(new['results'])
+    for path, base_value in sorted(base_metrics.items()):
+        if path not in new_metrics or base_value == 0:
+            continue
+        change = (new_metrics[path] - base_value) / abs(base_value)
+        # Para vazões, uma queda é regressão; para tempos, um aumento.
+        worse = -change if path.endswith('_per_s') else change
+        if worse > threshold:
+            regressions.append((path, base_value, new_metrics[path], change))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara dois relatórios de benchmark.")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Piora relativa tolerada (padrão: 10%%).")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    print(f"Base: {base['environment'].get('git_commit')} | Novo: {new['environment'].get('git_commit')}")
+    regressions = find_regressions(base, new, args.threshold)
+    for path, base_value, new_value, change in regressions:
+        print(f"REGRESSÃO {path}: {base_value:.6g} -> {new_value:.6g} ({change:+.1%})")
+    if regressions:
+        sys.exit(1)
+    print("Nenhuma regressão acima do limite.")
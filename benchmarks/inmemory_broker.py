@@ -0,0 +1,156 @@
+# benchmarks/inmemory_broker.py
+#
+# Broker MQTT em memória para benchmarks e simulações locais. Imita a parte da API do
+# paho-mqtt usada por Server e Client: cada cliente tem sua própria thread de rede que
+# entrega as mensagens em ordem para on_message, como o loop_start() do paho.
+
+import queue
+import threading
+import time
+
+from paho.mqtt.client import topic_matches_sub
+
+# Mensagem entregue aos callbacks (mesmos atributos usados de paho.mqtt.client.MQTTMessage).
+class InMemoryMessage:
+    def __init__(self, topic, payload, qos=0, retain=False):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+        # Instante de publicação (útil para medir latência no broker em memória).
+        self.timestamp = time.time()
+
+# Broker: mantém as inscrições e roteia cada publicação para os clientes inscritos.
+class InMemoryBroker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Lista de (filtro de tópico, cliente).
+        self.subscriptions = []
+        # Estatísticas de tráfego.
+        self.messages_published = 0
+        self.bytes_published = 0
+        self.messages_delivered = 0
+        self.bytes_delivered = 0
+
+    # Cria um cliente conectado a este broker.
+    def client(self, client_id):
+        return InMemoryClient(self, client_id)
+
+    def subscribe(self, client, topic_filter):
+        with self.lock:
+            if (topic_filter, client) not in self.subscriptions:
+                self.subscriptions.append((topic_filter, client))
+
+    def unsubscribe_all(self, client):
+        with self.lock:
+            self.subscriptions = [(f, c) for f, c in self.subscriptions if c is not client]
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        with self.lock:
+            targets = {c for f, c in self.subscriptions if topic_matches_sub(f, topic)}
+            self.messages_published += 1
+            self.bytes_published += len(payload)
+            self.messages_delivered += len(targets)
+            self.bytes_delivered += len(payload) * len(targets)
+        for client in targets:
+            client.deliver(InMemoryMessage(topic, payload, qos, retain))
+
+    def stats(self):
+        with self.lock:
+            return {'messages_published': self.messages_published, 'bytes_published': self.bytes_published,
+                    'messages_delivered': self.messages_delivered, 'bytes_delivered': self.bytes_delivered}
+
+# Resultado de publish(), compatível com o uso de MQTTMessageInfo (wait_for_publish / is_published).
+class InMemoryPublishInfo:
+    rc = 0
+
+    def wait_for_publish(self, timeout=None):
+        pass
+
+    def is_published(self):
+        return True
+
+# Cliente com a interface mínima do paho-mqtt usada pelo projeto.
+class InMemoryClient:
+    def __init__(self, broker, client_id):
+        self.broker = broker
+        self.client_id = client_id
+        self.on_connect = None
+        self.on_message = None
+        self.on_disconnect = None
+        self.connected = False
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stop = threading.Event()
+        # Mensagem de "last will" (tópico, payload, qos), publicada apenas em quedas de conexão (kill()).
+        self._will = None
+
+    def will_set(self, topic, payload=None, qos=0, retain=False):
+        self._will = (topic, payload, qos)
+
+    def connect(self, host=None, port=None, keepalive=60):
+        self.connected = True
+        # Como no paho, on_connect é chamado pela thread de rede, após o loop iniciar.
+        self._queue.put(('connect', None))
+
+    def subscribe(self, topic, qos=0):
+        self.broker.subscribe(self, topic)
+        return (0, 1)
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        elif payload is None:
+            payload = b''
+        else:
+            payload = bytes(payload)
+        self.broker.publish(topic, payload, qos, retain)
+        return InMemoryPublishInfo()
+
+    def deliver(self, message):
+        self._queue.put(('message', message))
+
+    def loop_start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name=f"inmemory-{self.client_id}", daemon=True)
+            self._thread.start()
+
+    def loop_stop(self):
+        self._stop.set()
+        self._queue.put(('stop', None))
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def disconnect(self):
+        if self.connected:
+            self.connected = False
+            self.broker.unsubscribe_all(self)
+
+    # Simula a queda da conexão: o broker publica o "last will" do cliente, como um broker real faz
+    # quando o keepalive expira ou o socket é fechado sem DISCONNECT.
+    def kill(self):
+        self.loop_stop()
+        if self.connected:
+            self.connected = False
+            self.broker.unsubscribe_all(self)
+            if self._will is not None:
+                topic, payload, qos = self._will
+                self.publish(topic, payload, qos)
+
+    # Thread de rede: entrega eventos na ordem de chegada.
+    def _loop(self):
+        while not self._stop.is_set():
+            kind, message = self._queue.get()
+            try:
+                if kind == 'stop':
+                    break
+                if kind == 'connect' and self.on_connect is not None:
+                    self.on_connect(self, None, None, 0, None)
+                elif kind == 'message' and self.on_message is not None:
+                    self.on_message(self, None, message)
+            except SystemExit:
+                # O servidor encerra com sys.exit() dentro do callback da última rodada;
+                # no paho isso também encerra apenas a thread de rede.
+                break
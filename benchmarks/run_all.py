@@ -0,0 +1,47 @@
+# benchmarks/run_all.py
+#
+# Executa a suíte de benchmarks com as configurações padrão de cada um e grava um único
+# relatório JSON. Use benchmarks/compare.py para comparar relatórios de versões diferentes.
+#
+# Uso: python benchmarks/run_all.py [--output relatorio.json] [--skip end_to_end]
+
+import argparse
+
+import bench_aggregation
+import bench_client_throughput
+import bench_cold_start
+import bench_dataset_loading
+import bench_end_to_end
+import bench_robust_aggregation
+import bench_secure_aggregation
+import bench_serialization
+from bench_utils import write_results
+
+# Benchmarks da suíte, na ordem de execução.
+SUITE = {
+    'cold_start': bench_cold_start,
+    'serialization': bench_serialization,
+    'aggregation': bench_aggregation,
+    'robust_aggregation': bench_robust_aggregation,
+    'secure_aggregation': bench_secure_aggregation,
+    'client_throughput': bench_client_throughput,
+    'dataset_loading': bench_dataset_loading,
+    'end_to_end': bench_end_to_end,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa a suíte completa de benchmarks.")
+    parser.add_argument("--skip", nargs="*", default=[], choices=sorted(SUITE))
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: benchmarks/results/).")
+    args = parser.parse_args()
+
+    results = {}
+    config = {}
+    for name, module in SUITE.items():
+        if name in args.skip:
+            continue
+        print(f"\n=== {name} ===")
+        bench_args = module.build_parser().parse_args([])
+        config[name] = vars(bench_args)
+        results[name] = module.run_benchmark(bench_args)
+    write_results('suite', config, results, args.output)
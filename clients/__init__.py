@@ -0,0 +1,3 @@
+# clients/__init__.py
+#
+# Cliente de aprendizado federado, launcher de vários clientes e distribuição do CIFAR-10.
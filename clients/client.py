@@ -0,0 +1,679 @@
+# clients/client.py
+#
+# Cliente único para todos os IDs: os dados e o cache de cada cliente ficam em clients/client_<id>/.
+# Para iniciar vários clientes em um mesmo host, veja clients/launcher.py.
+# Uso: python -m clients.client <client_id> <num_epochs> (ou fedavg-client, após pip install -e .)
+
+import torch
+from torch.utils.data import DataLoader
+import sys
+import os
+import paho.mqtt.client as mqtt # Importa a biblioteca Paho MQTT.
+import time
+import queue
+import threading
+import numpy as np
+import argparse
+import json
+import zlib
+
+# Importa o registro de modelos do pacote 'common'.
+from common.federated_net import build_model, available_models
+# Importa o codec binário das mensagens de parâmetros.
+from common.codec import (encode_parameters, decode_parameters, apply_delta, encode_masked_update,
+                          ENCODING_NONE, ENCODING_XOR_ZLIB, ENCODING_Q8_ZLIB)
+# Importa o cache local (shard decodificado, último modelo global e estado do otimizador).
+from common.client_cache import ClientCache
+# Importa a instrumentação opcional de profiling por rodada.
+from common.profiling import RoundProfiler
+# Importa as máscaras pareadas da agregação segura.
+from common.secure_aggregation import PairwiseMasker
+# Importa o limite de norma do delta (privacidade diferencial, DP-FedAvg).
+from common.privacy import clip_update
+# Importa o aumento de dados em lote (recorte, espelhamento e normalização sobre tensores).
+from common.augmentation import BatchAugmenter
+# Importa a telemetria de memória por rodada (RSS e censo de tensores).
+from common.memory import census_due, format_memory, memory_snapshot
+# Carregamento dos shards gerados por distribute_cifar10 (o torchvision só é importado se o shard
+# precisar ser desserializado, isto é, sem cache).
+from clients.distribute_cifar10 import load_shard, holdout_path
+
+# Pasta de um cliente (dados em data/ e cache em cache/).
+def client_dir(client_id):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), f'client_{client_id}')
+
+# Restringe o processo aos núcleos 'cores' (afinidade de CPU, apenas no Linux). Clientes no mesmo host
+# fixados em núcleos disjuntos não disputam núcleos nem caches.
+def pin_to_cores(cores):
+    if not hasattr(os, 'sched_setaffinity'):
+        print("Afinidade de CPU indisponível nesta plataforma; ignorada.")
+        return
+    os.sched_setaffinity(0, cores)
+
+# Ajusta o número de threads do PyTorch ao orçamento de CPUs do cliente.
+# Com vários clientes no mesmo host, o padrão (uma thread por núcleo em cada processo)
+# faz os processos disputarem os mesmos núcleos.
+def configure_threads(cpu_budget):
+    # Threads intra-operação: paralelismo dentro de cada convolução/matmul.
+    torch.set_num_threads(max(1, cpu_budget))
+    try:
+        # Threads inter-operação: pouco usadas no treinamento em CPU, basta uma fração do orçamento.
+        torch.set_num_interop_threads(max(1, cpu_budget // 4))
+    except RuntimeError:
+        # Só pode ser definido antes de qualquer trabalho paralelo; mantém o valor atual nesse caso.
+        pass
+
+# Define a classe Cliente.
+class Client:
+    # Construtor da classe Cliente.
+    # Opções de treinamento acelerado (todas desativadas por padrão):
+    #   compile_model: usa torch.compile (compilado uma vez e reutilizado em todas as rodadas).
+    #   channels_last: envia os batches no formato de memória channels_last para as convoluções.
+    #   cpu_budget: número de núcleos reservados ao cliente (define as threads do PyTorch).
+    #   cpu_affinity: núcleos aos quais o processo é fixado (padrão do cpu_budget: o número de núcleos).
+    #   mixed_precision: executa forward/loss em bfloat16 (autocast); os pesos mestres continuam em float32.
+    # 'dataset' e 'mqtt_client' permitem injetar dados e um cliente MQTT alternativos (usados pelos benchmarks);
+    # 'holdout_dataset' é o conjunto de validação local (padrão: o gerado por distribute_cifar10, se existir).
+    # 'augment' aplica a cada batch de treino recorte aleatório com preenchimento e espelhamento horizontal
+    # (ver common/augmentation.py); a normalização por canal é aplicada sempre, no treino e na avaliação.
+    # 'momentum' é o momentum do SGD, zerado no início de cada rodada; com 'carry_momentum', o estado do
+    # otimizador é mantido entre rodadas (e, com o cache, entre execuções do cliente).
+    # 'memory_census_interval' inclui o censo dos tensores vivos na memória informada a cada N rodadas
+    # (0 = só a RSS; ver common/memory.py).
+    # 'profile_dir', 'torch_profile_round' e 'cprofile' ativam o profiling por rodada (ver common/profiling.py).
+    # 'topic_prefix' é prefixado a todos os tópicos (ex.: 'edge/0/' para um cliente de um agregador de borda).
+    # 'cache_dir' ativa o cache local (ver common/client_cache.py), que permite reiniciar o cliente sem
+    # decodificar o shard novamente nem baixar de novo um modelo global que ele já tem.
+    # 'heartbeat_interval' é o intervalo (segundos) entre os heartbeats enviados ao servidor, que usa
+    # sua ausência (ou a mensagem de "last will" do broker) para detectar clientes desconectados.
+    # 'secure_aggregation' gera um par de chaves, anunciado ao servidor, e permite enviar as atualizações
+    # mascaradas quando o servidor pede a agregação segura (ver common/secure_aggregation.py).
+    # 'local_layers' (as mesmas do servidor) são camadas personalizadas: treinadas localmente, nunca
+    # enviadas nem substituídas pelo modelo global (ver FederatedModule.set_local_layers).
+    def __init__(self, client_id, broker_address="localhost", broker_port=1883, epochs=3, model_name="cnn",
+                 compile_model=False, channels_last=False, cpu_budget=None, momentum=0.0, mixed_precision=False,
+                 dataset=None, mqtt_client=None, profile_dir=None, torch_profile_round=None, cprofile=False,
+                 topic_prefix="", cache_dir=None, heartbeat_interval=10.0, cpu_affinity=None,
+                 secure_aggregation=False, local_layers=None, holdout_dataset=None, augment=True,
+                 memory_census_interval=0, carry_momentum=False):
+        # Fixa os núcleos e ajusta as threads antes de qualquer operação do PyTorch.
+        if cpu_affinity:
+            pin_to_cores(cpu_affinity)
+            if cpu_budget is None:
+                cpu_budget = len(cpu_affinity)
+        if cpu_budget is not None:
+            configure_threads(cpu_budget)
+        # Armazena o ID único do cliente.
+        self.client_id = client_id
+        # Tópicos MQTT do cliente (com o prefixo do grupo, se houver).
+        self.initial_parameters_topic = f"{topic_prefix}server/initial_parameters/{client_id}"
+        self.global_parameters_topic = f"{topic_prefix}server/global_parameters/{client_id}"
+        self.terminate_topic = f"{topic_prefix}client/terminate"
+        self.ready_topic = f"{topic_prefix}client/ready"
+        self.updated_parameters_topic = f"{topic_prefix}client/updated_parameters/{client_id}"
+        self.heartbeat_topic = f"{topic_prefix}client/heartbeat"
+        self.offline_topic = f"{topic_prefix}client/offline"
+        # Agregação segura: pedidos de desmascaramento do servidor e resposta com as sementes da rodada.
+        self.secure_unmask_topic = f"{topic_prefix}server/secagg_unmask/{client_id}"
+        self.secure_seeds_topic = f"{topic_prefix}client/secagg_seeds/{client_id}"
+        self.masker = PairwiseMasker(client_id) if secure_aggregation else None
+        self.heartbeat_interval = heartbeat_interval
+        # Núcleos reservados ao cliente e vazão de treinamento medida (amostras/s), anunciados ao servidor.
+        self.cpu_budget = cpu_budget
+        self.samples_per_s = None
+        # Amostras processadas no último treinamento (base da vazão medida).
+        self.last_train_samples = 0
+        # Profiling opcional (desativado quando profile_dir é None).
+        self.profiler = RoundProfiler(f"client_{client_id}", profile_dir, torch_profile_round, cprofile)
+        # Define o número de épocas para o treinamento local em cada rodada.
+        self.epochs = epochs
+        # Cache local (desativado quando cache_dir é None).
+        self.cache = ClientCache(cache_dir) if cache_dir is not None else None
+        # Carrega o dataset CIFAR-10 específico para este cliente.
+        self.dataset = dataset if dataset is not None else self.load_data()
+        # Conjunto de validação local, avaliado antes e depois do treino de cada rodada (None desativa).
+        self.holdout_dataset = holdout_dataset if holdout_dataset is not None or dataset is not None else self.load_holdout()
+        # Inicializa uma instância da rede neural escolhida no registro de modelos.
+        self.model_name = model_name
+        self.net = build_model(model_name, local_layers=local_layers)
+        # Liga os parâmetros ao buffer plano antes de criar o otimizador e de compilar o modelo.
+        self.net.flat_parameters()
+        # Cópia do último modelo global recebido (sem as camadas locais), com sua rodada e versão (hash
+        # enviado pelo servidor). É o que o cliente anuncia ao se conectar, para não baixar de novo um
+        # modelo que já tem.
+        self.global_flat = np.empty(self.net.num_shared_values(), dtype=np.float32)
+        self.global_round = None
+        self.global_version = None
+        # Rascunho onde os deltas são aplicados: o modelo global só é substituído se o hash conferir.
+        self.delta_flat = np.empty_like(self.global_flat)
+        # Modelo enviado quando o servidor limita a norma do delta (ver common/privacy.py).
+        self.clipped_flat = np.empty_like(self.global_flat)
+        if self.cache is not None:
+            cached_model = self.cache.load_model(model_name, self.global_flat.size)
+            if cached_model is not None:
+                flat, self.global_round, self.global_version = cached_model
+                self.global_flat[:] = flat.numpy()
+                self.net.load_shared(self.global_flat)
+                print(f"Client {self.client_id}: Modelo global da rodada {self.global_round} restaurado do cache.")
+            # Camadas locais treinadas nas rodadas anteriores.
+            local_state = self.cache.load_local(model_name, self.net.local_parameters().numel()) if local_layers else None
+            if local_state is not None:
+                self.net.local_parameters().copy_(local_state)
+                print(f"Client {self.client_id}: Camadas locais {local_layers} restauradas do cache.")
+        # Módulo usado no treinamento: o próprio modelo ou sua versão compilada, que compartilha
+        # os mesmos parâmetros. Como os parâmetros são views do buffer plano e load_shared copia
+        # no mesmo lugar, o grafo compilado continua válido entre rodadas.
+        self.train_net = self.net
+        if compile_model:
+            if hasattr(torch, 'compile'):
+                self.train_net = torch.compile(self.net)
+            else:
+                print(f"Client {self.client_id}: torch.compile indisponível nesta versão do PyTorch; usando modo eager.")
+        # Formato de memória dos batches de entrada. Os pesos permanecem contíguos no buffer plano
+        # (convertê-los realocaria os tensores e quebraria as views).
+        self.channels_last = channels_last
+        # Treinamento em precisão mista bfloat16 na CPU.
+        self.mixed_precision = mixed_precision
+        # Aumento de dados e normalização aplicados a batches inteiros, sobre o shard já em tensores.
+        self.augmenter = BatchAugmenter(padding=4 if augment else 0, flip=augment)
+        self.memory_census_interval = memory_census_interval
+        # Otimizador e DataLoader persistem entre rodadas; o estado do otimizador (momentum) é zerado no início
+        # de cada rodada, a menos que 'carry_momentum' peça para mantê-lo. Só nesse caso (e com momentum, sem o
+        # qual o SGD não tem estado) ele é guardado no cache.
+        self.optimizer = torch.optim.SGD(self.net.parameters(), lr=0.01, momentum=momentum)
+        self.carry_momentum = carry_momentum
+        self.cache_optimizer = self.cache is not None and carry_momentum and momentum > 0
+        if self.cache_optimizer:
+            optimizer_state = self.cache.load_optimizer()
+            if optimizer_state is not None:
+                try:
+                    self.optimizer.load_state_dict(optimizer_state)
+                except (ValueError, KeyError) as e:
+                    # Estado de outro modelo ou configuração; o otimizador começa do zero.
+                    print(f"Client {self.client_id}: Estado do otimizador em cache ignorado: {e}")
+        self.dataloader = DataLoader(self.dataset, batch_size=64, shuffle=True)
+        self.eval_dataloader = DataLoader(self.holdout_dataset, batch_size=256) if self.holdout_dataset is not None else None
+        
+        # Inicializa o cliente MQTT.
+        # mqtt.CallbackAPIVersion.VERSION2 especifica o uso da API de callbacks da versão 2.0.
+        self.client = mqtt_client or mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, f"client_{client_id}")
+        # Se a conexão cair sem um DISCONNECT, o broker publica esta mensagem em nome do cliente.
+        self.client.will_set(self.offline_topic, json.dumps({'client_id': client_id, 'reason': 'lost'}), qos=1)
+        
+        # Atribui os métodos de callback para eventos MQTT.
+        self.client.on_connect = self.on_connect # Chamado quando o cliente se conecta ao broker.
+        # Usa um wrapper para rotear mensagens para manipuladores específicos de tópicos.
+        self.client.on_message = self._on_message_handler_wrapper 
+        # Endereço do broker MQTT.
+        self.broker_address = broker_address
+        # Porta do broker MQTT.
+        self.broker_port = broker_port
+        # Flag para controlar se os parâmetros iniciais foram recebidos.
+        self.received_initial_parameters = False
+        # Armazena os parâmetros globais recebidos do servidor.
+        self.global_parameters = None
+        # O número da rodada atual.
+        self.round_num = 0
+        # NOVO: Flag para sinalizar que o treinamento federado terminou.
+        self.training_finished = False 
+        # (rodada, versão do modelo global, mensagem enviada) da última atualização calculada.
+        self.last_update = None
+        # Mensagens de parâmetros e de desmascaramento são processadas (em ordem) por uma thread de trabalho,
+        # não pela thread de rede do paho: assim o treinamento não bloqueia os keepalives nem os heartbeats.
+        self.work_queue = queue.Queue()
+        self.worker = None
+
+    # Método para carregar o dataset CIFAR-10 específico do cliente.
+    def load_data(self):
+        # Constrói o caminho para o arquivo .pkl do dataset do cliente.
+        data_path = os.path.join(client_dir(self.client_id), 'data', f'cifar10_client_{self.client_id}.pkl')
+        # Verifica se o arquivo de dados existe.
+        if not os.path.exists(data_path):
+            print(f"Erro: Arquivo de dados para o cliente {self.client_id} não encontrado em {data_path}.")
+            print("Execute 'python clients/distribute_cifar10.py' primeiro.")
+            sys.exit(1) # Sai do programa se o arquivo não for encontrado.
+        
+        return self.load_cached_shard(data_path, 'shard')
+
+    # Carrega o conjunto de validação local gravado ao lado do shard (None se não existir, ex.: shards
+    # gerados por versões antigas de distribute_cifar10).
+    def load_holdout(self):
+        data_path = holdout_path(os.path.join(client_dir(self.client_id), 'data', f'cifar10_client_{self.client_id}.pkl'))
+        if not os.path.exists(data_path):
+            print(f"Client {self.client_id}: Sem conjunto de validação local ({data_path}); avaliação local desativada.")
+            return None
+        return self.load_cached_shard(data_path, 'holdout')
+
+    # Carrega um shard ('shard' ou 'holdout'). O shard já decodificado em tensores é carregado do cache
+    # (com mmap), sem desserializar o pickle.
+    def load_cached_shard(self, data_path, name):
+        if self.cache is not None:
+            dataset = self.cache.load_dataset(data_path, name)
+            if dataset is not None:
+                print(f"Client {self.client_id}: Dados '{name}' carregados do cache ({len(dataset)} amostras).")
+                return dataset
+
+        # Carrega (des-serializa) o dataset do arquivo.
+        dataset = load_shard(data_path)
+        # Decodifica o shard uma única vez e o grava no cache para as próximas inicializações.
+        if self.cache is not None:
+            dataset = self.cache.save_dataset(dataset, data_path, name)
+        return dataset
+
+    # Método de callback chamado quando o cliente se conecta ao broker MQTT.
+    # 'properties' é um novo argumento na API v2.0 do paho-mqtt.
+    def on_connect(self, client, userdata, flags, rc, properties): 
+        # Verifica se a conexão foi bem-sucedida (rc=0).
+        if rc == 0:
+            print(f"Client {self.client_id}: Conectado ao broker MQTT com sucesso!")
+            # Inscreve-se no tópico para receber parâmetros iniciais do servidor.
+            self.client.subscribe(self.initial_parameters_topic)
+            # Inscreve-se no tópico para receber parâmetros globais atualizados do servidor.
+            self.client.subscribe(self.global_parameters_topic)
+            # NOVO: Inscreve-se no tópico para receber o sinal de término do servidor.
+            self.client.subscribe(self.terminate_topic)
+            if self.masker is not None:
+                self.client.subscribe(self.secure_unmask_topic)
+            print(f"Client {self.client_id}: Inscrito nos tópicos '{self.initial_parameters_topic}', '{self.global_parameters_topic}' e '{self.terminate_topic}'.")
+            
+            # NOVO: Cliente envia um sinal de "pronto" para o servidor.
+            self.announce_ready()
+
+        else:
+            print(f"Client {self.client_id}: Falha na conexão, código de retorno: {rc}")
+
+    # Estado do cliente enviado no sinal de "pronto" e nos heartbeats: a rodada e a versão do modelo global
+    # que ele já tem (None se não tiver nenhum) e suas capacidades.
+    def status_payload(self):
+        capabilities = {'cores': self.cpu_budget or os.cpu_count(), 'num_samples': len(self.dataset),
+                        'batch_size': self.dataloader.batch_size, 'samples_per_s': self.samples_per_s,
+                        'model': self.model_name}
+        if self.masker is not None:
+            capabilities['secagg_public_key'] = self.masker.public_key_hex
+        return json.dumps({'client_id': self.client_id, 'round': self.global_round, 'version': self.global_version,
+                           'capabilities': capabilities})
+
+    # Envia o sinal de "pronto" ao servidor. O QoS (Quality of Service) 1 garante entrega.
+    def announce_ready(self):
+        self.client.publish(self.ready_topic, self.status_payload(), qos=1)
+        print(f"Client {self.client_id}: Enviou sinal de 'pronto' para o servidor.")
+
+    # NOVO: Manipulador de mensagens para o tópico de término.
+    def on_terminate_message(self, client, userdata, msg):
+        print(f"\n{'-'*50}")
+        print(f"Client {self.client_id}: Recebido sinal de término do servidor. Desconectando...")
+        print(f"{'-'*50}\n")
+        # Define a flag de término para True, fazendo o loop principal do start() parar.
+        self.training_finished = True 
+        
+    # Método de callback chamado quando uma mensagem é recebida nos tópicos de parâmetros.
+    def on_parameters_message(self, client, userdata, msg):
+        # Instante de recebimento (ecoado ao servidor para a linha do tempo da rodada).
+        recv_at = time.time()
+        topic = msg.topic
+        payload = msg.payload
+
+        # Decodifica a mensagem: o corpo é o modelo plano (memoryview sobre a payload, sem cópia).
+        try:
+            header, parameters = decode_parameters(payload)
+        except ValueError as e:
+            print(f"Client {self.client_id}: Mensagem de parâmetros inválida: {e}")
+            return
+
+        # Reentregas (QoS 1) ou reenvios do modelo da rodada já treinada não disparam um segundo
+        # treinamento: o cliente apenas reenvia a atualização já calculada (o servidor descarta duplicatas).
+        if self.last_update is not None and self.last_update[:2] == (header.get('round'), header.get('version')):
+            print(f"Client {self.client_id}: Modelo da rodada {header.get('round')} recebido em duplicidade; reenviando a atualização.")
+            self.client.publish(self.updated_parameters_topic, self.last_update[2], qos=1)
+            return
+
+        # Reconstrói o modelo global a partir da versão que o cliente tem (ver Server.payload_for).
+        encoding = header.get('encoding')
+        if encoding == ENCODING_NONE:
+            # Sem corpo: o cliente já tem o modelo da rodada (ex.: após reiniciar com cache).
+            valid = header.get('version') == self.global_version
+        elif encoding in (ENCODING_XOR_ZLIB, ENCODING_Q8_ZLIB):
+            # Delta (exato ou quantizado) em relação à versão anterior, aplicado no rascunho; o resultado é
+            # conferido pelo hash antes de substituir o modelo global.
+            valid = self.global_version is not None and header.get('base_version') == self.global_version
+            if valid:
+                try:
+                    valid = apply_delta(header, parameters, self.global_flat, self.delta_flat)
+                except (ValueError, KeyError, zlib.error) as e:
+                    print(f"Client {self.client_id}: Delta inválido: {e}")
+                    valid = False
+                if valid:
+                    # O modelo reconstruído passa a ser o global; o anterior vira o rascunho do próximo delta.
+                    self.global_flat, self.delta_flat = self.delta_flat, self.global_flat
+        else:
+            self.global_flat[:] = np.frombuffer(parameters, dtype=np.float32)
+            valid = True
+        if not valid:
+            # O modelo não pôde ser reconstruído a partir do que o cliente tem; pede o modelo completo.
+            print(f"Client {self.client_id}: Versão {header.get('version')} indisponível localmente ({encoding}); solicitando o modelo completo.")
+            self.global_version = None
+            self.announce_ready()
+            return
+        self.global_version = header.get('version')
+
+        # O número da rodada vem no cabeçalho enviado pelo servidor.
+        self.round_num = header.get('round', 0)
+        self.global_round = self.round_num
+        # Abre a rodada no profiler (o trabalho da rodada roda nesta thread, a de trabalho do cliente).
+        self.profiler.begin_round(self.round_num)
+        self.profiler.record_span("decode", recv_at, time.time(), bytes=len(payload))
+        # Grava o modelo recebido no cache: se o processo cair durante o treinamento, ao reiniciar
+        # ele não precisa baixá-lo de novo.
+        if self.cache is not None:
+            with self.profiler.span("cache_model"):
+                self.cache.save_model(self.global_flat, self.round_num, self.global_version, self.model_name)
+        
+        # Atualiza os parâmetros globais do cliente com os recebidos.
+        self.global_parameters = self.global_flat
+        # Indica que os parâmetros iniciais foram recebidos (para sair da espera inicial no start()).
+        self.received_initial_parameters = True
+        
+        print(f"\n{'-'*50}")
+        print(f"Client {self.client_id}: Iniciando Rodada {self.round_num}")
+        print(f"Client {self.client_id}: Parâmetros do servidor recebidos ({encoding or 'full'}, {len(payload) / 1024:.2f} KB).")
+        # Trabalho local atribuído pelo servidor conforme a vazão do cliente (None = 'epochs' épocas).
+        local_steps = (header.get('local_steps') or {}).get(str(self.client_id))
+        if local_steps is not None:
+            print(f"Client {self.client_id}: {local_steps} passos de treino locais atribuídos pelo servidor.")
+        # Agregação segura: as máscaras são derivadas das chaves públicas enviadas pelo servidor; com uma
+        # chave que não é a deste processo (ex.: anunciada antes de reiniciar), não há como participar.
+        secure = header.get('secure_aggregation')
+        if secure is not None and (self.masker is None or secure['public_keys'].get(str(self.client_id)) != self.masker.public_key_hex):
+            print(f"Client {self.client_id}: Rodada {self.round_num} com agregação segura sem a chave deste cliente; aguardando a próxima.")
+            self.profiler.end_round()
+            return
+        
+        # Avalia o modelo recebido (com as camadas locais, se houver) no conjunto de validação local.
+        self.net.load_shared(self.global_parameters)
+        evaluation_before = self.evaluate()
+        # Registra o tempo de início do treinamento local.
+        start_time = time.time()
+        # Executa o treinamento local e obtém os parâmetros atualizados e a perda média.
+        updated_parameters, train_loss = self.train(self.global_parameters, local_steps)
+        # Registra o tempo de fim do treinamento local.
+        end_time = time.time()
+        # Avalia o modelo treinado, antes do limite de norma (que só altera o que é enviado).
+        evaluation_after = self.evaluate()
+        
+        # Calcula a duração do treinamento local.
+        training_time = end_time - start_time
+        # Privacidade diferencial: o delta em relação ao modelo global recebido é limitado à norma pedida
+        # pelo servidor, sobre o buffer plano.
+        clip_norm = header.get('clip_norm')
+        if clip_norm is not None:
+            with self.profiler.span("clip"):
+                update_norm = clip_update(np.frombuffer(updated_parameters, dtype=np.float32), self.global_flat,
+                                          clip_norm, self.clipped_flat)
+            updated_parameters = self.clipped_flat
+            print(f"Client {self.client_id}: Norma do delta {update_norm:.4f} (limite {clip_norm}).")
+        # Vazão da rodada, anunciada nos próximos heartbeats.
+        if training_time > 0:
+            self.samples_per_s = self.last_train_samples / training_time
+        # Serializa os parâmetros atualizados uma única vez (o corpo é o buffer plano do modelo).
+        # O cabeçalho ecoa a rodada e os timestamps do cliente, permitindo ao servidor separar
+        # tempo de rede (download/upload) de tempo de computação, e informa o número de amostras
+        # de treino (peso do cliente na média do FedAvg).
+        # Na agregação segura, o corpo é o modelo ponderado em ponto fixo e mascarado.
+        # A memória do cliente após o treino vai junto, para as métricas da rodada no servidor (medida
+        # antes do span de codificação, que entra no caminho crítico).
+        memory = memory_snapshot(census=census_due(self.round_num, self.memory_census_interval))
+        with self.profiler.span("encode", secure=secure is not None):
+            update_header = dict(round=self.round_num, base_version=self.global_version,
+                                 num_samples=len(self.dataset), samples_per_s=self.samples_per_s,
+                                 recv_at=recv_at, train_start=start_time, train_end=end_time, memory=memory)
+            # Métricas da avaliação local, agregadas pelo servidor (avaliação federada).
+            if evaluation_before is not None:
+                update_header['evaluation'] = {'samples': len(self.holdout_dataset), 'before': evaluation_before,
+                                               'after': evaluation_after}
+            if secure is not None:
+                masked = self.masker.mask(updated_parameters, secure['weights'][str(self.client_id)], secure['scale'],
+                                          secure['public_keys'], self.round_num)
+                updated_payload = encode_masked_update(masked, secure['scale'], sent_at=time.time(), **update_header)
+            else:
+                updated_payload = encode_parameters(updated_parameters, sent_at=time.time(), **update_header)
+        self.last_update = (self.round_num, self.global_version, updated_payload)
+        # Tamanho dos parâmetros atualizados que serão transferidos (upload).
+        transferred_data_size_bytes = len(updated_payload)
+        
+        print(f"Client {self.client_id}: Treinamento local concluído para Rodada {self.round_num}.")
+        print(f"  Tempo de treinamento: {training_time:.2f} segundos")
+        print(f"  Tamanho dos dados transferidos (upload): {transferred_data_size_bytes / 1024:.2f} KB")
+        print(f"  Perda de Treinamento: {train_loss:.4f}")
+        if evaluation_before is not None:
+            print(f"  Validação local: acurácia {evaluation_before['accuracy']:.2f}% -> {evaluation_after['accuracy']:.2f}% | "
+                  f"perda {evaluation_before['loss']:.4f} -> {evaluation_after['loss']:.4f}")
+        print(f"  Memória: {format_memory(memory)}")
+        print(f"{'-'*50}\n")
+        
+        # Publica os parâmetros atualizados no tópico específico do cliente para o servidor.
+        with self.profiler.span("publish", bytes=transferred_data_size_bytes):
+            self.client.publish(self.updated_parameters_topic, updated_payload, qos=1)
+        print(f"Client {self.client_id}: Parâmetros atualizados para Rodada {self.round_num} enviados para o servidor.")
+        # Grava o estado do otimizador e as camadas locais fora do caminho crítico (depois do envio).
+        if self.cache is not None:
+            with self.profiler.span("cache_optimizer"):
+                if self.cache_optimizer:
+                    self.cache.save_optimizer(self.optimizer.state_dict())
+                if self.net.local_parameters().numel():
+                    self.cache.save_local(self.net.local_parameters(), self.model_name)
+        # Grava o trace da rodada.
+        self.profiler.end_round()
+
+    # Manipulador do pedido de desmascaramento: revela ao servidor as sementes da rodada compartilhadas com
+    # os participantes que saíram (apenas da última rodada mascarada; ver PairwiseMasker.reveal).
+    def on_secure_unmask_message(self, client, userdata, msg):
+        try:
+            request = json.loads(msg.payload.decode('utf-8'))
+            round_num, dropped = request['round'], [int(c) for c in request['dropped']]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            print(f"Client {self.client_id}: Pedido de desmascaramento mal formatado: {msg.payload}")
+            return
+        seeds = self.masker.reveal(round_num, dropped)
+        self.client.publish(self.secure_seeds_topic, json.dumps({'round': round_num, 'seeds': seeds}), qos=1)
+        print(f"Client {self.client_id}: Sementes da rodada {round_num} com os clientes {dropped} reveladas ao servidor.")
+
+    # NOVO: Wrapper para on_message para direcionar mensagens para os manipuladores corretos.
+    # O paho-mqtt chama apenas um on_message, então este método decide qual manipulador chamar
+    # com base no tópico da mensagem recebida.
+    def _on_message_handler_wrapper(self, client, userdata, msg):
+        # Se a mensagem for para terminar o treinamento.
+        if msg.topic == self.terminate_topic:
+            self.on_terminate_message(client, userdata, msg)
+        # Se a mensagem for de parâmetros iniciais ou globais (ou um pedido de desmascaramento), ela vai para
+        # a fila da thread de trabalho; a thread de rede volta imediatamente ao loop do paho.
+        elif msg.topic in (self.initial_parameters_topic, self.global_parameters_topic) or \
+                (msg.topic == self.secure_unmask_topic and self.masker is not None):
+            self.work_queue.put((client, userdata, msg))
+        else:
+            print(f"Client {self.client_id}: Mensagem recebida em tópico não esperado: {msg.topic}")
+
+    # Laço da thread de trabalho: processa as mensagens enfileiradas na ordem de chegada até receber None.
+    def _work_loop(self):
+        while True:
+            item = self.work_queue.get()
+            if item is None:
+                return
+            client, userdata, msg = item
+            try:
+                if msg.topic == self.secure_unmask_topic:
+                    self.on_secure_unmask_message(client, userdata, msg)
+                else:
+                    self.on_parameters_message(client, userdata, msg)
+            except Exception as e:
+                print(f"Client {self.client_id}: Erro ao processar mensagem em {msg.topic}: {e}")
+
+
+    # Método para realizar o treinamento local do modelo.
+    # Com 'local_steps', executa esse número de passos de otimização (percorrendo o shard quantas vezes
+    # for preciso) em vez de 'epochs' épocas completas.
+    def train(self, parameters, local_steps=None):
+        with self.profiler.span("train", epochs=self.epochs, local_steps=local_steps):
+            return self._train(parameters, local_steps)
+
+    # Implementação do treinamento local (train() a mede como um único span).
+    def _train(self, parameters, local_steps=None):
+        # Aplica os parâmetros globais recebidos (modelo plano) à rede local do cliente em uma única cópia.
+        # As camadas locais continuam com o que o cliente treinou nas rodadas anteriores.
+        self.net.load_shared(parameters)
+        # Reinicia o estado do otimizador SGD (Stochastic Gradient Descent): o momentum da rodada
+        # anterior se refere a outro modelo global (mantido apenas com 'carry_momentum').
+        optimizer = self.optimizer
+        if not self.carry_momentum:
+            optimizer.state.clear()
+        dataloader = self.dataloader
+
+        # Acumulador da perda total (tensor, para não sincronizar com .item() a cada batch).
+        # A acurácia é medida fora do laço de treino, no conjunto de validação local (ver evaluate).
+        total_loss = torch.zeros(())
+        total_samples = 0 # Acumulador para o número total de amostras processadas.
+
+        self.net.train() # Coloca a rede em modo de treinamento (habilita dropout/batchnorm, se houver).
+        # Número de épocas (a última pode ser parcial quando o número de passos é atribuído pelo servidor).
+        epochs = self.epochs if local_steps is None else -(-local_steps // max(1, len(dataloader)))
+        steps = 0
+        # Loop sobre o número de épocas.
+        for epoch in range(epochs):
+            with self.profiler.span("epoch", epoch=epoch):
+                # Loop sobre os batches de dados do DataLoader.
+                for inputs, labels in dataloader:
+                    if local_steps is not None and steps >= local_steps:
+                        break
+                    steps += 1
+                    # Recorte/espelhamento aleatórios e normalização do batch inteiro (sai em channels_last).
+                    inputs = self.augmenter(inputs)
+                    if self.channels_last and inputs.dim() == 4:
+                        inputs = inputs.contiguous(memory_format=torch.channels_last)
+                    optimizer.zero_grad() # Zera os gradientes acumulados de passes anteriores.
+                    # Realiza o passe forward (em bfloat16 quando a precisão mista está ativa).
+                    # Os parâmetros continuam em float32: o autocast converte apenas as operações,
+                    # então gradientes e atualizações do otimizador são feitos nos pesos mestres float32.
+                    with torch.autocast("cpu", dtype=torch.bfloat16, enabled=self.mixed_precision):
+                        outputs = self.train_net(inputs)
+                    # Calcula a perda de entropia cruzada (sempre em float32, para estabilidade numérica).
+                    loss = torch.nn.functional.cross_entropy(outputs.float(), labels)
+                    loss.backward() # Realiza o passe backward para calcular os gradientes.
+                    optimizer.step() # Atualiza os pesos do modelo usando o otimizador.
+                
+                    total_loss += loss.detach() * inputs.size(0) # Acumula a perda do batch.
+                    total_samples += labels.size(0) # Acumula o número de amostras no batch.
+        
+        self.last_train_samples = total_samples
+        avg_loss = total_loss.item() / max(1, total_samples) # Calcula a perda média.
+        
+        # Retorna os parâmetros compartilhados atualizados (memoryview sobre o buffer plano) e a perda média.
+        return self.net.export_shared(), avg_loss
+
+    # Avaliação rápida do modelo atual no conjunto de validação local, sem autograd (torch.inference_mode).
+    # Retorna {'loss': perda média, 'accuracy': acurácia em %}, ou None sem conjunto de validação.
+    def evaluate(self):
+        if self.eval_dataloader is None:
+            return None
+        with self.profiler.span("evaluate", samples=len(self.holdout_dataset)):
+            self.net.eval()
+            with torch.inference_mode():
+                total_loss = torch.zeros(())
+                correct = torch.zeros((), dtype=torch.long)
+                for inputs, labels in self.eval_dataloader:
+                    inputs = self.augmenter.normalize(inputs)
+                    if self.channels_last and inputs.dim() == 4:
+                        inputs = inputs.contiguous(memory_format=torch.channels_last)
+                    with torch.autocast("cpu", dtype=torch.bfloat16, enabled=self.mixed_precision):
+                        outputs = self.net(inputs)
+                    total_loss += torch.nn.functional.cross_entropy(outputs.float(), labels, reduction='sum')
+                    correct += (outputs.argmax(1) == labels).sum()
+                total = len(self.holdout_dataset)
+                return {'loss': total_loss.item() / total, 'accuracy': 100 * correct.item() / total}
+
+    # Método para iniciar o cliente MQTT e seu loop de execução.
+    def start(self):
+        try:
+            # Inicia a thread de trabalho (treinamento) antes de receber mensagens.
+            self.worker = threading.Thread(target=self._work_loop, name=f"client-{self.client_id}-worker", daemon=True)
+            self.worker.start()
+            # Tenta conectar ao broker MQTT.
+            self.client.connect(self.broker_address, self.broker_port, 60)
+            # Inicia o loop de rede em um thread separado para processar mensagens em segundo plano.
+            self.client.loop_start() 
+            
+            print(f"Client {self.client_id}: Aguardando comandos do servidor...")
+            # NOVO: Loop principal do cliente espera até que a flag training_finished seja True.
+            last_heartbeat = time.time()
+            while not self.training_finished:
+                time.sleep(1) # Aguarda 1 segundo para evitar uso excessivo da CPU.
+                # Heartbeat periódico. O treinamento roda na thread de trabalho, então tanto esta thread quanto a
+                # thread de rede (que envia os heartbeats e os keepalives ao broker) seguem livres durante ele.
+                if time.time() - last_heartbeat >= self.heartbeat_interval:
+                    self.client.publish(self.heartbeat_topic, self.status_payload(), qos=0)
+                    last_heartbeat = time.time()
+        # Captura qualquer exceção que ocorra durante a execução do cliente.
+        except Exception as e:
+            print(f"Client {self.client_id}: Erro durante a execução: {e}")
+        # O bloco finally é sempre executado, independentemente de exceções.
+        finally:
+            # Saída antes do término (ex.: Ctrl+C): avisa o servidor, que deixa de esperar sua atualização.
+            if not self.training_finished:
+                self.client.publish(self.offline_topic, json.dumps({'client_id': self.client_id, 'reason': 'leave'}), qos=1)
+            # Encerra a thread de trabalho depois da mensagem em andamento (é daemon: uma rodada de treinamento
+            # interrompida não impede a saída do processo).
+            self.work_queue.put(None)
+            if self.worker is not None:
+                self.worker.join(timeout=5)
+            # Para o loop de rede do cliente MQTT.
+            self.client.loop_stop()
+            # Desconecta o cliente do broker MQTT.
+            self.client.disconnect()
+            print(f"Client {self.client_id}: Encerrado.") # NOVO: Mensagem de encerramento.
+
+# Ponto de entrada da linha de comando (python -m clients.client ou fedavg-client).
+def main():
+    # Lê os argumentos de linha de comando (uso: python -m clients.client <client_id> <num_epochs> [--model NOME]).
+    parser = argparse.ArgumentParser(description="Cliente de aprendizado federado.")
+    parser.add_argument("client_id", type=int, help="ID do cliente (começando em 0).")
+    parser.add_argument("num_epochs", type=int, help="Número de épocas de treinamento local por rodada.")
+    parser.add_argument("--model", default="cnn", choices=available_models(), help="Modelo do registro (deve ser o mesmo do servidor).")
+    # Opções do modo de treinamento acelerado.
+    parser.add_argument("--compile", action="store_true", help="Compila o modelo com torch.compile.")
+    parser.add_argument("--channels-last", action="store_true", help="Usa o formato de memória channels_last nas entradas.")
+    parser.add_argument("--cpu-budget", type=int, default=None, help="Núcleos reservados ao cliente (limita as threads do PyTorch).")
+    parser.add_argument("--cpu-affinity", type=int, nargs="+", default=None, help="Núcleos aos quais o cliente é fixado (Linux).")
+    parser.add_argument("--momentum", type=float, default=0.0, help="Momentum do SGD (zerado a cada rodada, exceto com --carry-momentum).")
+    parser.add_argument("--bf16", action="store_true", help="Treina com precisão mista bfloat16 (autocast na CPU).")
+    parser.add_argument("--no-augment", dest="augment", action="store_false", help="Treina sem recorte e espelhamento aleatórios.")
+    # Profiling opcional: traces Chrome por rodada, captura do torch.profiler e dumps do cProfile.
+    parser.add_argument("--profile-dir", default=None, help="Pasta para os traces de profiling por rodada.")
+    parser.add_argument("--torch-profile-round", type=int, default=None, help="Rodada capturada com torch.profiler.")
+    parser.add_argument("--cprofile", action="store_true", help="Grava um dump do cProfile por rodada.")
+    # Topologia hierárquica: conecta o cliente ao grupo de um agregador de borda (server/edge_aggregator.py).
+    parser.add_argument("--edge", type=int, default=None, help="ID do agregador de borda do cliente (padrão: servidor raiz).")
+    # Cache local para reinícios rápidos.
+    parser.add_argument("--cache-dir", default=None, help="Pasta do cache local do cliente (padrão: clients/client_<id>/cache/).")
+    parser.add_argument("--no-cache", action="store_true", help="Desativa o cache local.")
+    parser.add_argument("--heartbeat-interval", type=float, default=10.0, help="Segundos entre heartbeats enviados ao servidor.")
+    parser.add_argument("--secure-aggregation", action="store_true", help="Permite a agregação segura (atualizações mascaradas).")
+    parser.add_argument("--local-layers", nargs="+", default=None, help="Camadas personalizadas mantidas no cliente (as mesmas do servidor).")
+    parser.add_argument("--carry-momentum", action="store_true", help="Mantém o momentum do SGD entre rodadas (e no cache local).")
+    parser.add_argument("--memory-census", type=int, default=0, help="Conta os tensores vivos a cada N rodadas (0 = desativado).")
+    args = parser.parse_args()
+
+    # Cria uma instância do Cliente e a inicia.
+    client_instance = Client(client_id=args.client_id, epochs=args.num_epochs, model_name=args.model,
+                             compile_model=args.compile, channels_last=args.channels_last,
+                             cpu_budget=args.cpu_budget, momentum=args.momentum, mixed_precision=args.bf16,
+                             augment=args.augment, memory_census_interval=args.memory_census,
+                             carry_momentum=args.carry_momentum,
+                             profile_dir=args.profile_dir, torch_profile_round=args.torch_profile_round,
+                             cprofile=args.cprofile,
+                             topic_prefix=f"edge/{args.edge}/" if args.edge is not None else "",
+                             cache_dir=None if args.no_cache else (args.cache_dir or os.path.join(client_dir(args.client_id), "cache")),
+                             heartbeat_interval=args.heartbeat_interval, cpu_affinity=args.cpu_affinity,
+                             secure_aggregation=args.secure_aggregation, local_layers=args.local_layers)
+    client_instance.start()
+
+# Bloco executado apenas se o script for rodado diretamente.
+if __name__ == "__main__":
+    main()
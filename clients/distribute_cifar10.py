@@ -1,12 +1,10 @@
 # clients/distribute_cifar10.py
 
-import torch
-from torchvision.datasets import CIFAR10
-from torch.utils.data import DataLoader, Dataset
-import torchvision.transforms as transforms
+from torch.utils.data import Dataset
 import os
 import numpy as np
 import pickle
+import argparse
 
 # Define uma classe CustomSubset que permite criar um subconjunto de um Dataset PyTorch
 # usando uma lista específica de índices.
@@ -24,8 +22,33 @@ class CustomSubset(Dataset):
     def __len__(self):
         return len(self.indices)
 
+# Unpickler dos shards gerados por este script. Executado diretamente, o script grava a classe como
+# '__main__.CustomSubset' (e versões antigas, como 'distribute_cifar10.CustomSubset'); os dois nomes são
+# mapeados para a classe deste módulo, sem depender de sys.path nem do módulo __main__ de quem carrega.
+class ShardUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if name == 'CustomSubset' and module in ('__main__', 'distribute_cifar10', 'clients.distribute_cifar10'):
+            return CustomSubset
+        return super().find_class(module, name)
+
+# Carrega o shard (CustomSubset sobre o CIFAR-10) gravado em 'path'. O torchvision é importado pelo
+# próprio pickle apenas neste momento, quando o dataset é realmente desserializado.
+def load_shard(path):
+    with open(path, 'rb') as f:
+        return ShardUnpickler(f).load()
+
+# Caminho do conjunto de validação local gravado ao lado do shard de treino 'shard_path'.
+def holdout_path(shard_path):
+    root, ext = os.path.splitext(shard_path)
+    return f"{root}_holdout{ext}"
+
 # Função para distribuir o dataset CIFAR-10 de forma IID (independentemente e identicamente distribuída).
-def distribute_cifar10_iid(num_clients, output_base_dir='./clients'):
+# Uma fração 'holdout_fraction' das amostras de cada cliente é separada como conjunto de validação local
+# (avaliação federada, ver Client.evaluate) e gravada em cifar10_client_<id>_holdout.pkl.
+def distribute_cifar10_iid(num_clients, output_base_dir='./clients', holdout_fraction=0.1):
+    # O torchvision só é importado quando o dataset precisa ser baixado e dividido.
+    from torchvision.datasets import CIFAR10
+    import torchvision.transforms as transforms
     # Define as transformações a serem aplicadas às imagens:
     # Apenas converte a imagem para um tensor PyTorch.
     transform = transforms.Compose([transforms.ToTensor()])
@@ -66,12 +89,20 @@ def distribute_cifar10_iid(num_clients, output_base_dir='./clients'):
 
     # Loop para criar e salvar o dataset específico para cada cliente.
     for i in range(num_clients):
+        # Separa o conjunto de validação local (as primeiras amostras da fatia, já embaralhada).
+        num_holdout = int(len(client_data_indices[i]) * holdout_fraction)
+        holdout_indices = client_data_indices[i][:num_holdout]
+        client_data_indices[i] = client_data_indices[i][num_holdout:]
         # Cria um CustomSubset usando os índices atribuídos ao cliente.
         client_dataset = CustomSubset(full_dataset, client_data_indices[i])
+        shard_path = os.path.join(output_base_dir, f'client_{i}', 'data', f'cifar10_client_{i}.pkl')
         # Abre um arquivo em modo binário de escrita para salvar o dataset do cliente.
-        with open(os.path.join(output_base_dir, f'client_{i}', 'data', f'cifar10_client_{i}.pkl'), 'wb') as f:
+        with open(shard_path, 'wb') as f:
             # Serializa o objeto CustomSubset e o salva no arquivo.
             pickle.dump(client_dataset, f)
+        if holdout_indices:
+            with open(holdout_path(shard_path), 'wb') as f:
+                pickle.dump(CustomSubset(full_dataset, holdout_indices), f)
         
         # Opcional: Verifica e imprime a distribuição de classes para cada cliente
         # para confirmar que a distribuição IID funciona (classes bem misturadas).
@@ -79,13 +110,21 @@ def distribute_cifar10_iid(num_clients, output_base_dir='./clients'):
         unique_labels, counts = np.unique(client_labels, return_counts=True)
         label_distribution = dict(zip(unique_labels, counts))
         
-        print(f"Client {i}: {len(client_dataset)} samples assigned. Label distribution (counts): {label_distribution}")
+        print(f"Client {i}: {len(client_dataset)} samples assigned ({len(holdout_indices)} held out). Label distribution (counts): {label_distribution}")
 
     print("Distribuição do dataset CIFAR-10 (IID) concluída.")
 
+# Ponto de entrada da linha de comando (python -m clients.distribute_cifar10 ou fedavg-distribute).
+def main():
+    parser = argparse.ArgumentParser(description="Distribui o CIFAR-10 (IID) entre os clientes.")
+    # Define o número de clientes (3 por padrão).
+    parser.add_argument("--clients", type=int, default=3, help="Número de clientes.")
+    parser.add_argument("--output-dir", default="./clients", help="Pasta com as pastas client_<id>/ dos clientes.")
+    parser.add_argument("--holdout-fraction", type=float, default=0.1, help="Fração das amostras de cada cliente separada para validação local.")
+    args = parser.parse_args()
+    # Chama a função para distribuir os dados.
+    distribute_cifar10_iid(args.clients, args.output_dir, args.holdout_fraction)
+
 # Bloco executado apenas se o script for rodado diretamente (não importado como módulo).
 if __name__ == "__main__":
-    # Define o número de clientes. Pode ser ajustado aqui ou passado como argumento.
-    num_clients = 3
-    # Chama a função para distribuir os dados.
-    distribute_cifar10_iid(num_clients)
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,97 @@
+# clients/launcher.py
+#
+# Inicia vários clientes (clients/client.py) no mesmo host, cada um em seu próprio processo, fixado a um
+# conjunto disjunto de núcleos (afinidade de CPU) e com as threads do PyTorch/OpenMP limitadas a esse
+# conjunto, para que clientes vizinhos não disputem os mesmos núcleos.
+# Antes de iniciar os processos, o launcher prepara, um de cada vez, o cache de cada cliente (shard
+# decodificado em tensores, ver common/client_cache.py). Cada cliente então mapeia seu shard com mmap,
+# somente leitura, em vez de decodificar o pickle, e as páginas ficam compartilhadas pelo cache do sistema.
+#
+# Uso: python -m clients.launcher --clients 0 1 2 --epochs 5 [--cores-per-client 2] [opções do cliente...]
+# Opções não reconhecidas (ex.: --model resnet20 --edge 0) são repassadas a todos os clientes.
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+
+CLIENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Raiz do projeto (pasta que contém os pacotes 'clients' e 'common').
+ROOT_DIR = os.path.dirname(CLIENTS_DIR)
+
+# Núcleos disponíveis para este processo (todos, fora do Linux).
+def available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+# Divide os núcleos disponíveis em blocos contíguos de 'cores_per_client' (padrão: divisão igual).
+# Com mais clientes do que núcleos, os blocos se repetem circularmente.
+def assign_cores(num_clients, cores_per_client=None, cores=None):
+    cores = cores or available_cores()
+    if cores_per_client is None:
+        cores_per_client = max(1, len(cores) // num_clients)
+    if num_clients * cores_per_client > len(cores):
+        print(f"Launcher: {num_clients} clientes x {cores_per_client} núcleos excedem os {len(cores)} disponíveis; núcleos serão compartilhados.")
+    return [[cores[(i * cores_per_client + j) % len(cores)] for j in range(cores_per_client)]
+            for i in range(num_clients)]
+
+# Decodifica o shard de cada cliente para o seu cache, se ainda não estiver lá.
+def prepare_caches(client_ids):
+    from common.client_cache import ClientCache
+    from clients.distribute_cifar10 import load_shard, holdout_path
+    for client_id in client_ids:
+        folder = os.path.join(CLIENTS_DIR, f'client_{client_id}')
+        data_path = os.path.join(folder, 'data', f'cifar10_client_{client_id}.pkl')
+        if not os.path.exists(data_path):
+            print(f"Launcher: Shard do cliente {client_id} não encontrado em {data_path}; o cliente vai reportar o erro.")
+            continue
+        cache = ClientCache(os.path.join(folder, 'cache'))
+        # Shard de treino e, se existir, o conjunto de validação local.
+        for name, path in (('shard', data_path), ('holdout', holdout_path(data_path))):
+            if os.path.exists(path) and cache.load_dataset(path, name) is None:
+                dataset = load_shard(path)
+                cache.save_dataset(dataset, path, name)
+                print(f"Launcher: Cache '{name}' do cliente {client_id} preparado ({len(dataset)} amostras).")
+
+# Inicia os clientes e espera todos terminarem. Retorna o maior código de saída.
+def launch(client_ids, epochs, client_args, cores_per_client=None, pin=True):
+    assignments = assign_cores(len(client_ids), cores_per_client)
+    processes = []
+    for client_id, cores in zip(client_ids, assignments):
+        command = [sys.executable, '-m', 'clients.client', str(client_id), str(epochs), '--cpu-budget', str(len(cores))]
+        if pin:
+            command += ['--cpu-affinity', *map(str, cores)]
+        # Limita também os pools de threads nativos inicializados antes do PyTorch (OpenMP/MKL).
+        env = dict(os.environ, OMP_NUM_THREADS=str(len(cores)), MKL_NUM_THREADS=str(len(cores)))
+        # Os pacotes do projeto ficam importáveis pelos clientes mesmo sem 'pip install'.
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT_DIR, env.get('PYTHONPATH')]))
+        processes.append(subprocess.Popen(command + client_args, env=env))
+        print(f"Launcher: Cliente {client_id} iniciado (PID {processes[-1].pid}, núcleos {cores if pin else len(cores)}).")
+    try:
+        return max(process.wait() for process in processes)
+    except KeyboardInterrupt:
+        # Repassa a interrupção: cada cliente avisa o servidor que saiu (ver Client.start).
+        for process in processes:
+            if process.poll() is None:
+                process.send_signal(signal.SIGINT)
+        return max(process.wait() for process in processes)
+
+# Ponto de entrada da linha de comando (python -m clients.launcher ou fedavg-launcher).
+def main():
+    parser = argparse.ArgumentParser(description="Inicia vários clientes de aprendizado federado no mesmo host.")
+    parser.add_argument("--clients", type=int, nargs="+", required=True, help="IDs dos clientes a iniciar.")
+    parser.add_argument("--epochs", type=int, required=True, help="Número de épocas de treinamento local por rodada.")
+    parser.add_argument("--cores-per-client", type=int, default=None, help="Núcleos por cliente (padrão: divisão igual dos disponíveis).")
+    parser.add_argument("--no-pin", action="store_true", help="Não fixa a afinidade de CPU (apenas limita as threads).")
+    parser.add_argument("--no-prepare-cache", action="store_true", help="Não prepara o cache dos shards antes de iniciar os clientes.")
+    args, client_args = parser.parse_known_args()
+
+    # Sem cache (ou com uma pasta de cache única para todos), cada cliente decodifica o próprio shard.
+    if not args.no_prepare_cache and '--no-cache' not in client_args and '--cache-dir' not in client_args:
+        prepare_caches(args.clients)
+    sys.exit(launch(args.clients, args.epochs, client_args, args.cores_per_client, pin=not args.no_pin))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+# common/__init__.py
+#
+# Módulos compartilhados pelo servidor, pelos agregadores de borda e pelos clientes.
@@ -0,0 +1,111 @@
+# common/aggregation.py
+
+import torch
+
+# Regras de agregação compartilhadas pelo servidor raiz e pelos agregadores de borda.
+#
+# Todas recebem a matriz de atualizações 'updates' ([clientes x parâmetros], uma linha por cliente
+# da rodada), os pesos 'weights' (número de amostras de cada linha) e o vetor de saída 'out', e
+# retornam a soma dos pesos das linhas usadas. As regras robustas processam a matriz em blocos de
+# 'chunk_size' colunas, de modo que a memória temporária fica limitada a [clientes x chunk_size].
+
+# Número padrão de colunas (parâmetros) por bloco nas regras robustas.
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+# FedAvg ponderado: média das linhas de 'updates' com pesos proporcionais a 'weights'
+# (linhas com peso 0 são ignoradas). 'weights' é normalizado no lugar e o resultado é escrito
+# em 'out' com um único produto vetor-matriz.
+def fedavg(updates, weights, out):
+    total = weights.sum().item()
+    if total <= 0:
+        raise ValueError("a soma dos pesos da agregação deve ser positiva")
+    weights.div_(total)
+    torch.matmul(weights, updates, out=out)
+    return total
+
+# Mediana coordenada a coordenada (média dos dois valores centrais quando o número de clientes é par).
+# Não usa os pesos: um cliente não pode deslocar a mediana informando muitas amostras.
+def coordinate_median(updates, weights, out, chunk_size=DEFAULT_CHUNK_SIZE):
+    num_clients = updates.shape[0]
+    low, high = (num_clients - 1) // 2, num_clients // 2
+    for start in range(0, updates.shape[1], chunk_size):
+        values = updates[:, start:start + chunk_size].sort(dim=0).values
+        torch.add(values[low], values[high], out=out[start:start + chunk_size]).mul_(0.5)
+    return weights.sum().item()
+
+# Média aparada coordenada a coordenada: descarta os 'trim_ratio' maiores e menores valores de cada
+# coordenada e tira a média dos restantes (também sem pesos, pelo mesmo motivo da mediana).
+def trimmed_mean(updates, weights, out, trim_ratio=0.1, chunk_size=DEFAULT_CHUNK_SIZE):
+    num_clients = updates.shape[0]
+    trim = int(trim_ratio * num_clients)
+    if num_clients - 2 * trim < 1:
+        raise ValueError(f"trim_ratio={trim_ratio} descarta todos os {num_clients} clientes")
+    for start in range(0, updates.shape[1], chunk_size):
+        values = updates[:, start:start + chunk_size].sort(dim=0).values
+        torch.mean(values[trim:num_clients - trim], dim=0, out=out[start:start + chunk_size])
+    return weights.sum().item()
+
+# Índices das linhas escolhidas pelo Multi-Krum: cada cliente recebe como escore a soma das distâncias
+# quadráticas aos seus (n - f - 2) vizinhos mais próximos, e os 'num_selected' de menor escore são
+# escolhidos. As distâncias vêm da matriz de Gram (||xi - xj||² = Gii + Gjj - 2Gij), acumulada por blocos
+# de colunas em float64 (evita o cancelamento numérico da subtração).
+def krum_select(updates, byzantine=None, num_selected=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    num_clients = updates.shape[0]
+    # O Krum exige n > 2f + 2.
+    if byzantine is None:
+        byzantine = max(0, (num_clients - 3) // 2)
+    if num_clients <= 2 * byzantine + 2:
+        raise ValueError(f"Krum com f={byzantine} exige mais de {2 * byzantine + 2} clientes (recebidos {num_clients})")
+    if num_selected is None:
+        num_selected = num_clients - byzantine
+    gram = torch.zeros(num_clients, num_clients, dtype=torch.float64)
+    for start in range(0, updates.shape[1], chunk_size):
+        block = updates[:, start:start + chunk_size].double()
+        gram.addmm_(block, block.t())
+    norms = gram.diagonal()
+    distances = (norms.unsqueeze(0) + norms.unsqueeze(1) - 2 * gram).clamp_(min=0)
+    # Exclui a distância de cada cliente a si mesmo.
+    distances.fill_diagonal_(float('inf'))
+    neighbours = num_clients - byzantine - 2
+    scores = distances.topk(neighbours, dim=1, largest=False).values.sum(dim=1)
+    return scores.topk(num_selected, largest=False).indices
+
+# Multi-Krum: FedAvg ponderado apenas sobre os clientes escolhidos por krum_select.
+def multi_krum(updates, weights, out, byzantine=None, num_selected=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    selected = krum_select(updates, byzantine, num_selected, chunk_size)
+    mask = torch.zeros_like(weights)
+    mask[selected] = 1
+    weights.mul_(mask)
+    return fedavg(updates, weights, out)
+
+# Registro das regras de agregação selecionáveis pelo nome.
+AGGREGATORS = {
+    'fedavg': fedavg,
+    'median': coordinate_median,
+    'trimmed_mean': trimmed_mean,
+    'krum': multi_krum,
+}
+
+# Retorna os nomes das regras de agregação disponíveis.
+def available_aggregators():
+    return sorted(AGGREGATORS)
+
+# Número mínimo de atualizações por rodada que a regra 'name' aceita com as opções dadas. Opções que
+# nenhum número de clientes satisfaz (ex.: trim_ratio >= 0.5) geram ValueError.
+def min_updates(name, trim_ratio=0.1, byzantine=None, **options):
+    if name == 'trimmed_mean':
+        # Com trim_ratio < 0.5 sempre sobra ao menos uma linha: n - 2 * int(trim_ratio * n) >= 1.
+        if not 0 <= trim_ratio < 0.5:
+            raise ValueError(f"trim_ratio deve estar em [0, 0.5) (recebido {trim_ratio})")
+    elif name == 'krum':
+        if byzantine is not None and byzantine < 0:
+            raise ValueError(f"byzantine deve ser >= 0 (recebido {byzantine})")
+        # n > 2f + 2 (com f padrão, (n - 3) // 2, o mínimo é 3).
+        return 2 * (byzantine or 0) + 3
+    return 1
+
+# Aplica a regra 'name' (opções adicionais, como trim_ratio ou byzantine, são repassadas a ela).
+def aggregate(name, updates, weights, out, **options):
+    if name not in AGGREGATORS:
+        raise ValueError(f"Agregador desconhecido '{name}'. Disponíveis: {', '.join(available_aggregators())}")
+    return AGGREGATORS[name](updates, weights, out, **options)
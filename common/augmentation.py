@@ -0,0 +1,66 @@
+# common/augmentation.py
+
+import torch
+
+# Aumento de dados em lote, sobre tensores: aplicado pelo cliente a cada batch de treino do shard já
+# decodificado (recorte aleatório com preenchimento, espelhamento horizontal e normalização por canal), em
+# vez de transformações PIL amostra a amostra no DataLoader.
+#
+# O recorte e o espelhamento de todo o batch são uma única indexação avançada sobre uma cópia do batch com
+# bordas de zeros (buffer reaproveitado entre batches): cada amostra tem seu deslocamento e, quando
+# espelhada, lê as colunas em ordem inversa. O resultado já sai no formato channels_last.
+# A normalização também precisa ser aplicada na avaliação (validação local e modelo global), para que as
+# entradas tenham a mesma distribuição do treino.
+
+# Média e desvio padrão por canal do conjunto de treino do CIFAR-10 (imagens em [0, 1]).
+CIFAR10_MEAN = (0.4914, 0.4822, 0.4465)
+CIFAR10_STD = (0.2470, 0.2435, 0.2616)
+# Normalização das entradas usada pelos clientes (BatchAugmenter padrão). O servidor a grava junto com o
+# modelo global salvo, para que a avaliação use a mesma (modelos de versões anteriores, sem o registro,
+# foram treinados com entradas em [0, 1]).
+INPUT_NORMALIZATION = {'mean': list(CIFAR10_MEAN), 'std': list(CIFAR10_STD)}
+
+class BatchAugmenter:
+    # 'padding' = 0 e 'flip' = False desativam o aumento; a normalização é sempre aplicada.
+    def __init__(self, padding=4, flip=True, mean=CIFAR10_MEAN, std=CIFAR10_STD):
+        self.padding = padding
+        self.flip = flip
+        self.mean = torch.tensor(mean).view(1, -1, 1, 1)
+        self.std = torch.tensor(std).view(1, -1, 1, 1)
+        # Batch com bordas de zeros (as bordas nunca são escritas; só o centro muda a cada batch).
+        self.padded = None
+
+    # Só batches de imagens [B, C, H, W] com os canais esperados são transformados.
+    def _applies(self, images):
+        return images.dim() == 4 and images.shape[1] == self.mean.shape[1]
+
+    # Batch normalizado por canal (nova cópia).
+    def normalize(self, images):
+        if not self._applies(images):
+            return images
+        return (images - self.mean) / self.std
+
+    # Batch de treino aumentado e normalizado (nova cópia; o shard não é alterado).
+    def __call__(self, images):
+        if not self._applies(images):
+            return images
+        if self.padding == 0 and not self.flip:
+            return self.normalize(images)
+        b, c, h, w = images.shape
+        p = self.padding
+        if self.padded is None or self.padded.shape[0] < b or self.padded.shape[1:] != (c, h + 2 * p, w + 2 * p):
+            self.padded = images.new_zeros(b, c, h + 2 * p, w + 2 * p)
+        padded = self.padded[:b]
+        padded[:, :, p:p + h, p:p + w] = images
+
+        # Linhas e colunas lidas por amostra ([B, H] e [B, W]): deslocamento aleatório em [0, 2p] e, com o
+        # espelhamento, as colunas da janela em ordem inversa.
+        rows = torch.randint(0, 2 * p + 1, (b, 1)) + torch.arange(h)
+        cols = torch.arange(w).expand(b, w)
+        if self.flip:
+            cols = torch.where(torch.rand(b, 1) < 0.5, (w - 1) - cols, cols)
+        cols = cols + torch.randint(0, 2 * p + 1, (b, 1))
+        # A indexação produz [B, H, W, C]; a permutação volta a [B, C, H, W] (em channels_last, sem cópia).
+        batch = torch.arange(b).view(b, 1, 1)
+        out = padded[batch, :, rows[:, :, None], cols[:, None, :]].permute(0, 3, 1, 2)
+        return out.sub_(self.mean).div_(self.std)
@@ -0,0 +1,99 @@
+# common/client_cache.py
+
+import os
+
+import torch
+from torch.utils.data import TensorDataset
+
+# Cache local de um cliente, para que um processo reiniciado volte a participar rapidamente:
+#   shard.pt      shard de dados já decodificado em tensores (imagens e rótulos), carregado com mmap
+#   holdout.pt    conjunto de validação local, no mesmo formato
+#   model.pt      último modelo global recebido (buffer plano), com a rodada e a versão
+#   optimizer.pt  estado do otimizador após o último treinamento (só quando o momentum é mantido entre rodadas)
+#   local.pt      camadas locais (personalizadas) após o último treinamento
+# Cada arquivo é gravado em um arquivo temporário e renomeado, de modo que uma interrupção
+# durante a escrita nunca deixa um cache corrompido.
+class ClientCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.shard_path = os.path.join(cache_dir, 'shard.pt')
+        self.model_path = os.path.join(cache_dir, 'model.pt')
+        self.optimizer_path = os.path.join(cache_dir, 'optimizer.pt')
+        self.local_path = os.path.join(cache_dir, 'local.pt')
+
+    def _save(self, obj, path):
+        tmp_path = f"{path}.tmp"
+        torch.save(obj, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _load(self, path, mmap=False):
+        if not os.path.exists(path):
+            return None
+        try:
+            if mmap:
+                try:
+                    # Mapeia os tensores do arquivo em memória em vez de lê-los (PyTorch >= 2.1).
+                    return torch.load(path, mmap=True, weights_only=True)
+                except TypeError:
+                    pass
+            return torch.load(path)
+        except Exception as e:
+            # Um cache ilegível é tratado como ausente (será regravado).
+            print(f"Cache: Ignorando {path}: {e}")
+            return None
+
+    # Identifica a versão do arquivo de origem do shard (o cache é invalidado se ele mudar).
+    @staticmethod
+    def _source_signature(source_path):
+        stat = os.stat(source_path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    # Arquivo do dataset 'name' ('shard' para o treino, 'holdout' para a validação local).
+    def _dataset_path(self, name):
+        return self.shard_path if name == 'shard' else os.path.join(self.cache_dir, f'{name}.pt')
+
+    # Retorna o dataset 'name' em cache como TensorDataset, ou None se não houver cache válido para 'source_path'.
+    def load_dataset(self, source_path, name='shard'):
+        cached = self._load(self._dataset_path(name), mmap=True)
+        if cached is None or cached.get('source') != self._source_signature(source_path):
+            return None
+        return TensorDataset(cached['images'], cached['labels'])
+
+    # Decodifica todas as amostras do dataset em tensores e grava o shard; retorna o TensorDataset equivalente.
+    def save_dataset(self, dataset, source_path, name='shard'):
+        samples = [dataset[i] for i in range(len(dataset))]
+        images = torch.stack([image for image, _ in samples])
+        labels = torch.tensor([label for _, label in samples], dtype=torch.long)
+        self._save({'source': self._source_signature(source_path), 'images': images, 'labels': labels},
+                   self._dataset_path(name))
+        return TensorDataset(images, labels)
+
+    # Retorna (buffer plano, rodada, versão) do último modelo global em cache, ou None se não houver
+    # um modelo compatível com 'model_name' e 'numel'.
+    def load_model(self, model_name, numel):
+        cached = self._load(self.model_path)
+        if cached is None or cached.get('model') != model_name or cached['flat'].numel() != numel:
+            return None
+        return cached['flat'], cached['round'], cached['version']
+
+    # Grava o modelo global recebido ('flat' é um array/tensor float32 1-D).
+    def save_model(self, flat, round_num, version, model_name):
+        self._save({'model': model_name, 'round': round_num, 'version': version,
+                    'flat': torch.as_tensor(flat).clone()}, self.model_path)
+
+    # Retorna os valores das camadas locais em cache (tensor 1-D), ou None se não forem de 'model_name' com 'numel' valores.
+    def load_local(self, model_name, numel):
+        cached = self._load(self.local_path)
+        if cached is None or cached.get('model') != model_name or cached['flat'].numel() != numel:
+            return None
+        return cached['flat']
+
+    def save_local(self, flat, model_name):
+        self._save({'model': model_name, 'flat': torch.as_tensor(flat).clone()}, self.local_path)
+
+    def load_optimizer(self):
+        return self._load(self.optimizer_path)
+
+    def save_optimizer(self, state_dict):
+        self._save(state_dict, self.optimizer_path)
@@ -0,0 +1,112 @@
+# common/client_registry.py
+
+import threading
+import time
+
+# Registro dinâmico dos clientes de um servidor (ou agregador de borda).
+#
+# Um cliente entra no registro pelo sinal de "pronto" (ou por um heartbeat de um cliente desconhecido,
+# por exemplo após o servidor reiniciar) e sai dele por um aviso explícito, pela mensagem de "last will"
+# publicada pelo broker quando a conexão cai, ou por ficar mais de 'heartbeat_timeout' segundos sem
+# dar sinal de vida. Cada cliente traz metadados de capacidade (núcleos, tamanho do shard e vazão medida).
+
+# Estado de um cliente conhecido.
+class ClientInfo:
+    def __init__(self, client_id, capabilities, now):
+        self.client_id = client_id
+        self.capabilities = dict(capabilities or {})
+        self.joined_at = now
+        self.last_seen = now
+        self.online = True
+        # Vazão de treinamento (amostras/s), suavizada entre rodadas.
+        self.samples_per_s = self.capabilities.get('samples_per_s')
+
+    def as_dict(self):
+        return {'client_id': self.client_id, 'online': self.online, 'joined_at': self.joined_at,
+                'last_seen': self.last_seen, 'samples_per_s': self.samples_per_s, 'capabilities': self.capabilities}
+
+class ClientRegistry:
+    # 'throughput_smoothing' é o peso da medição mais recente na média móvel exponencial da vazão.
+    def __init__(self, heartbeat_timeout=30.0, throughput_smoothing=0.5):
+        self.heartbeat_timeout = heartbeat_timeout
+        self.throughput_smoothing = throughput_smoothing
+        self.clients = {}
+        self.lock = threading.Lock()
+
+    # Registra a entrada (ou o retorno) de um cliente. Retorna True se ele não estava online.
+    def join(self, client_id, capabilities=None, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            info = self.clients.get(client_id)
+            if info is None:
+                self.clients[client_id] = ClientInfo(client_id, capabilities, now)
+                return True
+            was_online = info.online
+            info.online = True
+            info.last_seen = now
+            if capabilities:
+                info.capabilities.update(capabilities)
+                if info.samples_per_s is None:
+                    info.samples_per_s = info.capabilities.get('samples_per_s')
+            return not was_online
+
+    # Registra um sinal de vida. Retorna False se o cliente não está online no registro.
+    def seen(self, client_id, now=None):
+        with self.lock:
+            info = self.clients.get(client_id)
+            if info is None or not info.online:
+                return False
+            info.last_seen = time.time() if now is None else now
+            return True
+
+    # Marca o cliente como desconectado. Retorna True se ele estava online.
+    def leave(self, client_id):
+        with self.lock:
+            info = self.clients.get(client_id)
+            if info is None or not info.online:
+                return False
+            info.online = False
+            return True
+
+    # Marca como desconectados os clientes sem sinal de vida há mais de 'heartbeat_timeout' segundos
+    # e retorna seus IDs.
+    def expire(self, now=None):
+        now = time.time() if now is None else now
+        expired = []
+        with self.lock:
+            for info in self.clients.values():
+                if info.online and now - info.last_seen > self.heartbeat_timeout:
+                    info.online = False
+                    expired.append(info.client_id)
+        return expired
+
+    # IDs dos clientes online, em ordem crescente.
+    def online_ids(self):
+        with self.lock:
+            return sorted(client_id for client_id, info in self.clients.items() if info.online)
+
+    def is_online(self, client_id):
+        with self.lock:
+            info = self.clients.get(client_id)
+            return info is not None and info.online
+
+    def get(self, client_id):
+        with self.lock:
+            return self.clients.get(client_id)
+
+    # Atualiza a vazão medida de um cliente (média móvel exponencial).
+    def record_throughput(self, client_id, samples_per_s):
+        with self.lock:
+            info = self.clients.get(client_id)
+            if info is None or not samples_per_s:
+                return
+            if info.samples_per_s is None:
+                info.samples_per_s = samples_per_s
+            else:
+                alpha = self.throughput_smoothing
+                info.samples_per_s = alpha * samples_per_s + (1 - alpha) * info.samples_per_s
+
+    # Cópia serializável do estado de todos os clientes.
+    def snapshot(self):
+        with self.lock:
+            return {client_id: info.as_dict() for client_id, info in self.clients.items()}
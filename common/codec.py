@@ -0,0 +1,165 @@
+# common/codec.py
+
+import hashlib
+import json
+import struct
+import zlib
+
+import numpy as np
+
+# Formato das mensagens de parâmetros trocadas via MQTT:
+#   [4 bytes: tamanho do cabeçalho][cabeçalho JSON][corpo binário]
+# O corpo é o buffer plano do modelo (float32, ordem nativa), enviado sem pickle.
+HEADER_LENGTH = struct.Struct('!I')
+# Tipo dos valores do buffer plano.
+FLAT_DTYPE = 'float32'
+FLAT_ITEMSIZE = np.dtype(FLAT_DTYPE).itemsize
+# Codificações do corpo de uma mensagem de parâmetros (campo 'encoding' do cabeçalho):
+#   'full'  o corpo é o modelo plano completo (padrão, também assumido se o campo estiver ausente)
+#   'none'  sem corpo: o destinatário já tem o modelo identificado por 'version'
+#   'xor_zlib'  o corpo é o XOR bit a bit (como uint32) entre o modelo e o modelo 'base_version',
+#               comprimido com zlib. É sem perdas, e os bits de sinal/expoente que não mudaram entre
+#               as versões viram zeros que comprimem bem.
+#   'q8_zlib'   o corpo é um delta quantizado em int8 em relação ao modelo 'base_version': uma escala
+#               float32 por bloco de 'block_size' valores seguida dos valores int8, comprimidos com zlib.
+#               É com perdas; o modelo resultante é identificado pelo hash em 'version'.
+#   'secagg_u32'  atualização da agregação segura: o modelo ponderado em ponto fixo (uint32, 'scale' unidades
+#                 por 1.0) somado às máscaras pareadas da rodada (ver common/secure_aggregation.py). Só a
+#                 soma das atualizações de todos os participantes é legível.
+ENCODING_FULL = 'full'
+ENCODING_NONE = 'none'
+ENCODING_XOR_ZLIB = 'xor_zlib'
+ENCODING_Q8_ZLIB = 'q8_zlib'
+ENCODING_SECAGG_U32 = 'secagg_u32'
+
+# Monta uma mensagem a partir de um cabeçalho (dicionário serializável em JSON) e de um corpo bytes-like.
+# O corpo é copiado uma única vez, diretamente para a mensagem final.
+def encode_message(header, body=b''):
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    return b''.join((HEADER_LENGTH.pack(len(header_bytes)), header_bytes, body))
+
+# Separa uma mensagem em (cabeçalho, corpo). O corpo é uma memoryview sobre a payload (sem cópia).
+def decode_message(payload):
+    view = memoryview(payload)
+    if len(view) < HEADER_LENGTH.size:
+        raise ValueError("Mensagem truncada: cabeçalho ausente.")
+    (header_length,) = HEADER_LENGTH.unpack_from(view)
+    body_start = HEADER_LENGTH.size + header_length
+    if len(view) < body_start:
+        raise ValueError("Mensagem truncada: cabeçalho incompleto.")
+    header = json.loads(bytes(view[HEADER_LENGTH.size:body_start]))
+    return header, view[body_start:]
+
+# Versão de um modelo plano: hash curto do conteúdo (modelos iguais têm a mesma versão).
+def model_version(flat_bytes):
+    return hashlib.blake2b(memoryview(flat_bytes).cast('B'), digest_size=8).hexdigest()
+
+# Codifica um modelo plano (memoryview de bytes, ver FederatedModule.export_flat) com o cabeçalho informado.
+def encode_parameters(flat_bytes, **header):
+    nbytes = memoryview(flat_bytes).nbytes
+    header.update(dtype=FLAT_DTYPE, numel=nbytes // FLAT_ITEMSIZE, encoding=ENCODING_FULL)
+    return encode_message(header, flat_bytes)
+
+# Mensagem sem corpo indicando que o destinatário já tem o modelo 'version' (de 'numel' valores).
+def encode_unchanged(numel, version, **header):
+    header.update(dtype=FLAT_DTYPE, numel=numel, encoding=ENCODING_NONE, version=version)
+    return encode_message(header)
+
+# Codifica 'flat_bytes' como delta XOR em relação ao modelo 'base_bytes' (mesmo tamanho), versão 'base_version'.
+def encode_xor_delta(flat_bytes, base_bytes, base_version, level=1, **header):
+    current = np.frombuffer(flat_bytes, dtype=np.uint32)
+    base = np.frombuffer(base_bytes, dtype=np.uint32)
+    if current.size != base.size:
+        raise ValueError(f"Modelo base com {base.size} valores, esperados {current.size}.")
+    body = zlib.compress(np.bitwise_xor(current, base), level)
+    header.update(dtype=FLAT_DTYPE, numel=int(current.size), encoding=ENCODING_XOR_ZLIB, base_version=base_version)
+    return encode_message(header, body)
+
+# Aplica no lugar um delta XOR (corpo de uma mensagem 'xor_zlib') ao modelo base 'target' (array float32).
+def apply_xor_delta(body, target):
+    delta = np.frombuffer(zlib.decompress(body), dtype=np.uint32)
+    if delta.size != target.size:
+        raise ValueError(f"Delta com {delta.size} valores, esperados {target.size}.")
+    bits = target.view(np.uint32)
+    np.bitwise_xor(bits, delta, out=bits)
+    return target
+
+# Reconstrói em 'out' o modelo de uma mensagem delta ('xor_zlib' ou 'q8_zlib') a partir do modelo base
+# 'base' (arrays float32 do mesmo tamanho). 'base' nunca é alterado; retorna False se o hash do resultado
+# não confere com a 'version' do cabeçalho (o destinatário deve então pedir o modelo completo). Um corpo
+# inválido gera ValueError, KeyError ou zlib.error.
+def apply_delta(header, body, base, out):
+    encoding = header.get('encoding')
+    if encoding not in (ENCODING_XOR_ZLIB, ENCODING_Q8_ZLIB):
+        raise ValueError(f"Codificação '{encoding}' não é um delta.")
+    np.copyto(out, base)
+    if encoding == ENCODING_XOR_ZLIB:
+        apply_xor_delta(body, out)
+    else:
+        quantized, scales = decode_q8_delta(header, body)
+        dequantize_add_q8(quantized, scales, header['block_size'], out)
+    return model_version(out) == header.get('version')
+
+# Quantiza um delta float32 em int8 por blocos de 'block_size' valores (escala = máximo absoluto / 127).
+# Retorna (valores int8, escalas float32 por bloco).
+def quantize_q8(delta, block_size):
+    numel = delta.size
+    num_blocks = -(-numel // block_size)
+    padded = np.zeros(num_blocks * block_size, dtype=np.float32)
+    padded[:numel] = delta
+    blocks = padded.reshape(num_blocks, block_size)
+    scales = (np.abs(blocks).max(axis=1) / 127).astype(np.float32)
+    divisors = np.where(scales > 0, scales, np.float32(1))
+    quantized = np.clip(np.rint(blocks / divisors[:, None]), -127, 127).astype(np.int8)
+    return quantized.reshape(-1)[:numel], scales
+
+# Soma no lugar o delta quantizado (valores int8 e escalas) ao modelo 'target' (array float32).
+# Servidor e clientes usam esta mesma função, então o modelo reconstruído é idêntico nos dois lados.
+def dequantize_add_q8(quantized, scales, block_size, target):
+    numel = target.size
+    padded = np.zeros(scales.size * block_size, dtype=np.float32)
+    padded[:numel] = quantized
+    target += (padded.reshape(scales.size, block_size) * scales[:, None]).reshape(-1)[:numel]
+    return target
+
+# Codifica um delta quantizado (ver quantize_q8) em relação ao modelo 'base_version'.
+def encode_q8_delta(quantized, scales, block_size, base_version, level=1, **header):
+    compressor = zlib.compressobj(level)
+    body = compressor.compress(scales) + compressor.compress(quantized) + compressor.flush()
+    header.update(dtype=FLAT_DTYPE, numel=int(quantized.size), encoding=ENCODING_Q8_ZLIB,
+                  base_version=base_version, block_size=block_size)
+    return encode_message(header, body)
+
+# Decodifica o corpo de uma mensagem 'q8_zlib' em (valores int8, escalas float32).
+def decode_q8_delta(header, body):
+    numel, block_size = header['numel'], header['block_size']
+    num_blocks = -(-numel // block_size)
+    raw = zlib.decompress(body)
+    if len(raw) != num_blocks * FLAT_ITEMSIZE + numel:
+        raise ValueError(f"Delta quantizado com {len(raw)} bytes não corresponde a {numel} valores.")
+    scales = np.frombuffer(raw, dtype=np.float32, count=num_blocks)
+    quantized = np.frombuffer(raw, dtype=np.int8, offset=num_blocks * FLAT_ITEMSIZE)
+    return quantized, scales
+
+# Codifica uma atualização mascarada (vetor uint32, ver PairwiseMasker.mask) com escala de ponto fixo 'scale'.
+def encode_masked_update(masked, scale, **header):
+    header.update(dtype=FLAT_DTYPE, numel=int(masked.size), encoding=ENCODING_SECAGG_U32, scale=scale)
+    return encode_message(header, masked)
+
+# Decodifica o corpo de uma mensagem 'secagg_u32' como vetor uint32 (sem cópia).
+def decode_masked_update(header, body):
+    if body.nbytes != header['numel'] * np.dtype(np.uint32).itemsize:
+        raise ValueError(f"Atualização mascarada com {body.nbytes} bytes não corresponde a {header['numel']} valores.")
+    return np.frombuffer(body, dtype=np.uint32)
+
+# Decodifica uma mensagem de parâmetros, validando o tamanho do corpo contra o cabeçalho.
+# O corpo de codificações diferentes de 'full' é retornado como está.
+def decode_parameters(payload):
+    header, body = decode_message(payload)
+    if header.get('dtype') != FLAT_DTYPE:
+        raise ValueError(f"Tipo de dado não suportado: {header.get('dtype')}")
+    if header.get('encoding', ENCODING_FULL) != ENCODING_FULL:
+        return header, body
+    if body.nbytes != header.get('numel', -1) * FLAT_ITEMSIZE:
+        raise ValueError(f"Corpo com {body.nbytes} bytes não corresponde a {header.get('numel')} valores.")
+    return header, body
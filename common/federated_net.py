@@ -3,18 +3,159 @@
 import torch
 import torch.nn.functional as F
 import torch.nn as nn
+import numpy as np
 
-# Define a classe da rede neural federada.
-# Ela herda de nn.Module, a classe base para todos os módulos de redes neurais no PyTorch.
-class FederatedNet(nn.Module):
-    # O construtor da classe, onde as camadas da rede são definidas.
+# Classe base para todos os modelos usados no aprendizado federado.
+# A extração e a aplicação de parâmetros funcionam de forma genérica a partir do state_dict,
+# incluindo buffers (como as estatísticas de BatchNorm), sem depender de nomes de camadas.
+# Todos os valores rastreados vivem em um único buffer contíguo (float32): os parâmetros e
+# buffers do módulo são views desse buffer, de modo que exportar o modelo não copia nada e
+# importar um modelo é um único copy_.
+# No modo personalizado (ver set_local_layers), as camadas locais ficam no fim do buffer: o prefixo
+# compartilhado é o que é trocado com o servidor e agregado, também sem cópias.
+class FederatedModule(nn.Module):
     def __init__(self):
-        # Chama o construtor da classe pai (nn.Module).
+        super().__init__()
+        # Buffer plano com todos os valores rastreados (criado na primeira utilização,
+        # depois que as camadas da subclasse já foram definidas).
+        self._flat = None
+        # Dicionário nome -> view do buffer plano.
+        self._flat_views = None
+        # Prefixos dos nomes das camadas locais e número de valores compartilhados (início do buffer).
+        self._local_prefixes = ()
+        self._num_shared = None
+
+    # Retorna a lista (nome, tensor) das entradas de ponto flutuante do state_dict.
+    # Entradas inteiras (ex.: 'num_batches_tracked' do BatchNorm) não são trocadas.
+    def tracked_state(self):
+        return [(name, tensor) for name, tensor in self.state_dict(keep_vars=True).items() if tensor.is_floating_point()]
+
+    # Número total de valores rastreados.
+    def num_tracked_values(self):
+        return self.flat_parameters().numel()
+
+    # Define as camadas locais (personalização, estilo FedPer/FedRep): as entradas do state_dict com um dos
+    # nomes em 'prefixes' (ex.: 'linear' para 'linear.weight' e 'linear.bias') ficam no fim do buffer plano
+    # e não são trocadas com o servidor. Deve ser chamado antes do primeiro uso do buffer plano.
+    def set_local_layers(self, prefixes):
+        if self._flat is not None:
+            raise RuntimeError("As camadas locais devem ser definidas antes de o buffer plano ser criado.")
+        self._local_prefixes = tuple(prefixes or ())
+
+    # Indica se a entrada 'name' do state_dict pertence a uma camada local.
+    def is_local(self, name):
+        return any(name == prefix or name.startswith(prefix + '.') for prefix in self._local_prefixes)
+
+    # Número de valores compartilhados (tamanho do modelo transferido e agregado).
+    def num_shared_values(self):
+        self.flat_parameters()
+        return self._num_shared
+
+    # Move os valores rastreados para o buffer plano e religa cada parâmetro/buffer como uma view dele.
+    # Atenção: operações que realocam os tensores do módulo (ex.: .to(memory_format=...)) desfazem
+    # essa ligação, por isso o layout dos pesos é mantido contíguo.
+    def _bind_flat_storage(self):
+        # Entradas compartilhadas primeiro, na ordem do state_dict, seguidas das locais.
+        tracked = sorted(self.tracked_state(), key=lambda item: self.is_local(item[0]))
+        for prefix in self._local_prefixes:
+            if not any(name == prefix or name.startswith(prefix + '.') for name, _ in tracked):
+                raise ValueError(f"Camada local desconhecida: '{prefix}'.")
+        flat = torch.empty(sum(tensor.numel() for _, tensor in tracked), dtype=torch.float32)
+        views = {}
+        offset = 0
+        with torch.no_grad():
+            for name, tensor in tracked:
+                numel = tensor.numel()
+                view = flat[offset:offset + numel].view(tensor.shape)
+                view.copy_(tensor)
+                module_name, _, attr = name.rpartition('.')
+                module = self.get_submodule(module_name)
+                if attr in module._parameters:
+                    # O objeto Parameter é mantido (otimizadores continuam válidos); só o armazenamento muda.
+                    module._parameters[attr].data = view
+                else:
+                    module._buffers[attr] = view
+                views[name] = view
+                offset += numel
+        self._flat = flat
+        self._flat_views = views
+        self._num_shared = sum(tensor.numel() for name, tensor in tracked if not self.is_local(name))
+
+    # Retorna o buffer plano (tensor 1-D) com todos os valores rastreados do modelo.
+    def flat_parameters(self):
+        if self._flat is None:
+            self._bind_flat_storage()
+        return self._flat
+
+    # Exporta o modelo como uma memoryview de bytes sobre o buffer plano (sem cópia).
+    # A view reflete o estado atual do modelo: deve ser consumida antes de um novo treinamento.
+    def export_flat(self):
+        return memoryview(self.flat_parameters().numpy()).cast('B')
+
+    # Valores compartilhados (view do início do buffer plano; o buffer inteiro sem camadas locais).
+    def shared_parameters(self):
+        return self.flat_parameters()[:self.num_shared_values()]
+
+    # Valores das camadas locais (view do fim do buffer plano; vazia sem camadas locais).
+    def local_parameters(self):
+        return self.flat_parameters()[self.num_shared_values():]
+
+    # Exporta apenas os valores compartilhados como memoryview de bytes (sem cópia).
+    def export_shared(self):
+        return memoryview(self.shared_parameters().numpy()).cast('B')
+
+    # Importa um modelo plano (tensor 1-D ou objeto bytes-like com float32) em uma única cópia.
+    def load_flat(self, source):
+        self._copy_flat(self.flat_parameters(), source)
+
+    # Importa apenas os valores compartilhados; as camadas locais são mantidas.
+    def load_shared(self, source):
+        self._copy_flat(self.shared_parameters(), source)
+
+    @staticmethod
+    def _copy_flat(flat, source):
+        with torch.no_grad():
+            if isinstance(source, torch.Tensor):
+                if source.numel() != flat.numel():
+                    raise ValueError(f"Tamanho do modelo incompatível: recebido {source.numel()}, esperado {flat.numel()} valores.")
+                flat.copy_(source)
+            else:
+                values = np.frombuffer(source, dtype=np.float32)
+                if values.size != flat.numel():
+                    raise ValueError(f"Tamanho do modelo incompatível: recebido {values.size}, esperado {flat.numel()} valores.")
+                flat.numpy()[:] = values
+
+    # Método para obter os parâmetros e buffers rastreados como dicionário nome -> tensor.
+    # Os tensores são views do modelo vivo (sem cópia): quem precisar de uma cópia
+    # independente (ex.: para salvar em arquivo) deve cloná-los.
+    def get_parameters(self):
+        self.flat_parameters()
+        return self._flat_views
+
+    # Método para aplicar um novo conjunto de parâmetros (dicionário nome -> tensor) à rede.
+    # Com 'strict' = False, entradas ausentes do dicionário (ex.: camadas locais) mantêm os valores atuais.
+    def apply_parameters(self, parameters, strict=True):
+        self.flat_parameters()
+        # Desabilita o cálculo de gradientes durante a aplicação dos parâmetros,
+        # pois não é uma operação de treinamento.
+        with torch.no_grad():
+            for name, view in self._flat_views.items():
+                if not strict and name not in parameters:
+                    continue
+                # Copia os novos valores para a view correspondente (parâmetro ou buffer).
+                view.copy_(parameters[name])
+
+# Define a classe da rede neural federada (CNN pequena, modelo padrão).
+class FederatedNet(FederatedModule):
+    # O construtor da classe, onde as camadas da rede são definidas.
+    # 'input_size' é o lado da imagem de entrada (32 para o CIFAR-10).
+    def __init__(self, num_classes=10, in_channels=3, input_size=32):
+        # Chama o construtor da classe pai.
         super().__init__()
         # Define a primeira camada convolucional:
         # 3 canais de entrada (para imagens RGB), 20 canais de saída (filtros),
         # kernel de tamanho 7x7.
-        self.conv1 = nn.Conv2d(3, 20, 7)
+        self.conv1 = nn.Conv2d(in_channels, 20, 7)
         # Define a segunda camada convolucional:
         # 20 canais de entrada (saída da conv1), 40 canais de saída,
         # kernel de tamanho 7x7.
@@ -27,16 +168,13 @@ class FederatedNet(nn.Module):
         # antes de passar para a camada linear.
         self.flatten = nn.Flatten()
         # Define a camada linear (totalmente conectada):
-        # A entrada é 4000 (40 canais * 10x10 dimensão espacial após pooling para 32x32 input).
-        # A saída é 10 (para as 10 classes do CIFAR-10).
-        self.linear = nn.Linear(4000, 10) 
+        # Cada convolução 7x7 reduz o lado em 6 pixels e o pooling o divide por 2
+        # (para entrada 32x32: 40 canais * 10x10 = 4000 entradas).
+        spatial_size = (input_size - 12) // 2
+        self.linear = nn.Linear(40 * spatial_size * spatial_size, num_classes)
 
         # Define a função de ativação não-linear como ReLU (Rectified Linear Unit).
         self.non_linearity = F.relu
-        # Dicionário que armazena as camadas cujos parâmetros serão rastreados e transferidos.
-        # Isso é importante para o aprendizado federado, onde apenas os parâmetros dessas camadas
-        # são trocados entre clientes e servidor.
-        self.track_layers = {'conv1': self.conv1, 'conv2': self.conv2, 'linear': self.linear}
 
     # Define o passe forward da rede, que descreve como os dados fluem através das camadas.
     def forward(self, x):
@@ -53,20 +191,86 @@ class FederatedNet(nn.Module):
         # Retorna a saída (logits) da rede.
         return x
 
-    # Método para obter os parâmetros (pesos e bias) das camadas rastreadas.
-    def get_parameters(self):
-        # Retorna um dicionário onde a chave é o nome da camada e o valor é um dicionário
-        # contendo os tensores de peso e bias (copiados para evitar referências).
-        return {name: {'weight': layer.weight.data.clone(), 'bias': layer.bias.data.clone()} for name, layer in self.track_layers.items()}
+# Bloco residual básico (duas convoluções 3x3 com BatchNorm) usado pelas ResNets para CIFAR.
+class BasicBlock(nn.Module):
+    def __init__(self, in_planes, planes, stride=1):
+        super().__init__()
+        self.conv1 = nn.Conv2d(in_planes, planes, 3, stride=stride, padding=1, bias=False)
+        self.bn1 = nn.BatchNorm2d(planes)
+        self.conv2 = nn.Conv2d(planes, planes, 3, stride=1, padding=1, bias=False)
+        self.bn2 = nn.BatchNorm2d(planes)
+        # Atalho identidade, ou projeção 1x1 quando a forma da saída muda.
+        self.shortcut = nn.Sequential()
+        if stride != 1 or in_planes != planes:
+            self.shortcut = nn.Sequential(
+                nn.Conv2d(in_planes, planes, 1, stride=stride, bias=False),
+                nn.BatchNorm2d(planes),
+            )
 
-    # Método para aplicar um novo conjunto de parâmetros à rede.
-    def apply_parameters(self, parameters):
-        # Desabilita o cálculo de gradientes durante a aplicação dos parâmetros,
-        # pois não é uma operação de treinamento.
-        with torch.no_grad():
-            # Itera sobre os parâmetros fornecidos.
-            for name in parameters:
-                # Copia os novos pesos para a camada correspondente na rede.
-                self.track_layers[name].weight.data.copy_(parameters[name]['weight'])
-                # Copia os novos bias para a camada correspondente na rede.
-                self.track_layers[name].bias.data.copy_(parameters[name]['bias'])
\ No newline at end of file
+    def forward(self, x):
+        out = F.relu(self.bn1(self.conv1(x)))
+        out = self.bn2(self.conv2(out))
+        return F.relu(out + self.shortcut(x))
+
+# ResNet para CIFAR (He et al., 2016) com profundidade 6n+2 (ex.: 8, 20, 32).
+class ResNet(FederatedModule):
+    def __init__(self, depth=20, num_classes=10, in_channels=3):
+        super().__init__()
+        if (depth - 2) % 6 != 0:
+            raise ValueError(f"Profundidade inválida para ResNet: {depth} (deve ser 6n+2).")
+        blocks_per_stage = (depth - 2) // 6
+        self.conv1 = nn.Conv2d(in_channels, 16, 3, padding=1, bias=False)
+        self.bn1 = nn.BatchNorm2d(16)
+        stages = []
+        in_planes = 16
+        for planes, stride in ((16, 1), (32, 2), (64, 2)):
+            for block_idx in range(blocks_per_stage):
+                stages.append(BasicBlock(in_planes, planes, stride if block_idx == 0 else 1))
+                in_planes = planes
+        self.layers = nn.Sequential(*stages)
+        self.pool = nn.AdaptiveAvgPool2d(1)
+        self.flatten = nn.Flatten()
+        self.linear = nn.Linear(64, num_classes)
+
+    def forward(self, x):
+        x = F.relu(self.bn1(self.conv1(x)))
+        x = self.layers(x)
+        x = self.flatten(self.pool(x))
+        return self.linear(x)
+
+# Perceptron multicamadas simples sobre a imagem achatada.
+class MLP(FederatedModule):
+    def __init__(self, num_classes=10, in_channels=3, input_size=32, hidden_sizes=(512, 256)):
+        super().__init__()
+        layers = [nn.Flatten()]
+        in_features = in_channels * input_size * input_size
+        for hidden in hidden_sizes:
+            layers += [nn.Linear(in_features, hidden), nn.ReLU()]
+            in_features = hidden
+        layers.append(nn.Linear(in_features, num_classes))
+        self.layers = nn.Sequential(*layers)
+
+    def forward(self, x):
+        return self.layers(x)
+
+# Registro de modelos disponíveis: nome -> função que constrói o modelo.
+# Servidor, clientes e scripts de avaliação escolhem o modelo pelo nome.
+MODEL_REGISTRY = {
+    'cnn': FederatedNet,
+    'resnet8': lambda **kwargs: ResNet(depth=8, **kwargs),
+    'resnet20': lambda **kwargs: ResNet(depth=20, **kwargs),
+    'mlp': MLP,
+}
+
+# Retorna os nomes dos modelos registrados (usado nas opções de linha de comando).
+def available_models():
+    return sorted(MODEL_REGISTRY)
+
+# Constrói uma instância do modelo registrado com o nome informado.
+# 'local_layers' define as camadas que não são trocadas com o servidor (ver FederatedModule.set_local_layers).
+def build_model(name='cnn', local_layers=None, **kwargs):
+    if name not in MODEL_REGISTRY:
+        raise ValueError(f"Modelo desconhecido: '{name}'. Disponíveis: {', '.join(available_models())}")
+    model = MODEL_REGISTRY[name](**kwargs)
+    model.set_local_layers(local_layers)
+    return model
@@ -0,0 +1,69 @@
+# common/memory.py
+
+import gc
+import os
+import sys
+
+import torch
+
+# O módulo resource só existe em sistemas POSIX.
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Telemetria de memória por rodada, registrada pelo servidor e pelos clientes: a memória residente (RSS) do
+# processo e, opcionalmente, um censo dos tensores vivos (quantidade e bytes dos storages distintos). Em uma
+# execução longa os dois devem ficar estáveis de rodada a rodada; crescimento contínuo indica estado que não
+# é liberado (ver benchmarks/bench_soak_memory.py). O censo percorre todos os objetos do coletor de lixo e
+# por isso só é feito a cada 'census_interval' rodadas (ver census_due).
+
+# Indica se a rodada 'round_num' tem censo de tensores ('census_interval' = 0 desativa o censo).
+def census_due(round_num, census_interval):
+    return bool(census_interval) and round_num % census_interval == 0
+
+# Memória residente atual do processo em bytes. Fora do Linux (sem /proc), usa o pico de RSS do processo;
+# sem o módulo resource (ex.: Windows), retorna None.
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss é em kilobytes no Linux e em bytes no macOS.
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+# Tensores vivos alcançáveis pelo coletor de lixo: (quantidade, bytes). Views do mesmo storage (ex.: os
+# parâmetros sobre o buffer plano) contam os bytes do storage uma única vez.
+def tensor_census():
+    count = 0
+    storages = {}
+    for obj in gc.get_objects():
+        try:
+            if not torch.is_tensor(obj):
+                continue
+            storage = obj.untyped_storage()
+            storages[storage.data_ptr()] = storage.nbytes()
+            count += 1
+        except (RuntimeError, AttributeError, NotImplementedError):
+            continue
+    return count, sum(storages.values())
+
+# Retrato da memória do processo para as métricas de uma rodada (valores em MB; 'rss_mb' é None se a
+# plataforma não informa a RSS). 'tensors' e 'tensor_mb' só estão presentes com o censo.
+def memory_snapshot(census=False):
+    rss = rss_bytes()
+    snapshot = {'rss_mb': rss / 2**20 if rss is not None else None}
+    if census:
+        count, nbytes = tensor_census()
+        snapshot.update(tensors=count, tensor_mb=nbytes / 2**20)
+    return snapshot
+
+# Resumo de um retrato de memory_snapshot para os logs.
+def format_memory(snapshot):
+    text = f"RSS {snapshot['rss_mb']:.1f} MB" if snapshot.get('rss_mb') is not None else "RSS indisponível"
+    if 'tensors' in snapshot:
+        text += f" | {snapshot['tensors']} tensores ({snapshot['tensor_mb']:.1f} MB)"
+    return text
@@ -0,0 +1,73 @@
+# common/privacy.py
+
+import math
+
+import numpy as np
+
+# Privacidade diferencial no nível do cliente (DP-FedAvg, McMahan et al. 2018).
+#
+# Cada cliente limita a norma L2 do seu delta (modelo treinado - modelo global) a 'clip_norm' antes de
+# enviá-lo; o servidor tira a média simples dos K deltas recebidos e soma ruído gaussiano com desvio
+# padrão noise_multiplier * clip_norm / K, a sensibilidade da média a um cliente. O acumulador de Rényi
+# (RDP) compõe o custo de privacidade das rodadas, considerando a fração dos clientes amostrada em cada
+# uma (só quando a amostragem é aleatória; com seleção determinística a fração é 1), e o converte em
+# (epsilon, delta). Tudo opera sobre o buffer plano do modelo.
+
+# Ordens de Rényi (inteiras) avaliadas pelo acumulador.
+DEFAULT_ORDERS = tuple(range(2, 65)) + (80, 96, 128, 192, 256)
+
+# Limita no lugar o delta do modelo plano 'flat' em relação a 'reference' à norma L2 'clip_norm' e escreve
+# em 'out' o modelo resultante (reference + delta limitado). Retorna a norma do delta antes do limite.
+def clip_update(flat, reference, clip_norm, out):
+    np.subtract(flat, reference, out=out)
+    norm = math.sqrt(float(np.dot(out, out)))
+    if norm > clip_norm:
+        out *= np.float32(clip_norm / norm)
+    out += reference
+    return norm
+
+# Desvio padrão do ruído da média de 'num_clients' deltas limitados a 'clip_norm'.
+def noise_std(noise_multiplier, clip_norm, num_clients):
+    return noise_multiplier * clip_norm / max(1, num_clients)
+
+# RDP de ordem inteira 'order' do mecanismo gaussiano subamostrado (taxa de amostragem 'q', ruído com
+# desvio 'noise_multiplier' vezes a sensibilidade), pela expansão binomial de Mironov et al. (2019).
+def rdp_sampled_gaussian(q, noise_multiplier, order):
+    if q <= 0:
+        return 0.0
+    if noise_multiplier <= 0:
+        return math.inf
+    if q >= 1:
+        return order / (2 * noise_multiplier ** 2)
+    log_terms = [math.lgamma(order + 1) - math.lgamma(k + 1) - math.lgamma(order - k + 1)
+                 + k * math.log(q) + (order - k) * math.log1p(-q) + (k * k - k) / (2 * noise_multiplier ** 2)
+                 for k in range(order + 1)]
+    peak = max(log_terms)
+    return (peak + math.log(sum(math.exp(term - peak) for term in log_terms))) / (order - 1)
+
+# Converte o RDP acumulado em (epsilon, ordem usada) para o 'delta' dado (conversão de Balle et al. 2020).
+def rdp_to_epsilon(rdp, orders, delta):
+    best = (math.inf, None)
+    for value, order in zip(rdp, orders):
+        epsilon = value + math.log1p(-1 / order) - (math.log(delta) + math.log(order)) / (order - 1)
+        if epsilon < best[0]:
+            best = (max(0.0, epsilon), order)
+    return best
+
+# Acumulador de RDP ao longo das rodadas de um treinamento.
+class RDPAccountant:
+    def __init__(self, noise_multiplier, orders=DEFAULT_ORDERS):
+        self.noise_multiplier = noise_multiplier
+        self.orders = orders
+        self.rdp = [0.0] * len(orders)
+        self.rounds = 0
+
+    # Registra uma rodada em que a fração 'sampling_rate' dos clientes disponíveis participou.
+    def step(self, sampling_rate):
+        for i, order in enumerate(self.orders):
+            self.rdp[i] += rdp_sampled_gaussian(sampling_rate, self.noise_multiplier, order)
+        self.rounds += 1
+
+    # Epsilon acumulado para o 'delta' dado.
+    def epsilon(self, delta):
+        return rdp_to_epsilon(self.rdp, self.orders, delta)[0]
@@ -0,0 +1,96 @@
+# common/profiling.py
+
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Instrumentação opcional por rodada, usada pelo servidor e pelos clientes.
+# Quando ativa (output_dir definido), grava em output_dir, para cada rodada:
+#   <papel>_round_<n>.trace.json        spans medidos com span() no formato Chrome trace
+#                                       (abrir em chrome://tracing ou https://ui.perfetto.dev)
+#   <papel>_round_<n>.prof              estatísticas do cProfile (se cprofile=True)
+#   <papel>_round_<n>.torch.trace.json  captura do torch.profiler (apenas na rodada torch_profile_round)
+# Os timestamps são de relógio de parede, então traces de servidor e clientes podem ser abertos juntos.
+# Desativada, span() devolve um contexto nulo e o custo é desprezível.
+class RoundProfiler:
+    def __init__(self, role, output_dir=None, torch_profile_round=None, cprofile=False):
+        # Nome do processo no trace (ex.: 'server', 'client_0').
+        self.role = role
+        self.output_dir = output_dir
+        self.enabled = output_dir is not None
+        self.torch_profile_round = torch_profile_round
+        self.cprofile = cprofile
+        self.pid = os.getpid()
+        # Eventos da rodada em andamento.
+        self.events = []
+        self.lock = threading.Lock()
+        self.round_num = None
+        self._cprofile = None
+        self._torch_profiler = None
+        if self.enabled:
+            os.makedirs(output_dir, exist_ok=True)
+
+    # Mede um trecho de código como um evento completo ('X') do Chrome trace.
+    def span(self, name, **args):
+        if not self.enabled:
+            return nullcontext()
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name, args):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.record_span(name, start, time.time(), **args)
+
+    # Registra um trecho já medido (instantes de início e fim em segundos, relógio de parede).
+    # Útil quando o trecho começa antes de se saber a qual rodada ele pertence.
+    def record_span(self, name, start, end, **args):
+        if not self.enabled:
+            return
+        event = {'name': name, 'cat': self.role, 'ph': 'X', 'ts': int(start * 1e6), 'dur': int((end - start) * 1e6),
+                 'pid': self.pid, 'tid': threading.get_ident(), 'args': args}
+        with self.lock:
+            self.events.append(event)
+
+    # Inicia a coleta de uma rodada. Deve ser chamado na thread que executa o trabalho da rodada (no
+    # cliente, a thread de trabalho que decodifica e treina; no servidor, a thread de rede do MQTT, onde
+    # rodam os callbacks), pois o cProfile mede apenas a thread em que foi ativado.
+    def begin_round(self, round_num):
+        if not self.enabled:
+            return
+        self.round_num = round_num
+        with self.lock:
+            self.events = []
+        if self.cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        if self.torch_profile_round is not None and round_num == self.torch_profile_round:
+            import torch.profiler
+            self._torch_profiler = torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU])
+            self._torch_profiler.__enter__()
+
+    # Finaliza a rodada em andamento e grava os arquivos.
+    def end_round(self):
+        if not self.enabled or self.round_num is None:
+            return
+        prefix = os.path.join(self.output_dir, f"{self.role}_round_{self.round_num}")
+        if self._torch_profiler is not None:
+            self._torch_profiler.__exit__(None, None, None)
+            self._torch_profiler.export_chrome_trace(f"{prefix}.torch.trace.json")
+            self._torch_profiler = None
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(f"{prefix}.prof")
+            self._cprofile = None
+        with self.lock:
+            events, self.events = self.events, []
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'args': {'name': self.role}}]
+        with open(f"{prefix}.trace.json", 'w') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms',
+                       'otherData': {'role': self.role, 'round': self.round_num}}, f)
+        self.round_num = None
@@ -0,0 +1,138 @@
+# common/secure_aggregation.py
+
+import hashlib
+import secrets
+
+import numpy as np
+
+# Agregação segura por máscaras pareadas (no estilo de Bonawitz et al.): o servidor (e o broker) só
+# conhece a soma das atualizações da rodada, nunca a atualização de um cliente.
+#
+# Cada cliente tem um par de chaves Diffie-Hellman, anunciado no sinal de "pronto". No início da rodada o
+# servidor envia, no cabeçalho do modelo, as chaves públicas e o peso de cada participante. Cada par de
+# participantes (i, j) deriva o mesmo segredo compartilhado e, dele, uma semente por rodada; a semente
+# gera (PRG) uma máscara uint32 do tamanho do modelo. O cliente codifica seu modelo ponderado em ponto fixo
+# (uint32) e soma a máscara de cada par com j > i e subtrai a de cada par com j < i: na soma de todos os
+# clientes as máscaras se cancelam (aritmética módulo 2^32, vetorizada).
+#
+# Se um participante sai depois de receber o modelo, as máscaras dos seus pares ficam na soma. O servidor
+# pede então aos sobreviventes as sementes da rodada que eles compartilham com quem saiu e remove essas
+# máscaras. Como a semente é por rodada, revelá-la não expõe as outras rodadas; uma atualização atrasada de
+# quem saiu é descartada, então a semente revelada não desmascara ninguém. (Esta versão não tem o
+# compartilhamento de segredos de Shamir do protocolo original: um sobrevivente que sai durante a fase de
+# desmascaramento torna a soma irrecuperável e a rodada é descartada.)
+
+# Grupo MODP de 2048 bits do RFC 3526 (grupo 14), gerador 2.
+MODP_2048_PRIME = int(
+    'FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B139B22514A08798E3404DD'
+    'EF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7ED'
+    'EE386BFB5A899FA5AE9F24117C4B1FE649286651ECE45B3DC2007CB8A163BF0598DA48361C55D39A69163FA8FD24CF5F'
+    '83655D23DCA3AD961C62F356208552BB9ED529077096966D670C354E4ABC9804F1746C08CA18217C32905E462E36CE3B'
+    'E39E772C180E86039B2783A2EC07A28FB5C55DF06F4C52C9DE2BCBF6955817183995497CEA956AE515D2261898FA0510'
+    '15728E5A8AACAA68FFFFFFFFFFFFFFFF', 16)
+MODP_2048_GENERATOR = 2
+PUBLIC_KEY_BYTES = 256
+# Escala padrão do ponto fixo: valores (ponderados) com resolução de 2^-20 e módulo até 2^10.
+DEFAULT_SCALE = 1 << 20
+# Limite de um valor ponderado em unidades de ponto fixo (a soma ponderada também fica abaixo de 2^31,
+# pois os pesos da rodada somam 1).
+FIXED_POINT_LIMIT = float(1 << 30)
+
+# Gera um par de chaves Diffie-Hellman (privada, pública) no grupo de 2048 bits.
+def generate_keypair():
+    private = secrets.randbelow(MODP_2048_PRIME - 3) + 2
+    return private, pow(MODP_2048_GENERATOR, private, MODP_2048_PRIME)
+
+# Segredo compartilhado entre a chave privada 'private' e a chave pública do par (em bytes).
+def shared_secret(private, peer_public):
+    if not 1 < peer_public < MODP_2048_PRIME - 1:
+        raise ValueError("chave pública fora do grupo")
+    return pow(peer_public, private, MODP_2048_PRIME).to_bytes(PUBLIC_KEY_BYTES, 'big')
+
+# Semente de 32 bytes de um par na rodada 'round_num'.
+def pair_seed(secret, round_num):
+    return hashlib.blake2b(secret + int(round_num).to_bytes(8, 'big'), digest_size=32,
+                           person=b'fedavg-secagg').digest()
+
+# Máscara uint32 de 'numel' valores gerada pela semente (PCG64, 64 bits por chamada do gerador).
+def mask_from_seed(seed, numel):
+    raw = np.random.PCG64(int.from_bytes(seed, 'big')).random_raw(-(-numel // 2))
+    return raw.view(np.uint32)[:numel]
+
+# Codifica 'values' * 'weight' em ponto fixo (complemento de dois em uint32), escrevendo em 'out'.
+def encode_fixed_point(values, weight, scale, out):
+    scaled = np.multiply(values, np.float32(weight * scale), dtype=np.float32)
+    np.clip(scaled, -FIXED_POINT_LIMIT, FIXED_POINT_LIMIT, out=scaled)
+    np.rint(scaled, out=scaled)
+    out[:] = scaled.astype(np.int32).view(np.uint32)
+    return out
+
+# Decodifica a soma em ponto fixo 'total' (uint32) para float32, escrevendo em 'out'.
+def decode_fixed_point(total, scale, out):
+    np.multiply(total.view(np.int32), 1.0 / scale, out=out, casting='same_kind')
+    return out
+
+# Remove da soma 'total' (no lugar) as máscaras dos pares entre sobreviventes e clientes que saíram.
+# 'revealed' mapeia cada sobrevivente para {cliente que saiu: semente da rodada}.
+def remove_masks(total, revealed):
+    for survivor, seeds in revealed.items():
+        for dropped, seed in seeds.items():
+            mask = mask_from_seed(seed, total.size)
+            # O sobrevivente somou a máscara se o par tem ID maior, e a subtraiu caso contrário.
+            if survivor < dropped:
+                total -= mask
+            else:
+                total += mask
+    return total
+
+# Lado do cliente: par de chaves, segredos com os pares e mascaramento do modelo.
+class PairwiseMasker:
+    def __init__(self, client_id):
+        self.client_id = client_id
+        self.private_key, self.public_key = generate_keypair()
+        # Segredos já derivados, por (par, chave pública do par): a exponenciação é feita uma vez por par.
+        self.secrets = {}
+        # (rodada, {par: semente}) da última atualização mascarada, para a fase de desmascaramento.
+        self.round_seeds = None
+        self.buffer = None
+
+    # Chave pública em hexadecimal (como vai no JSON das capacidades e do cabeçalho).
+    @property
+    def public_key_hex(self):
+        return format(self.public_key, 'x')
+
+    # Sementes da rodada com cada um dos outros participantes ('public_keys': {ID: chave em hexadecimal}).
+    def pair_seeds(self, public_keys, round_num):
+        seeds = {}
+        for peer, key in public_keys.items():
+            peer = int(peer)
+            if peer == self.client_id:
+                continue
+            if (peer, key) not in self.secrets:
+                self.secrets[(peer, key)] = shared_secret(self.private_key, int(key, 16))
+            seeds[peer] = pair_seed(self.secrets[(peer, key)], round_num)
+        return seeds
+
+    # Modelo plano 'flat' (float32) ponderado por 'weight', em ponto fixo com escala 'scale' e mascarado
+    # para a rodada. Retorna o vetor uint32 (reutilizado entre rodadas).
+    def mask(self, flat, weight, scale, public_keys, round_num):
+        values = np.frombuffer(flat, dtype=np.float32)
+        if self.buffer is None or self.buffer.size != values.size:
+            self.buffer = np.empty(values.size, dtype=np.uint32)
+        masked = encode_fixed_point(values, weight, scale, self.buffer)
+        seeds = self.pair_seeds(public_keys, round_num)
+        for peer, seed in seeds.items():
+            if self.client_id < peer:
+                masked += mask_from_seed(seed, values.size)
+            else:
+                masked -= mask_from_seed(seed, values.size)
+        self.round_seeds = (round_num, seeds)
+        return masked
+
+    # Sementes da rodada 'round_num' com os clientes que saíram ({ID em texto: semente em hexadecimal}).
+    # Só são reveladas sementes da última rodada mascarada.
+    def reveal(self, round_num, dropped):
+        if self.round_seeds is None or self.round_seeds[0] != round_num:
+            return {}
+        seeds = self.round_seeds[1]
+        return {str(peer): seeds[peer].hex() for peer in dropped if peer in seeds}
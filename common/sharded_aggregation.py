@@ -0,0 +1,117 @@
+# common/sharded_aggregation.py
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Agregação paralela por fatias (shards) contíguas do buffer plano.
+#
+# A matriz de atualizações [clientes x parâmetros] e o vetor de saída ficam em memória compartilhada.
+# Cada fatia de parâmetros tem seu próprio processo (um executor com um único worker), então as
+# tarefas de uma mesma fatia são executadas em ordem, sem travas, e fatias diferentes em paralelo.
+# O FedAvg é acumulado à medida que as atualizações chegam (add()), sobrepondo a redução com a
+# recepção das atualizações seguintes; result() só espera as últimas tarefas e normaliza.
+#
+# As tarefas dos workers usam apenas numpy; o servidor enxerga os mesmos buffers como tensores com
+# torch.from_numpy. Com 'spawn', porém, cada worker reimporta o módulo principal do processo pai (ex.:
+# server.server) e, com ele, o PyTorch: a partida dos workers leva alguns segundos, uma única vez, no
+# construtor de ShardedAggregator, e não em cada rodada.
+
+# Estado de cada worker: views numpy sobre a memória compartilhada, criadas uma vez no initializer.
+_worker = {}
+
+def _attach(updates_name, out_name, shape):
+    updates_shm = shared_memory.SharedMemory(name=updates_name)
+    out_shm = shared_memory.SharedMemory(name=out_name)
+    _worker['shm'] = (updates_shm, out_shm)
+    _worker['updates'] = np.ndarray(shape, dtype=np.float32, buffer=updates_shm.buf)
+    _worker['out'] = np.ndarray((shape[1],), dtype=np.float32, buffer=out_shm.buf)
+
+# out[lo:hi] (=|+=) weight * updates[row, lo:hi]
+def _accumulate(lo, hi, row, weight, assign):
+    out = _worker['out'][lo:hi]
+    if assign:
+        np.multiply(_worker['updates'][row, lo:hi], weight, out=out)
+    else:
+        out += weight * _worker['updates'][row, lo:hi]
+
+# out[lo:hi] *= factor
+def _scale(lo, hi, factor):
+    _worker['out'][lo:hi] *= factor
+
+# out[lo:hi] = weights @ updates[:, lo:hi] (agregação da matriz completa de uma só vez).
+def _weighted_sum(lo, hi, weights):
+    np.matmul(weights, _worker['updates'][:, lo:hi], out=_worker['out'][lo:hi])
+
+class ShardedAggregator:
+    # 'num_workers' processos, cada um responsável por uma fatia de ~num_parameters/num_workers valores.
+    def __init__(self, num_clients, num_parameters, num_workers):
+        shape = (num_clients, num_parameters)
+        self._updates_shm = shared_memory.SharedMemory(create=True, size=max(1, num_clients * num_parameters * 4))
+        self._out_shm = shared_memory.SharedMemory(create=True, size=max(1, num_parameters * 4))
+        # Matriz de atualizações e vetor de saída compartilhados com os workers.
+        self.updates = np.ndarray(shape, dtype=np.float32, buffer=self._updates_shm.buf)
+        self.out = np.ndarray((num_parameters,), dtype=np.float32, buffer=self._out_shm.buf)
+        self.updates.fill(0)
+        self.out.fill(0)
+        bounds = np.linspace(0, num_parameters, num_workers + 1).astype(int)
+        self.shards = [(int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:])]
+        # 'spawn' evita fazer fork de um processo que já tem threads (o loop de rede do MQTT).
+        context = multiprocessing.get_context('spawn')
+        self.executors = [ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_attach,
+                                              initargs=(self._updates_shm.name, self._out_shm.name, shape))
+                          for _ in self.shards]
+        # Tarefas ainda não concluídas da rodada e soma dos pesos acumulados.
+        self.pending = []
+        self.total_weight = 0.0
+
+    def _submit(self, fn, *args):
+        self.pending.extend(executor.submit(fn, lo, hi, *args) for executor, (lo, hi) in zip(self.executors, self.shards))
+
+    def _wait(self):
+        pending, self.pending = self.pending, []
+        for future in pending:
+            # Propaga exceções dos workers.
+            future.result()
+
+    # Acumula a linha 'row' da matriz (já preenchida pelo chamador) com peso 'weight'. Não bloqueia.
+    def add(self, row, weight):
+        self._submit(_accumulate, row, float(weight), self.total_weight == 0)
+        self.total_weight += weight
+
+    # Espera a acumulação da rodada, normaliza pela soma dos pesos e retorna o vetor de saída.
+    # Prepara o acumulador para a próxima rodada.
+    def result(self):
+        if self.total_weight <= 0:
+            raise ValueError("a soma dos pesos da agregação deve ser positiva")
+        self._submit(_scale, 1.0 / self.total_weight)
+        self._wait()
+        self.total_weight = 0.0
+        return self.out
+
+    # Agrega a matriz completa com os pesos dados (normalizados aqui), em paralelo por fatia.
+    def reduce(self, weights):
+        weights = np.asarray(weights, dtype=np.float32)
+        total = float(weights.sum())
+        if total <= 0:
+            raise ValueError("a soma dos pesos da agregação deve ser positiva")
+        self._submit(_weighted_sum, weights / total)
+        self._wait()
+        return self.out
+
+    # Encerra os workers e libera a memória compartilhada.
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown(wait=True)
+        self.executors = []
+        # As views precisam ser descartadas antes de fechar os buffers.
+        self.updates = self.out = None
+        for shm in (self._updates_shm, self._out_shm):
+            try:
+                shm.close()
+            except BufferError:
+                # Ainda há tensores do chamador sobre o buffer; o mapeamento é liberado com eles.
+                pass
+            shm.unlink()
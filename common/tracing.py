@@ -0,0 +1,98 @@
+# common/tracing.py
+
+import json
+from collections import deque
+
+# Rastreamento ponta a ponta das rodadas entre servidor e clientes.
+#
+# Cada rodada de um cliente produz quatro timestamps de relógio de parede, como no NTP:
+#   t0 = servidor envia o modelo global     ('sent_at' no cabeçalho do servidor)
+#   t1 = cliente recebe o modelo            ('recv_at' no cabeçalho do cliente)
+#   t2 = cliente envia a atualização        ('sent_at' no cabeçalho do cliente)
+#   t3 = servidor recebe a atualização
+# t1 e t2 estão no relógio do cliente; a diferença de relógio é estimada a partir desses
+# quatro valores, o que permite separar tempo de rede de tempo de computação.
+
+# Estimador do deslocamento do relógio de um cliente em relação ao do servidor.
+class ClockSync:
+    def __init__(self, window=8):
+        # Últimas amostras (atraso de ida e volta, deslocamento).
+        self.samples = deque(maxlen=window)
+
+    # Adiciona uma amostra a partir dos quatro timestamps de uma rodada.
+    def update(self, t0, t1, t2, t3):
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+        delay = (t3 - t0) - (t2 - t1)
+        self.samples.append((delay, offset))
+
+    # Deslocamento (relógio do cliente - relógio do servidor). Como no NTP, usa a amostra de menor
+    # atraso da janela, a menos afetada por filas assimétricas.
+    def offset(self):
+        if not self.samples:
+            return 0.0
+        return min(self.samples)[1]
+
+# Reconstrói, no servidor, a linha do tempo de cada rodada e o caminho crítico.
+class RoundTracer:
+    def __init__(self, output_path=None):
+        # Arquivo JSON Lines com um registro por rodada (None desativa a exportação).
+        self.output_path = output_path
+        # Estimador de relógio por cliente.
+        self.clocks = {}
+        # Registros da rodada em andamento: client_id -> timestamps.
+        self.pending = {}
+
+    # Registra a atualização de um cliente (timestamps do cabeçalho + instante de recebimento no servidor).
+    def record_update(self, client_id, header, server_sent_at, server_recv_at):
+        needed = ('recv_at', 'train_start', 'train_end', 'sent_at')
+        if server_sent_at is None or any(key not in header for key in needed):
+            return
+        clock = self.clocks.setdefault(client_id, ClockSync())
+        clock.update(server_sent_at, header['recv_at'], header['sent_at'], server_recv_at)
+        self.pending[client_id] = {
+            'server_sent_at': server_sent_at,
+            'server_recv_at': server_recv_at,
+            'client_recv_at': header['recv_at'],
+            'train_start': header['train_start'],
+            'train_end': header['train_end'],
+            'client_sent_at': header['sent_at'],
+        }
+
+    # Fecha a rodada: calcula a decomposição por cliente e o caminho crítico, exporta e retorna o registro.
+    def finish_round(self, round_num, aggregation_start, aggregation_end):
+        clients = {}
+        for client_id, t in self.pending.items():
+            offset = self.clocks[client_id].offset()
+            clients[client_id] = {
+                'clock_offset': offset,
+                # Rede + fila do broker no sentido servidor -> cliente.
+                'download': (t['client_recv_at'] - offset) - t['server_sent_at'],
+                # Decodificação/espera no cliente antes de começar a treinar.
+                'client_queue': t['train_start'] - t['client_recv_at'],
+                'train': t['train_end'] - t['train_start'],
+                # Serialização da atualização no cliente.
+                'encode': t['client_sent_at'] - t['train_end'],
+                # Rede + fila do broker no sentido cliente -> servidor.
+                'upload': t['server_recv_at'] - (t['client_sent_at'] - offset),
+                # Espera no servidor pelos demais clientes até a agregação.
+                'server_wait': aggregation_start - t['server_recv_at'],
+                'server_recv_at': t['server_recv_at'],
+            }
+        self.pending = {}
+        record = {'round': round_num, 'aggregation': aggregation_end - aggregation_start,
+                  'clients': {str(client_id): c for client_id, c in clients.items()}}
+        if clients:
+            # O caminho crítico passa pelo último cliente a chegar ao servidor.
+            critical_id = max(clients, key=lambda cid: clients[cid]['server_recv_at'])
+            critical = clients[critical_id]
+            stages = ('download', 'client_queue', 'train', 'encode', 'upload')
+            record['critical_path'] = {
+                'client_id': critical_id,
+                'stages': {stage: critical[stage] for stage in stages},
+                'aggregation': record['aggregation'],
+                'bottleneck': max(stages, key=lambda stage: critical[stage]),
+            }
+        if self.output_path is not None:
+            with open(self.output_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        return record
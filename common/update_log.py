@@ -0,0 +1,130 @@
+# common/update_log.py
+
+import json
+import mmap
+import os
+
+from common.codec import HEADER_LENGTH
+
+# Registro das atualizações recebidas pelo servidor, para reproduzir a agregação offline (ver server/replay.py).
+#
+# O arquivo é só de acréscimo: uma assinatura seguida de registros no mesmo formato das mensagens do codec,
+#   [4 bytes: tamanho do cabeçalho][cabeçalho JSON][corpo de 'body_bytes' bytes]
+# Há dois tipos de registro ('kind' no cabeçalho):
+#   'global'  o modelo global (compartilhado) do início da rodada 'round': o corpo é o buffer plano float32.
+#             O registro da rodada num_rounds é o modelo final.
+#   'update'  uma atualização aceita na rodada 'round': o corpo é a mensagem MQTT recebida, intacta, e o
+#             cabeçalho traz o cliente, o instante de chegada ('recv_at') e o peso usado na média ('weight').
+# A leitura mapeia o arquivo na memória (mmap): os corpos são memoryviews sobre o arquivo, sem cópia. Um
+# registro incompleto no fim (servidor interrompido durante a escrita) é ignorado.
+
+LOG_MAGIC = b'FEDAVG-UPDLOG-1\n'
+
+# Escrita do registro pelo servidor. Cada registro é escrito com duas chamadas (cabeçalho e corpo), sem
+# montar uma cópia da mensagem; os dados vão ao disco no fim de cada rodada (flush).
+class UpdateLogWriter:
+    def __init__(self, path):
+        self.path = path
+        # Um novo treinamento começa um novo registro.
+        self.file = open(path, 'wb')
+        self.file.write(LOG_MAGIC)
+        self.records = 0
+
+    # Acrescenta um registro do tipo 'kind' com o corpo 'body' (bytes-like) e os metadados informados.
+    def append(self, kind, body, **meta):
+        body = memoryview(body).cast('B')
+        meta.update(kind=kind, body_bytes=body.nbytes)
+        header = json.dumps(meta, separators=(',', ':')).encode('utf-8')
+        self.file.write(HEADER_LENGTH.pack(len(header)) + header)
+        self.file.write(body)
+        self.records += 1
+
+    # Modelo global (buffer plano float32) do início da rodada 'round_num'.
+    def record_global(self, round_num, flat_bytes, **meta):
+        self.append('global', flat_bytes, round=round_num, **meta)
+        self.flush()
+
+    # Atualização aceita do cliente 'client_id' (a mensagem MQTT 'payload' recebida no instante 'recv_at').
+    def record_update(self, round_num, client_id, payload, recv_at, weight, **meta):
+        self.append('update', payload, round=round_num, client_id=client_id, recv_at=recv_at, weight=weight, **meta)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+# Uma rodada lida do registro: o modelo global do início, as atualizações na ordem de chegada
+# ([(cabeçalho do registro, mensagem)]) e o modelo global resultante (None na última rodada gravada).
+class LoggedRound:
+    def __init__(self, round_num, global_flat):
+        self.round_num = round_num
+        self.global_flat = global_flat
+        self.updates = []
+        self.next_global_flat = None
+
+# Leitura do registro com mmap. As memoryviews entregues valem até close().
+class UpdateLogReader:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.view = None
+        self.mmap = None
+        if os.fstat(self.file.fileno()).st_size > len(LOG_MAGIC):
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.view = memoryview(self.mmap)
+        if self.view is None or bytes(self.view[:len(LOG_MAGIC)]) != LOG_MAGIC:
+            self.close()
+            raise ValueError(f"{path} não é um registro de atualizações")
+
+    # Percorre os registros completos, na ordem de escrita: (cabeçalho, corpo).
+    def __iter__(self):
+        view = self.view
+        offset = len(LOG_MAGIC)
+        while offset + HEADER_LENGTH.size <= len(view):
+            (header_length,) = HEADER_LENGTH.unpack_from(view, offset)
+            body_start = offset + HEADER_LENGTH.size + header_length
+            if body_start > len(view):
+                break
+            meta = json.loads(bytes(view[offset + HEADER_LENGTH.size:body_start]))
+            body_end = body_start + meta['body_bytes']
+            if body_end > len(view):
+                break
+            yield meta, view[body_start:body_end]
+            offset = body_end
+
+    # Agrupa os registros em rodadas (LoggedRound). Uma rodada reiniciada (novo modelo global com o mesmo
+    # número) substitui a anterior.
+    def rounds(self):
+        current = None
+        for meta, body in self:
+            if meta['kind'] == 'global':
+                if current is not None:
+                    current.next_global_flat = body
+                    if current.round_num != meta['round']:
+                        yield current
+                current = LoggedRound(meta['round'], body)
+            elif meta['kind'] == 'update' and current is not None and meta['round'] == current.round_num:
+                current.updates.append((meta, body))
+        if current is not None and current.updates:
+            yield current
+
+    def close(self):
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+        if self.mmap is not None:
+            try:
+                self.mmap.close()
+            except BufferError:
+                # Ainda há memoryviews de corpos em uso; o mapeamento é liberado quando elas forem.
+                pass
+            self.mmap = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,3 @@
+# server/__init__.py
+#
+# Servidor raiz, agregador de borda e avaliação do modelo global.
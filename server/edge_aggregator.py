@@ -0,0 +1,242 @@
+# server/edge_aggregator.py
+
+import time
+import argparse
+import json
+import paho.mqtt.client as mqtt
+
+# O agregador de borda reutiliza o servidor (server/server.py) e os módulos de 'common'.
+from server.server import Server
+from common.federated_net import available_models
+from common.aggregation import available_aggregators
+from common.codec import encode_parameters, decode_parameters, model_version
+from common.profiling import RoundProfiler
+
+# Prefixo padrão dos tópicos do grupo de clientes de um agregador de borda.
+def edge_topic_prefix(edge_id):
+    return f"edge/{edge_id}/"
+
+# Agregador de borda: para o servidor raiz, é um cliente comum (ID 'edge_id'); para o seu grupo de
+# clientes, é um servidor. A cada rodada ele repassa o modelo global recebido da raiz aos seus clientes,
+# agrega as atualizações deles (FedAvg ponderado pelo número de amostras, a mesma lógica do Server) e
+# envia uma única atualização para a raiz com 'num_samples' igual ao total de amostras do grupo.
+# Como a média ponderada de médias ponderadas é a média ponderada global, o resultado na raiz é o
+# mesmo de uma federação plana, mas a raiz recebe e decodifica uma mensagem por borda, não por cliente.
+#
+# O agregador usa duas conexões MQTT: 'broker_*' para o seu grupo de clientes e 'upstream_*' para a raiz
+# (podem ser brokers diferentes, o que distribui a carga entre vários brokers). Perante a raiz, a borda
+# envia heartbeats a cada 'heartbeat_interval' segundos e registra um "last will", como um cliente.
+class EdgeAggregator(Server):
+    def __init__(self, edge_id, client_ids, broker_address="localhost", broker_port=1883, upstream_address=None,
+                 upstream_port=None, upstream_prefix="", topic_prefix=None, model_name="cnn", mqtt_client=None,
+                 upstream_mqtt_client=None, profile_dir=None, torch_profile_round=None, cprofile=False,
+                 trace_path=None, aggregation_workers=0, aggregator="fedavg", aggregator_options=None,
+                 heartbeat_timeout=30.0, heartbeat_interval=10.0, target_round_time=None, min_local_steps=1,
+                 max_local_epochs=None, local_layers=None):
+        # O número de rodadas é decidido pelo servidor raiz.
+        super().__init__(num_rounds=None, broker_address=broker_address, broker_port=broker_port,
+                         model_name=model_name,
+                         mqtt_client=mqtt_client or mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, f"edge_{edge_id}"),
+                         trace_path=trace_path, client_ids=client_ids,
+                         topic_prefix=edge_topic_prefix(edge_id) if topic_prefix is None else topic_prefix,
+                         aggregation_workers=aggregation_workers, aggregator=aggregator,
+                         aggregator_options=aggregator_options, heartbeat_timeout=heartbeat_timeout,
+                         target_round_time=target_round_time, min_local_steps=min_local_steps,
+                         max_local_epochs=max_local_epochs, local_layers=local_layers)
+        # ID do agregador perante o servidor raiz.
+        self.edge_id = edge_id
+        self.profiler = RoundProfiler(f"edge_{edge_id}", profile_dir, torch_profile_round, cprofile)
+
+        # Conexão com o servidor raiz (por padrão, no mesmo broker dos clientes).
+        self.upstream_address = upstream_address or broker_address
+        self.upstream_port = upstream_port or broker_port
+        self.upstream = upstream_mqtt_client or mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, f"edge_{edge_id}_upstream")
+        self.upstream.on_connect = self.on_upstream_connect
+        self.upstream.on_message = self.on_upstream_message
+        # Tópicos da raiz, os mesmos de um cliente com ID 'edge_id'.
+        self.upstream_initial_topic = f"{upstream_prefix}server/initial_parameters/{edge_id}"
+        self.upstream_global_topic = f"{upstream_prefix}server/global_parameters/{edge_id}"
+        self.upstream_terminate_topic = f"{upstream_prefix}client/terminate"
+        self.upstream_ready_topic = f"{upstream_prefix}client/ready"
+        self.upstream_update_topic = f"{upstream_prefix}client/updated_parameters/{edge_id}"
+        self.upstream_heartbeat_topic = f"{upstream_prefix}client/heartbeat"
+        self.upstream_offline_topic = f"{upstream_prefix}client/offline"
+        self.heartbeat_interval = heartbeat_interval
+        # Se a conexão com a raiz cair, o broker avisa a raiz em nome da borda.
+        self.upstream.will_set(self.upstream_offline_topic, json.dumps({'client_id': edge_id, 'reason': 'lost'}), qos=1)
+        # Instante em que o modelo da rodada chegou da raiz (ecoado como 'recv_at' na atualização).
+        self.upstream_recv_at = None
+        # Indica se o modelo da raiz traz uma atribuição de passos locais (destinada às bordas, não ao grupo).
+        self.upstream_schedule = False
+        # Sinaliza que a raiz encerrou o treinamento.
+        self.training_finished = False
+
+    # Callback de conexão com o broker da raiz.
+    def on_upstream_connect(self, client, userdata, flags, rc, properties):
+        if rc == 0:
+            print(f"Edge {self.edge_id}: Conectado ao broker do servidor raiz.")
+            self.upstream.subscribe(self.upstream_initial_topic)
+            self.upstream.subscribe(self.upstream_global_topic)
+            self.upstream.subscribe(self.upstream_terminate_topic)
+        else:
+            print(f"Edge {self.edge_id}: Falha na conexão com o broker do servidor raiz, código de retorno: {rc}")
+
+    # Mensagens vindas da raiz: modelo global da rodada ou sinal de término.
+    def on_upstream_message(self, client, userdata, msg):
+        if msg.topic == self.upstream_terminate_topic:
+            print(f"Edge {self.edge_id}: Sinal de término recebido do servidor raiz; repassando aos clientes.")
+            self.client.publish(self.terminate_clients_topic, "TERMINATE", qos=1)
+            self.training_finished = True
+        elif msg.topic in (self.upstream_initial_topic, self.upstream_global_topic):
+            # Mesma trava dos callbacks do grupo de clientes (ver Server.check_liveness).
+            with self.lock:
+                self.relay_global_parameters(msg)
+        else:
+            print(f"Edge {self.edge_id}: Mensagem recebida em tópico não esperado: {msg.topic}")
+
+    # Estado da borda perante a raiz (sinal de "pronto" e heartbeats): ID e número de clientes online do grupo.
+    def upstream_status(self):
+        return json.dumps({'client_id': self.edge_id, 'round': None, 'version': None,
+                           'capabilities': {'clients': len(self.registry.online_ids())}})
+
+    # Repassa o modelo global da raiz aos clientes do grupo. Os clientes que precisam do modelo completo
+    # recebem a mensagem da raiz sem re-serialização; os demais, um delta em relação à versão que têm
+    # (ver Server.payload_for). A borda não anuncia versões à raiz, que sempre lhe envia o modelo completo.
+    def relay_global_parameters(self, msg):
+        self.upstream_recv_at = time.time()
+        try:
+            header, body = decode_parameters(msg.payload)
+            if header['numel'] != self.num_parameters or header.get('encoding', 'full') != 'full':
+                raise ValueError(f"esperado o modelo completo com {self.num_parameters} valores")
+        except (ValueError, KeyError) as e:
+            print(f"Edge {self.edge_id}: Parâmetros inválidos do servidor raiz: {e}")
+            return
+        # Reentregas do modelo da rodada em andamento são ignoradas.
+        if header.get('version') is not None and header.get('version') == self.global_version \
+                and header.get('round', 0) == self.current_round:
+            print(f"Edge {self.edge_id}: Modelo da rodada {self.current_round} recebido em duplicidade; ignorado.")
+            return
+        self.current_round = header.get('round', 0)
+        self.received_clients_in_round.clear()
+        kind = "initial_parameters" if msg.topic == self.upstream_initial_topic else "global_parameters"
+        self.global_net.load_shared(body)
+        # A linha do tempo do grupo parte do instante de repasse.
+        self.global_payload = msg.payload
+        self.upstream_schedule = 'local_steps' in header
+        # O limite de norma dos deltas vale também para os clientes do grupo (se o modelo for serializado de novo).
+        self.dp_clip_norm = header.get('clip_norm')
+        self.global_version = header.get('version') or model_version(body)
+        self.global_sent_at = time.time()
+        self.round_start_time = self.global_sent_at
+        self.remember_global_version()
+        participants = self.publish_round(kind)
+        print(f"Edge {self.edge_id}: Modelo global da rodada {self.current_round} repassado a {len(participants)} clientes.")
+
+    # O modelo repassado já vem serializado da raiz. Ele só é serializado de novo quando é preciso trocar a
+    # atribuição de passos locais: a da raiz se refere às bordas, e a do grupo é calculada pela própria borda
+    # (Server.schedule_local_work) a partir da vazão dos seus clientes.
+    def encode_global_parameters(self):
+        if self.round_schedule or self.upstream_schedule:
+            self.global_payload = encode_parameters(self.global_net.export_shared(), **self.round_header())
+        return self.global_payload
+
+    # Após a agregação do grupo, envia a atualização combinada para a raiz em vez de iniciar uma rodada.
+    def advance_round(self):
+        total_samples = sum(self.round_sample_counts[self.current_round].values())
+        aggregated_at = time.time()
+        # A avaliação federada do grupo sobe para a raiz como uma única avaliação local.
+        extra = {'evaluation': {'samples': self.last_evaluation['samples'],
+                                'before': {'loss': self.last_evaluation['before_loss'], 'accuracy': self.last_evaluation['before_accuracy']},
+                                'after': {'loss': self.last_evaluation['after_loss'], 'accuracy': self.last_evaluation['after_accuracy']}}
+                 } if self.last_evaluation is not None else {}
+        # Para a raiz, o "treino" da borda vai do repasse do modelo até o fim da agregação do grupo.
+        with self.profiler.span("encode_upstream"):
+            payload = encode_parameters(self.global_net.export_shared(), round=self.current_round,
+                                        num_samples=total_samples, recv_at=self.upstream_recv_at,
+                                        train_start=self.global_sent_at, train_end=aggregated_at,
+                                        sent_at=time.time(), **extra)
+        with self.profiler.span("publish_upstream", bytes=len(payload)):
+            self.upstream.publish(self.upstream_update_topic, payload, qos=1)
+        print(f"Edge {self.edge_id}: Atualização agregada de {len(self.received_clients_in_round)} clientes ({total_samples} amostras) "
+              f"enviada ao servidor raiz para a rodada {self.current_round}.")
+        self.received_clients_in_round.clear()
+        # O estado por rodada do grupo já foi repassado à raiz.
+        self.release_round_state(self.current_round + 1)
+        # Até o próximo modelo da raiz não há rodada em andamento no grupo.
+        self.round_participants = set()
+        self.global_payload = None
+        self.profiler.end_round()
+
+    # Conecta aos dois brokers, sinaliza à raiz quando todo o grupo estiver pronto e repassa
+    # rodadas até o sinal de término.
+    def start(self):
+        try:
+            self.client.connect(self.broker_address, self.broker_port, 60)
+            self.client.loop_start()
+            self.upstream.connect(self.upstream_address, self.upstream_port, 60)
+            self.upstream.loop_start()
+
+            print(f"Edge {self.edge_id}: Aguardando os clientes {self.client_ids} sinalizarem que estão prontos...")
+            while len(self.registry.online_ids()) < self.num_clients:
+                time.sleep(1)
+                self.check_liveness()
+            # Para a raiz, a borda fica pronta quando todo o seu grupo está pronto.
+            self.upstream.publish(self.upstream_ready_topic, self.upstream_status(), qos=1)
+            print(f"Edge {self.edge_id}: Grupo pronto; sinal de 'pronto' enviado ao servidor raiz.")
+
+            last_heartbeat = time.time()
+            while not self.training_finished:
+                time.sleep(1)
+                self.check_liveness()
+                if time.time() - last_heartbeat >= self.heartbeat_interval:
+                    self.upstream.publish(self.upstream_heartbeat_topic, self.upstream_status(), qos=0)
+                    last_heartbeat = time.time()
+        except Exception as e:
+            print(f"Edge {self.edge_id}: Erro durante a execução: {e}")
+        finally:
+            # Saída antes do término: avisa a raiz explicitamente (o "last will" só vale para quedas de conexão).
+            if not self.training_finished:
+                self.upstream.publish(self.upstream_offline_topic, json.dumps({'client_id': self.edge_id, 'reason': 'leave'}), qos=1)
+            self.upstream.loop_stop()
+            self.upstream.disconnect()
+            self.client.loop_stop()
+            self.client.disconnect()
+            self.close_aggregation()
+            print(f"Edge {self.edge_id}: Encerrado.")
+
+# Ponto de entrada da linha de comando (python -m server.edge_aggregator ou fedavg-edge).
+# Exemplo com 2 bordas e 4 clientes no mesmo broker:
+#   python -m server.server --clients 2
+#   python -m server.edge_aggregator 0 --clients 0 1
+#   python -m server.edge_aggregator 1 --clients 2 3
+#   python -m clients.client 0 3 --edge 0   (idem para os demais clientes)
+def main():
+    parser = argparse.ArgumentParser(description="Agregador de borda (FedAVG hierárquico via MQTT).")
+    parser.add_argument("edge_id", type=int, help="ID da borda perante o servidor raiz (começando em 0).")
+    parser.add_argument("--clients", type=int, nargs="+", required=True, help="IDs dos clientes do grupo.")
+    parser.add_argument("--model", default="cnn", choices=available_models(), help="Modelo do registro (deve ser o mesmo da raiz).")
+    parser.add_argument("--broker", default="localhost", help="Endereço do broker MQTT dos clientes do grupo.")
+    parser.add_argument("--port", type=int, default=1883, help="Porta do broker MQTT dos clientes do grupo.")
+    parser.add_argument("--upstream-broker", default=None, help="Endereço do broker do servidor raiz (padrão: --broker).")
+    parser.add_argument("--upstream-port", type=int, default=None, help="Porta do broker do servidor raiz (padrão: --port).")
+    parser.add_argument("--profile-dir", default=None, help="Pasta para os traces de profiling por rodada.")
+    parser.add_argument("--trace-file", default=None, help="Arquivo JSON Lines com a linha do tempo de cada rodada do grupo.")
+    parser.add_argument("--aggregation-workers", type=int, default=0, help="Processos da agregação paralela por fatias.")
+    parser.add_argument("--aggregator", default="fedavg", choices=available_aggregators(), help="Regra de agregação do grupo.")
+    parser.add_argument("--heartbeat-timeout", type=float, default=30.0, help="Segundos sem heartbeat até um cliente do grupo ser considerado desconectado.")
+    parser.add_argument("--target-round-time", type=float, default=None, help="Tempo alvo (segundos) do treino local dos clientes do grupo.")
+    parser.add_argument("--local-layers", nargs="+", default=None, help="Camadas que não são agregadas (as mesmas da raiz e dos clientes).")
+    args = parser.parse_args()
+
+    edge = EdgeAggregator(edge_id=args.edge_id, client_ids=args.clients, broker_address=args.broker,
+                          broker_port=args.port, upstream_address=args.upstream_broker,
+                          upstream_port=args.upstream_port, model_name=args.model,
+                          profile_dir=args.profile_dir, trace_path=args.trace_file,
+                          aggregation_workers=args.aggregation_workers, aggregator=args.aggregator,
+                          heartbeat_timeout=args.heartbeat_timeout, target_round_time=args.target_round_time,
+                          local_layers=args.local_layers)
+    edge.start()
+
+# Bloco executado apenas se o script for rodado diretamente.
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,32 @@
 # server/evaluate_global_model.py
 
 import torch
-from torchvision.datasets import CIFAR10
 from torch.utils.data import DataLoader
-import torchvision.transforms as transforms
 import pickle
 import os
 import sys
+import argparse
 
-# Importar o modelo da pasta comum
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'common')))
-from federated_net import FederatedNet
+# Importar o modelo do pacote comum
+from common.federated_net import build_model, available_models
+from common.client_cache import ClientCache
+
+# Lê o modelo global salvo pelo servidor: (parâmetros {nome: tensor}, normalização das entradas usada no
+# treino como {'mean': [...], 'std': [...]}, ou None). Arquivos de versões anteriores trazem só o dicionário
+# de parâmetros, de modelos treinados com entradas em [0, 1], sem normalização.
+def load_global_model(model_path):
+    with open(model_path, 'rb') as f:
+        saved = pickle.load(f)
+    if isinstance(saved.get('parameters'), dict):
+        return saved['parameters'], saved.get('normalize')
+    return saved, None
 
 # Define a função para avaliar o modelo.
-def evaluate_model(model_path=os.path.join(os.path.dirname(__file__), 'global_parameters.pkl')):
+# No modo personalizado ('local_layers', as mesmas do treinamento), o arquivo só traz as camadas
+# compartilhadas; as camadas locais vêm do cache de um cliente ('client_cache_dir'), e a avaliação é a
+# do modelo personalizado desse cliente.
+def evaluate_model(model_path=os.path.join(os.path.dirname(__file__), 'global_parameters.pkl'), model_name='cnn',
+                   local_layers=None, client_cache_dir=None):
     print("\n--- Avaliando o Modelo Global Final ---")
 
     # Verifica se o arquivo de parâmetros do modelo global existe no caminho especificado.
@@ -22,21 +35,43 @@ def evaluate_model(model_path=os.path.join(os.path.dirname(__file__), 'global_pa
         print("Certifique-se de que o servidor concluiu o treinamento e salvou 'global_parameters.pkl'.")
         sys.exit(1) # Sai do script se o arquivo não for encontrado.
 
-    # Carrega os parâmetros do modelo global do arquivo.
-    with open(model_path, 'rb') as f:
-        global_parameters = pickle.load(f)
+    # Carrega os parâmetros do modelo global do arquivo e a normalização das entradas usada no treino.
+    global_parameters, normalize = load_global_model(model_path)
 
-    # Inicializa uma nova instância da rede neural.
-    net = FederatedNet()
-    # Aplica os parâmetros carregados à rede.
-    net.apply_parameters(global_parameters)
+    # Inicializa uma nova instância da rede neural (mesmo modelo usado no treinamento).
+    net = build_model(model_name, local_layers=local_layers)
+    missing = [name for name in net.get_parameters() if name not in global_parameters]
+    if any(not net.is_local(name) for name in missing):
+        print(f"Erro: O arquivo não tem as camadas {missing}. Se o treinamento usou --local-layers, informe as mesmas camadas.")
+        sys.exit(1)
+    # Aplica os parâmetros carregados à rede (no modo personalizado, só as camadas compartilhadas).
+    net.apply_parameters(global_parameters, strict=False)
+    if local_layers:
+        # As camadas locais do servidor nunca são treinadas: usa as de um cliente.
+        local_state = ClientCache(client_cache_dir).load_local(model_name, net.local_parameters().numel()) \
+            if client_cache_dir and os.path.isdir(client_cache_dir) else None
+        if local_state is None:
+            print(f"Erro: As camadas locais {local_layers} não são treinadas pelo servidor. Informe com --client-cache "
+                  "o cache de um cliente (ex.: clients/client_0/cache) para avaliar o modelo personalizado dele.")
+            sys.exit(1)
+        with torch.no_grad():
+            net.local_parameters().copy_(local_state)
+        print(f"Camadas locais {local_layers} carregadas de {client_cache_dir}.")
     # Coloca o modelo em modo de avaliação.
     # Isso desabilita camadas como Dropout e ajusta o comportamento de BatchNorm (se existissem).
     net.eval() 
 
     # Carrega o dataset de teste CIFAR-10.
     # train=False indica que é o conjunto de teste.
-    transform = transforms.Compose([transforms.ToTensor()])
+    # O torchvision só é importado aqui, quando o dataset é realmente necessário.
+    from torchvision.datasets import CIFAR10
+    import torchvision.transforms as transforms
+    # Mesma normalização por canal aplicada pelos clientes no treino, registrada no arquivo do modelo.
+    if normalize is not None:
+        transform = transforms.Compose([transforms.ToTensor(), transforms.Normalize(normalize['mean'], normalize['std'])])
+    else:
+        print("Modelo salvo sem registro de normalização (versão anterior): avaliando com entradas em [0, 1].")
+        transform = transforms.ToTensor()
     test_dataset = CIFAR10(root='./data_temp', train=False, download=True, transform=transform)
     # Cria um DataLoader para iterar sobre o dataset de teste em batches.
     test_dataloader = DataLoader(test_dataset, batch_size=128, shuffle=False)
@@ -58,6 +93,15 @@ def evaluate_model(model_path=os.path.join(os.path.dirname(__file__), 'global_pa
     print(f"Acurácia do Modelo Global no Dataset de Teste: {accuracy:.2f}%")
     print("--- Avaliação Concluída ---")
 
+# Ponto de entrada da linha de comando (python -m server.evaluate_global_model ou fedavg-evaluate).
+def main():
+    parser = argparse.ArgumentParser(description="Avalia o modelo global no conjunto de teste do CIFAR-10.")
+    parser.add_argument("--model", default="cnn", choices=available_models(), help="Modelo usado no treinamento.")
+    parser.add_argument("--local-layers", nargs="+", default=None, help="Camadas locais usadas no treinamento (modo personalizado).")
+    parser.add_argument("--client-cache", default=None, help="Cache do cliente de onde vêm as camadas locais (com --local-layers).")
+    args = parser.parse_args()
+    evaluate_model(model_name=args.model, local_layers=args.local_layers, client_cache_dir=args.client_cache)
+
 # Bloco executado apenas se o script for rodado diretamente.
 if __name__ == "__main__":
-    evaluate_model()
\ No newline at end of file
+    main()
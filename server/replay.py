@@ -0,0 +1,113 @@
+# server/replay.py
+#
+# Reprodução offline da agregação a partir de um registro gravado pelo servidor com --update-log
+# (ver common/update_log.py). As atualizações de cada rodada, na ordem em que chegaram, alimentam uma regra
+# de agregação (as de common/aggregation.py ou qualquer função com a mesma assinatura) sem broker, clientes
+# nem treino: dá para comparar regras e otimizadores do servidor em segundos sobre atualizações reais.
+#
+# O modelo de cada rodada reproduzida é comparado com o modelo global gravado no início da rodada seguinte
+# (com o agregador usado no treinamento, a diferença é só de arredondamento; com o ruído de privacidade
+# diferencial, inclui o ruído). As atualizações foram treinadas a partir dos modelos gravados, então cada
+# rodada parte do modelo global gravado, e não do reproduzido.
+#
+# Uso: python -m server.replay updates.log [--aggregators fedavg median trimmed_mean krum] [--trim-ratio 0.2] [--byzantine 1]
+
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+
+from common.aggregation import aggregate, available_aggregators, min_updates
+from common.codec import ENCODING_FULL, decode_parameters
+from common.update_log import UpdateLogReader
+
+# Reproduz todas as rodadas do registro em 'log_path' com a regra 'aggregator' (nome ou função
+# fn(updates, weights, out, **options)). 'on_round(logged_round, global_flat, aggregated)' é chamado com
+# o modelo agregado de cada rodada (tensores sobre o buffer plano), por exemplo para aplicar um
+# otimizador do servidor ao pseudo-gradiente global_flat - aggregated ('aggregated' é reaproveitado na rodada
+# seguinte: o callback deve copiá-lo se precisar guardá-lo). Retorna as métricas por rodada.
+def replay(log_path, aggregator='fedavg', aggregator_options=None, on_round=None):
+    aggregator_options = aggregator_options or {}
+    results = []
+    updates = out = None
+    with UpdateLogReader(log_path) as log:
+        for logged in log.rounds():
+            global_flat = torch.from_numpy(np.frombuffer(logged.global_flat, dtype=np.float32))
+            numel = global_flat.numel()
+            # Matriz [clientes x parâmetros] e vetor de saída reaproveitados entre as rodadas (a matriz cresce
+            # se necessário).
+            if updates is None or updates.shape[0] < len(logged.updates) or updates.shape[1] != numel:
+                updates = torch.empty(len(logged.updates), numel)
+            if out is None or out.numel() != numel:
+                out = torch.empty(numel)
+
+            decode_start = time.perf_counter()
+            weights = []
+            for meta, payload in logged.updates:
+                header, body = decode_parameters(payload)
+                if header.get('encoding', ENCODING_FULL) != ENCODING_FULL or header['numel'] != numel:
+                    continue
+                updates[len(weights)].numpy()[:] = np.frombuffer(body, dtype=np.float32)
+                weights.append(meta['weight'])
+            decode_s = time.perf_counter() - decode_start
+            if not weights:
+                continue
+
+            rows = updates[:len(weights)]
+            start = time.perf_counter()
+            if callable(aggregator):
+                aggregator(rows, torch.tensor(weights, dtype=torch.float32), out, **aggregator_options)
+            elif len(weights) < min_updates(aggregator, **aggregator_options):
+                # Mesma substituição do servidor: rodadas com atualizações de menos para a regra usam a mediana.
+                aggregate("median", rows, torch.tensor(weights, dtype=torch.float32), out)
+            else:
+                aggregate(aggregator, rows, torch.tensor(weights, dtype=torch.float32), out, **aggregator_options)
+            aggregate_s = time.perf_counter() - start
+            if on_round is not None:
+                on_round(logged, global_flat, out)
+
+            result = {'round': logged.round_num, 'clients': len(weights), 'decode_s': decode_s, 'aggregate_s': aggregate_s,
+                      'update_norm': float((out - global_flat).norm())}
+            if logged.next_global_flat is not None:
+                recorded = torch.from_numpy(np.frombuffer(logged.next_global_flat, dtype=np.float32))
+                difference = out - recorded
+                result['max_abs_diff'] = float(difference.abs().max())
+                result['l2_diff'] = float(difference.norm())
+            results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduz offline a agregação de um registro de atualizações.")
+    parser.add_argument("log", help="Arquivo gravado pelo servidor com --update-log.")
+    parser.add_argument("--aggregators", nargs="+", default=["fedavg"], choices=available_aggregators(), help="Regras comparadas.")
+    parser.add_argument("--trim-ratio", type=float, default=None, help="Fração aparada em cada extremo (trimmed_mean).")
+    parser.add_argument("--byzantine", type=int, default=None, help="Número de clientes maliciosos tolerados (krum).")
+    parser.add_argument("--output", default=None, help="Arquivo JSON com as métricas por rodada de cada regra.")
+    args = parser.parse_args()
+
+    report = {}
+    for name in args.aggregators:
+        options = {}
+        if name == "trimmed_mean" and args.trim_ratio is not None:
+            options['trim_ratio'] = args.trim_ratio
+        if name == "krum" and args.byzantine is not None:
+            options['byzantine'] = args.byzantine
+        start = time.perf_counter()
+        rounds = replay(args.log, name, options)
+        total_s = time.perf_counter() - start
+        report[name] = {'total_s': total_s, 'rounds': rounds}
+        updates = sum(r['clients'] for r in rounds)
+        aggregate_s = sum(r['aggregate_s'] for r in rounds)
+        diffs = [r['max_abs_diff'] for r in rounds if 'max_abs_diff' in r]
+        print(f"{name}: {len(rounds)} rodadas, {updates} atualizações em {total_s:.2f}s "
+              f"(agregação {aggregate_s:.3f}s, {updates / total_s if total_s else 0:.0f} atualizações/s)"
+              + (f" | maior diferença para o modelo gravado: {max(diffs):.3e}" if diffs else ""))
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Métricas salvas em {args.output}")
+
+if __name__ == "__main__":
+    main()
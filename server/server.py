@@ -5,49 +5,221 @@ import pickle
 import os
 import paho.mqtt.client as mqtt
 import time
-from collections import defaultdict
+from collections import defaultdict, deque, OrderedDict
 import sys
 from datetime import datetime
 import numpy as np # Importado para np.mean nas métricas.
+import argparse
+import json
+import threading
 
-# --- LINHAS DE DEPURACÃO PARA O CAMINHO 'common'  ---
-# Obtém o diretório do arquivo Python atual.
-current_dir = os.path.dirname(__file__)
-# Calcula o caminho absoluto para a pasta 'common'.
-# '..' sobe um nível (de server/ para federated_learning/).
-calculated_common_path_server = os.path.abspath(os.path.join(current_dir, '..', 'common'))
-# Imprime o diretório atual e o caminho calculado para fins de depuração.
-print(f"DEBUG (Server): Diretório atual do server.py: {current_dir}")
-print(f"DEBUG (Server): Caminho calculado para 'common' no servidor: {calculated_common_path_server}")
-# --- FIM: LINHAS DE DEPURACÃO ---
-
-# Adiciona o caminho calculado para 'common' ao sys.path, permitindo a importação de módulos de lá.
-sys.path.append(calculated_common_path_server)
-# Importa a classe FederatedNet do módulo federated_net (que está em 'common').
-from federated_net import FederatedNet
+# Importa o registro de modelos do pacote 'common'.
+from common.federated_net import build_model, available_models
+# Importa o codec binário das mensagens de parâmetros.
+from common.codec import (encode_parameters, decode_parameters, encode_unchanged, encode_xor_delta, encode_q8_delta,
+                          quantize_q8, dequantize_add_q8, model_version, decode_masked_update, ENCODING_SECAGG_U32)
+# Importa as regras de agregação (FedAvg ponderado pelo número de amostras e regras robustas).
+from common.aggregation import aggregate, available_aggregators, min_updates
+# Importa a agregação paralela por fatias do buffer plano (processos + memória compartilhada).
+from common.sharded_aggregation import ShardedAggregator
+# Importa a instrumentação opcional de profiling por rodada.
+from common.profiling import RoundProfiler
+# Importa o rastreamento ponta a ponta das rodadas (linha do tempo por cliente e caminho crítico).
+from common.tracing import RoundTracer
+# Importa o registro dinâmico de clientes (entrada, saída, heartbeats e capacidades).
+from common.client_registry import ClientRegistry
+# Importa a agregação segura por máscaras pareadas (o servidor só vê a soma das atualizações).
+from common.secure_aggregation import DEFAULT_SCALE, decode_fixed_point, remove_masks
+# Importa a privacidade diferencial (DP-FedAvg): ruído calibrado e acumulador de RDP.
+from common.privacy import RDPAccountant, noise_std
+# Importa o registro das atualizações recebidas (reprodução offline da agregação, ver server/replay.py).
+from common.update_log import UpdateLogWriter
+# Importa a telemetria de memória por rodada (RSS e censo de tensores).
+from common.memory import census_due, format_memory, memory_snapshot
+# Importa a normalização das entradas usada pelos clientes (gravada com o modelo salvo).
+from common.augmentation import INPUT_NORMALIZATION
+
+# Mínimo de sobreviventes para desmascarar uma rodada com agregação segura da qual participantes saíram:
+# com um só, a "soma" revelada seria a própria atualização do cliente.
+MIN_SECURE_SURVIVORS = 2
 
 # Define a classe Server.
 class Server:
     # Construtor da classe Server.
-    def __init__(self, num_rounds=50, num_clients=2, broker_address="localhost", broker_port=1883):
+    # 'mqtt_client' permite injetar um cliente MQTT alternativo (ex.: o broker em memória dos benchmarks)
+    # e 'output_path' define onde o modelo global final é salvo.
+    # 'profile_dir', 'torch_profile_round' e 'cprofile' ativam o profiling por rodada (ver common/profiling.py).
+    # 'trace_path' exporta a decomposição de cada rodada em JSON Lines (ver common/tracing.py).
+    # A participação é elástica (ver common/client_registry.py): clientes entram pelo sinal de "pronto" e
+    # saem por aviso, pela mensagem de "last will" do broker ou após 'heartbeat_timeout' segundos sem
+    # heartbeat. 'num_clients' é o número de clientes que precisam estar prontos para o treinamento começar,
+    # 'client_ids' (opcional) restringe os IDs aceitos e 'max_clients' é o número máximo de participantes
+    # de uma rodada (padrão: o maior entre num_clients e len(client_ids)). Quem entra durante uma rodada
+    # participa a partir da seguinte. 'topic_prefix' é prefixado a todos os tópicos, o que permite a vários
+    # grupos (ex.: agregadores de borda) compartilharem o mesmo broker.
+    # 'aggregation_workers' > 0 divide a agregação entre esse número de processos (ver common/sharded_aggregation.py).
+    # 'aggregator' escolhe a regra de agregação ('fedavg', 'median', 'trimmed_mean' ou 'krum', ver common/aggregation.py)
+    # e 'aggregator_options' repassa opções a ela (ex.: {'trim_ratio': 0.2} ou {'byzantine': 1}).
+    # 'broadcast_quantization'='int8' envia aos clientes deltas quantizados do modelo global, com um modelo
+    # completo (keyframe) a cada 'keyframe_interval' rodadas (ver encode_global_parameters).
+    # 'target_round_time' ativa o escalonamento por vazão: a cada rodada, cada participante recebe junto com
+    # o modelo um número de passos de treino local proporcional à sua vazão medida, para que todos terminem
+    # perto desse tempo (ver schedule_local_work); 'min_local_steps' e 'max_local_epochs' limitam a atribuição.
+    # 'secure_aggregation' ativa a agregação segura (ver common/secure_aggregation.py): os clientes enviam
+    # atualizações mascaradas e o servidor só obtém a soma ponderada. Exige o FedAvg e dispensa a matriz de
+    # atualizações (a soma é acumulada em um único vetor uint32).
+    # 'dp_clip_norm' pede aos clientes que limitem a norma L2 do seu delta (enviada no cabeçalho do modelo) e
+    # 'dp_noise_multiplier' ativa o DP-FedAvg (ver common/privacy.py): a média passa a ser simples e recebe
+    # ruído gaussiano com desvio dp_noise_multiplier * dp_clip_norm / K; o epsilon acumulado para 'dp_delta'
+    # é registrado nas métricas de cada rodada.
+    # 'local_layers' ativa a personalização (FedPer/FedRep): essas camadas (ex.: ['linear']) ficam nos
+    # clientes, e o servidor só recebe, agrega e envia as demais (ver FederatedModule.set_local_layers).
+    # 'update_log' grava no arquivo informado o modelo global de cada rodada e as atualizações aceitas, com os
+    # cabeçalhos e instantes de chegada, para reproduzir a agregação offline (ver common/update_log.py).
+    # 'metrics_history' é o número de rodadas mantidas em round_metrics (as mais recentes), para que a memória
+    # do servidor não cresça com a duração do treinamento. 'memory_census_interval' faz o censo dos tensores
+    # vivos a cada N rodadas nas métricas de memória (0 = só a RSS; ver common/memory.py).
+    def __init__(self, num_rounds=50, num_clients=2, broker_address="localhost", broker_port=1883, model_name="cnn",
+                 mqtt_client=None, output_path=None, profile_dir=None, torch_profile_round=None, cprofile=False,
+                 trace_path=None, client_ids=None, topic_prefix="", aggregation_workers=0, aggregator="fedavg",
+                 aggregator_options=None, broadcast_quantization=None, keyframe_interval=10,
+                 quantization_block_size=4096, max_clients=None, heartbeat_timeout=30.0, target_round_time=None,
+                 min_local_steps=1, max_local_epochs=None, secure_aggregation=False, dp_clip_norm=None,
+                 dp_noise_multiplier=None, dp_delta=1e-5, local_layers=None, update_log=None,
+                 metrics_history=1000, memory_census_interval=0):
         # Define o número total de rodadas de aprendizado federado.
         self.num_rounds = num_rounds
-        # Define o número esperado de clientes.
-        self.num_clients = num_clients
+        # IDs aceitos (None = qualquer cliente) e número de clientes prontos para iniciar o treinamento.
+        self.client_ids = list(client_ids) if client_ids is not None else None
+        self.num_clients = len(self.client_ids) if client_ids is not None else num_clients
+        # Capacidade: número de linhas da matriz de atualizações (participantes por rodada).
+        self.max_clients = max_clients or max(self.num_clients, len(self.client_ids or ()))
+        # Clientes conhecidos, com seu estado (online/offline) e capacidades.
+        self.registry = ClientRegistry(heartbeat_timeout)
+        # Os callbacks MQTT e o laço de verificação de heartbeats (start) alteram o estado da rodada;
+        # a trava serializa os dois.
+        self.lock = threading.RLock()
+        # Prefixo dos tópicos MQTT deste grupo de clientes.
+        self.topic_prefix = topic_prefix
+        # Regra de agregação e suas opções.
+        if aggregator not in available_aggregators():
+            raise ValueError(f"Agregador desconhecido '{aggregator}'. Disponíveis: {', '.join(available_aggregators())}")
+        self.aggregator = aggregator
+        self.aggregator_options = aggregator_options or {}
+        # Opções incompatíveis com o número de clientes esperado são rejeitadas aqui, e não na primeira rodada.
+        self.min_round_updates = min_updates(aggregator, **self.aggregator_options)
+        if self.min_round_updates > self.num_clients:
+            raise ValueError(f"'{aggregator}' com {self.aggregator_options} exige ao menos {self.min_round_updates} "
+                             f"atualizações por rodada, mas apenas {self.num_clients} clientes são esperados.")
+        if secure_aggregation and aggregator != "fedavg":
+            raise ValueError(f"A agregação segura só revela a soma das atualizações; '{aggregator}' precisa de cada uma.")
+        self.secure_aggregation = secure_aggregation
+        if dp_noise_multiplier is not None and (dp_clip_norm is None or aggregator != "fedavg"):
+            raise ValueError("O ruído de privacidade diferencial exige --dp-clip-norm e o agregador fedavg.")
+        self.dp_clip_norm = dp_clip_norm
+        self.dp_noise_multiplier = dp_noise_multiplier
+        self.dp_delta = dp_delta
+        if update_log is not None and secure_aggregation:
+            raise ValueError("Com a agregação segura as atualizações individuais são ilegíveis; não há o que registrar.")
+        # Registro das atualizações para reprodução offline (None desativa).
+        self.update_log = UpdateLogWriter(update_log) if update_log is not None else None
         # Endereço do broker MQTT.
         self.broker_address = broker_address
         # Porta do broker MQTT.
         self.broker_port = broker_port
-        # Inicializa uma instância da rede neural global.
-        self.global_net = FederatedNet()
-        # Obtém os parâmetros iniciais da rede global.
+        # Nome do modelo no registro de 'federated_net' (ex.: 'cnn', 'resnet20', 'mlp').
+        self.model_name = model_name
+        # Inicializa uma instância da rede neural global (com as camadas locais no fim do buffer plano).
+        self.local_layers = list(local_layers or [])
+        self.global_net = build_model(model_name, local_layers=self.local_layers)
+        # Obtém os parâmetros iniciais da rede global (views do buffer plano, sempre atualizadas).
         self.global_parameters = self.global_net.get_parameters()
+        # Número de valores trocados e agregados: o buffer plano do modelo sem as camadas locais.
+        self.num_parameters = self.global_net.num_shared_values()
+        if self.local_layers:
+            print(f"Servidor: Camadas locais {self.local_layers}: {self.num_parameters} de {self.global_net.num_tracked_values()} valores são agregados.")
+        # Matriz pré-alocada [clientes x parâmetros]: cada cliente escreve sua atualização na própria linha,
+        # reutilizada em todas as rodadas (sem alocações por rodada). Pesos da média e buffer de saída
+        # da agregação também são pré-alocados.
+        # Com a agregação paralela, a matriz e a saída ficam em memória compartilhada com os workers e
+        # cada atualização já é acumulada (em paralelo por fatia) assim que chega.
+        self.sharded = None
+        self.client_updates = None
+        if secure_aggregation:
+            # Cada atualização mascarada é somada ao vetor da rodada assim que chega (ver secure_* abaixo).
+            self.aggregated_flat = torch.zeros(self.num_parameters)
+            if aggregation_workers > 0:
+                print("Servidor: Com a agregação segura, a soma é acumulada na thread do servidor; --aggregation-workers ignorado.")
+        elif aggregation_workers > 0 and aggregator != "fedavg":
+            # As regras robustas precisam de todas as atualizações ao mesmo tempo (não são acumuláveis).
+            print(f"Servidor: A agregação paralela só se aplica ao fedavg; '{aggregator}' roda na thread do servidor.")
+        elif aggregation_workers > 0:
+            self.sharded = ShardedAggregator(self.max_clients, self.num_parameters, aggregation_workers)
+            self.client_updates = torch.from_numpy(self.sharded.updates)
+            self.aggregated_flat = torch.from_numpy(self.sharded.out)
+        else:
+            self.client_updates = torch.zeros(self.max_clients, self.num_parameters)
+            self.aggregated_flat = torch.zeros(self.num_parameters)
+        self.aggregation_weights = torch.zeros(self.max_clients)
+        # Privacidade diferencial: buffer do ruído (reutilizado em todas as rodadas), acumulador de RDP e
+        # epsilon acumulado.
+        self.dp_noise = torch.empty(self.num_parameters) if dp_noise_multiplier else None
+        self.dp_accountant = RDPAccountant(dp_noise_multiplier) if dp_noise_multiplier is not None else None
+        self.dp_epsilon = None
+        # Mapeia o ID do cliente para a linha da matriz de atualizações (linhas de clientes que saíram
+        # são reaproveitadas no início da rodada seguinte).
+        self.client_slots = {}
+        # Clientes que receberam o modelo da rodada atual e dos quais se espera uma atualização.
+        self.round_participants = set()
+        # Mensagem serializada com o modelo global da rodada atual (gerada uma única vez por rodada)
+        # e o instante (relógio de parede) em que foi enviada.
+        self.global_payload = None
+        self.global_sent_at = None
+        # Versão (hash) do modelo global da rodada atual e a versão que cada cliente anunciou ter
+        # (no sinal de "pronto" ou como 'base_version' da sua última atualização).
+        self.global_version = None
+        self.client_versions = {}
+        # Cópias dos últimos modelos globais, por versão, usadas como base dos deltas enviados aos clientes.
+        self.version_history = OrderedDict()
+        self.version_history_size = 3
+        # Mensagem da rodada já codificada para cada versão base (os clientes costumam compartilhar a mesma).
+        self.round_payloads = {}
+        # Bytes efetivamente enviados a cada cliente na rodada atual.
+        self.round_bytes_sent = {}
+        # Broadcast por deltas quantizados: 'broadcast_flat' é o modelo que os clientes reconstroem
+        # (o servidor aplica a si mesmo os mesmos deltas quantizados que envia) e 'broadcast_delta' guarda
+        # (versão base, mensagem) do delta da rodada atual.
+        if broadcast_quantization not in (None, "int8"):
+            raise ValueError(f"Quantização de broadcast não suportada: {broadcast_quantization}")
+        self.broadcast_flat = np.zeros(self.num_parameters, dtype=np.float32) if broadcast_quantization else None
+        self.broadcast_delta = None
+        self.keyframe_interval = keyframe_interval
+        self.quantization_block_size = quantization_block_size
+        # Escalonamento do trabalho local: passos atribuídos a cada participante da rodada atual
+        # (chaves são os IDs em texto, como no cabeçalho JSON).
+        self.target_round_time = target_round_time
+        self.min_local_steps = min_local_steps
+        self.max_local_epochs = max_local_epochs
+        self.round_schedule = {}
+        # Agregação segura: soma uint32 das atualizações mascaradas da rodada, dados da rodada enviados no
+        # cabeçalho (chaves públicas, pesos e escala), clientes que saíram após receber o modelo (None até
+        # o pedido de desmascaramento) e as sementes reveladas por cada sobrevivente.
+        self.secure_sum = np.zeros(self.num_parameters, dtype=np.uint32) if secure_aggregation else None
+        self.secure_round = None
+        self.secure_dropped = None
+        self.secure_revealed = {}
         # O número da rodada atual.
         self.current_round = 0
+        # Profiling opcional (desativado quando profile_dir é None).
+        self.profiler = RoundProfiler("server", profile_dir, torch_profile_round, cprofile)
+        # Linha do tempo das rodadas (download, treino, upload e espera de cada cliente).
+        self.tracer = RoundTracer(trace_path)
 
         # Inicializa o cliente MQTT do servidor.
         # mqtt.CallbackAPIVersion.VERSION2 especifica o uso da API de callbacks da versão 2.0.
-        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, "server")
+        self.client = mqtt_client or mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, "server")
+        # NOVO: Caminho de saída do modelo global final (padrão: na mesma pasta do script do servidor).
+        self.output_path = output_path or os.path.join(os.path.dirname(__file__), "global_parameters.pkl")
         
         # Atribui os métodos de callback para eventos MQTT.
         self.client.on_connect = self.on_connect
@@ -56,18 +228,37 @@ class Server:
         
         # Dicionário para armazenar os pesos recebidos de cada cliente por rodada.
         self.round_client_parameters = defaultdict(dict)
+        # Tamanho (em bytes) das mensagens recebidas de cada cliente por rodada.
+        self.round_payload_sizes = defaultdict(dict)
+        # Número de amostras de treino informado por cada cliente por rodada (peso na média).
+        self.round_sample_counts = defaultdict(dict)
+        # Métricas da avaliação local (conjunto de validação de cada cliente) por rodada.
+        self.round_evaluations = defaultdict(dict)
+        # Telemetria de memória informada por cada cliente por rodada.
+        self.round_client_memory = defaultdict(dict)
+        # Os dicionários por rodada acima só guardam a rodada em andamento: as anteriores são liberadas ao
+        # avançar (ver release_round_state).
+        # Avaliação federada da última rodada concluída (ver federated_evaluation).
+        self.last_evaluation = None
         # Conjunto para rastrear quais clientes já enviaram seus pesos na rodada atual.
         self.received_clients_in_round = set()
-        # Conjunto para rastrear quais clientes já sinalizaram que estão prontos.
-        self.connected_clients = set() 
         
         # Registra o tempo de início da rodada para calcular a duração.
         self.round_start_time = time.time()
-        # NOVO: Lista para armazenar métricas detalhadas de cada rodada.
-        self.round_metrics = [] 
+        # NOVO: Métricas detalhadas das últimas 'metrics_history' rodadas.
+        self.round_metrics = deque(maxlen=metrics_history)
+        self.memory_census_interval = memory_census_interval
 
+        # Tópicos de entrada (sinais de pronto e atualizações dos clientes).
+        self.ready_topic = f"{topic_prefix}client/ready"
+        self.updates_topic = f"{topic_prefix}client/updated_parameters/"
+        # Heartbeats periódicos e avisos de saída (explícitos ou "last will" publicados pelo broker).
+        self.heartbeat_topic = f"{topic_prefix}client/heartbeat"
+        self.offline_topic = f"{topic_prefix}client/offline"
+        # Agregação segura: sementes reveladas pelos sobreviventes na fase de desmascaramento.
+        self.secure_seeds_topic = f"{topic_prefix}client/secagg_seeds/"
         # NOVO: Define o tópico para enviar o sinal de término aos clientes.
-        self.terminate_clients_topic = "client/terminate" 
+        self.terminate_clients_topic = f"{topic_prefix}client/terminate"
 
     # Método de callback chamado quando o servidor se conecta ao broker MQTT.
     # 'properties' é um novo argumento na API v2.0 do paho-mqtt.
@@ -76,28 +267,212 @@ class Server:
         if rc == 0:
             print("Servidor: Conectado ao broker MQTT com sucesso!")
             # Inscreve-se no tópico genérico para receber atualizações de parâmetros de todos os clientes.
-            self.client.subscribe("client/updated_parameters/+") 
+            self.client.subscribe(f"{self.updates_topic}+")
             # Inscreve-se no tópico para receber sinais de "pronto" dos clientes.
-            self.client.subscribe("client/ready") 
-            print("Servidor: Inscrito nos tópicos 'client/updated_parameters/+' e 'client/ready'.")
+            self.client.subscribe(self.ready_topic)
+            # Inscreve-se nos tópicos de heartbeat e de saída de clientes.
+            self.client.subscribe(self.heartbeat_topic)
+            self.client.subscribe(self.offline_topic)
+            if self.secure_aggregation:
+                self.client.subscribe(f"{self.secure_seeds_topic}+")
+            print(f"Servidor: Inscrito nos tópicos '{self.updates_topic}+', '{self.ready_topic}', '{self.heartbeat_topic}' e '{self.offline_topic}'.")
         else:
             print(f"Servidor: Falha na conexão, código de retorno: {rc}")
 
+    # Decodifica a payload de um sinal de "pronto" ou de um heartbeat: JSON com o ID do cliente, a rodada/versão
+    # do modelo global que ele já tem e suas capacidades, ou apenas o ID (formato antigo).
+    # Retorna (client_id, rodada, versão, capacidades).
+    @staticmethod
+    def parse_ready_payload(payload):
+        text = payload.decode('utf-8')
+        try:
+            return int(text), None, None, {}
+        except ValueError:
+            data = json.loads(text)
+            return int(data['client_id']), data.get('round'), data.get('version'), data.get('capabilities') or {}
+
+    # Indica se o ID pode participar do treinamento (todos, se 'client_ids' não foi informado).
+    def accepts_client(self, client_id):
+        return self.client_ids is None or client_id in self.client_ids
+
     # NOVO: Manipulador de mensagens para o tópico 'client/ready'.
     def on_client_ready_message(self, client, userdata, msg):
         try:
-            # Decodifica o ID do cliente da payload da mensagem.
-            client_id = int(msg.payload.decode('utf-8'))
-            # Se o cliente ainda não estiver na lista de clientes conectados, o adiciona.
-            if client_id not in self.connected_clients:
-                self.connected_clients.add(client_id)
-                print(f"Servidor: Cliente {client_id} sinalizou estar pronto. Total de clientes prontos: {len(self.connected_clients)}/{self.num_clients}")
-        # Captura erro se a payload não puder ser convertida para int.
-        except ValueError:
+            # Decodifica o ID do cliente, a versão do modelo que ele anuncia ter e suas capacidades.
+            client_id, round_num, version, capabilities = self.parse_ready_payload(msg.payload)
+        # Captura erro se a payload não puder ser interpretada.
+        except (ValueError, KeyError, TypeError, AttributeError):
             print(f"Servidor: Mensagem 'ready' mal formatada de {msg.topic}: {msg.payload}")
+            return
+        if not self.accepts_client(client_id):
+            print(f"Servidor: Cliente {client_id} não está na lista de clientes aceitos; ignorado.")
+            return
+        self.client_versions[client_id] = version
+        # Um cliente novo (ou que volta após sair) entra no registro.
+        if self.registry.join(client_id, capabilities):
+            print(f"Servidor: Cliente {client_id} sinalizou estar pronto. Total de clientes prontos: {len(self.registry.online_ids())}/{self.num_clients}")
+            if self.secure_aggregation and not capabilities.get('secagg_public_key'):
+                print(f"Servidor: Cliente {client_id} não anunciou chave pública; não participa da agregação segura.")
+            elif self.global_payload is not None and client_id not in self.round_participants:
+                print(f"Servidor: Cliente {client_id} participará a partir da próxima rodada.")
+        # Um cliente que reinicia durante uma rodada (sem ter enviado sua atualização) recebe o modelo da
+        # rodada de novo, ou apenas a confirmação de que o modelo que ele já tem é o atual.
+        if self.global_payload is not None and client_id in self.round_participants and client_id not in self.received_clients_in_round:
+            print(f"Servidor: Cliente {client_id} reconectou durante a rodada {self.current_round} (tem o modelo da rodada {round_num}).")
+            if self.secure_round is not None and capabilities.get('secagg_public_key') != self.secure_round['public_keys'].get(str(client_id)):
+                # Com uma chave nova, o cliente não consegue gerar as máscaras da rodada: para a rodada atual
+                # ele conta como quem saiu, e participa da próxima.
+                print(f"Servidor: Cliente {client_id} voltou com outra chave pública; participará a partir da próxima rodada.")
+                self.handle_departure(client_id)
+            else:
+                self.resend_global_parameters(client_id)
+
+    # Manipulador do tópico 'client/heartbeat'. O heartbeat tem o mesmo formato do sinal de "pronto";
+    # o de um cliente desconhecido (ex.: após o servidor reiniciar) vale como entrada.
+    def on_heartbeat_message(self, client, userdata, msg):
+        try:
+            client_id = self.parse_ready_payload(msg.payload)[0]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            print(f"Servidor: Heartbeat mal formatado: {msg.payload}")
+            return
+        if not self.registry.seen(client_id):
+            self.on_client_ready_message(client, userdata, msg)
+
+    # Manipulador do tópico 'client/offline': saída explícita ou "last will" de uma conexão perdida.
+    def on_client_offline_message(self, client, userdata, msg):
+        try:
+            data = json.loads(msg.payload.decode('utf-8'))
+            client_id = int(data['client_id'])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            print(f"Servidor: Aviso de saída mal formatado: {msg.payload}")
+            return
+        if self.registry.leave(client_id):
+            print(f"Servidor: Cliente {client_id} saiu ({data.get('reason', 'desconhecido')}).")
+            self.handle_departure(client_id)
+
+    # Um participante que sai deixa de ser esperado na rodada atual (sua atualização, se já recebida, é mantida).
+    # Na agregação segura, um sobrevivente que sai antes de revelar suas sementes torna a soma irrecuperável.
+    def handle_departure(self, client_id):
+        if (self.secure_dropped is not None and client_id in self.received_clients_in_round
+                and client_id not in self.secure_revealed):
+            self.discard_round(f"o cliente {client_id} saiu antes de revelar suas sementes")
+            return
+        if client_id in self.round_participants and client_id not in self.received_clients_in_round:
+            self.round_participants.discard(client_id)
+            print(f"Servidor: A rodada {self.current_round} continua sem o cliente {client_id} ({len(self.round_participants)} participantes).")
+            self.maybe_complete_round()
+
+    # Fecha a rodada quando todos os participantes restantes enviaram suas atualizações. Se todos saíram
+    # sem enviar nada, a rodada é redistribuída aos clientes online (se houver algum).
+    def maybe_complete_round(self):
+        if self.global_payload is None or (self.num_rounds is not None and self.current_round >= self.num_rounds):
+            return
+        if self.received_clients_in_round and self.round_participants <= self.received_clients_in_round:
+            if self.secure_aggregation and not self.secure_round_unmasked():
+                return
+            self.complete_round()
+        elif not self.round_participants and self.registry.online_ids():
+            print(f"Servidor: Nenhum participante restante; redistribuindo a rodada {self.current_round}.")
+            self.publish_round("global_parameters", encode=False)
+
+    # Agregação segura: indica se a soma da rodada já pode ser decodificada. Se participantes saíram depois
+    # de receber o modelo, as máscaras deles com os sobreviventes continuam na soma: o servidor pede (uma vez)
+    # a cada sobrevivente as sementes da rodada compartilhadas com quem saiu e espera todas chegarem.
+    def secure_round_unmasked(self):
+        received = self.received_clients_in_round
+        dropped = sorted(int(c) for c in self.secure_round['public_keys'] if int(c) not in received)
+        if not dropped:
+            return True
+        if len(received) < MIN_SECURE_SURVIVORS:
+            self.discard_round(f"{len(received)} atualização recebida e {len(dropped)} participantes saíram")
+            return False
+        if self.secure_dropped is None:
+            offline = sorted(c for c in received if not self.registry.is_online(c))
+            if offline:
+                self.discard_round(f"os clientes {offline} saíram depois de enviar suas atualizações mascaradas")
+                return False
+            self.secure_dropped = dropped
+            request = json.dumps({'round': self.current_round, 'dropped': dropped})
+            for client_id in sorted(received):
+                self.client.publish(f"{self.topic_prefix}server/secagg_unmask/{client_id}", request, qos=1)
+            print(f"Servidor: Clientes {dropped} saíram da rodada {self.current_round}; sementes solicitadas aos sobreviventes.")
+            return False
+        return received <= self.secure_revealed.keys()
+
+    # Manipulador do tópico 'client/secagg_seeds/+': sementes da rodada reveladas por um sobrevivente.
+    def on_secure_seeds_message(self, client, userdata, msg):
+        try:
+            client_id = int(msg.topic.split('/')[-1])
+            data = json.loads(msg.payload.decode('utf-8'))
+            seeds = {int(peer): bytes.fromhex(seed) for peer, seed in data['seeds'].items()}
+        except (ValueError, KeyError, TypeError, AttributeError):
+            print(f"Servidor: Sementes mal formatadas em {msg.topic}.")
+            return
+        if (self.secure_dropped is None or data.get('round') != self.current_round
+                or client_id not in self.received_clients_in_round or client_id in self.secure_revealed):
+            return
+        if sorted(seeds) != self.secure_dropped:
+            self.discard_round(f"o cliente {client_id} não revelou as sementes de todos os que saíram")
+            return
+        self.secure_revealed[client_id] = seeds
+        self.maybe_complete_round()
+
+    # Descarta a rodada atual sem agregar (o modelo global não muda) e passa para a seguinte.
+    def discard_round(self, reason):
+        print(f"Servidor: Rodada {self.current_round} descartada: {reason}.")
+        self.tracer.pending.clear()
+        self.advance_round()
+
+    # Verificação periódica (laço de start): clientes sem heartbeat dentro do prazo são considerados
+    # desconectados.
+    def check_liveness(self):
+        with self.lock:
+            for client_id in self.registry.expire():
+                print(f"Servidor: Cliente {client_id} sem heartbeat há mais de {self.registry.heartbeat_timeout:.0f}s; considerado desconectado.")
+                self.handle_departure(client_id)
+            self.maybe_complete_round()
+
+    # Reenvia o modelo global da rodada atual a um cliente (ver payload_for).
+    def resend_global_parameters(self, client_id):
+        self.publish_global_parameters(client_id, "global_parameters")
+
+    # Escolhe a menor mensagem que leva o cliente ao modelo global atual, a partir da versão que ele tem:
+    #   nada (apenas o cabeçalho), se ele já tem a versão atual;
+    #   um delta XOR comprimido, se a versão dele está no histórico e o delta é menor que o modelo;
+    #   o modelo completo, nos demais casos.
+    def payload_for(self, client_id):
+        held = self.client_versions.get(client_id)
+        if held is not None and held == self.global_version:
+            header = self.round_header()
+            del header['version']
+            return encode_unchanged(self.num_parameters, self.global_version, **header)
+        if held not in self.round_payloads:
+            payload = self.global_payload
+            base = self.version_history.get(held) if held is not None else None
+            if self.broadcast_delta is not None and held == self.broadcast_delta[0]:
+                # Delta quantizado da rodada, calculado uma única vez em encode_global_parameters.
+                delta = self.broadcast_delta[1]
+            elif base is not None:
+                with self.profiler.span("encode_delta", base_version=held):
+                    delta = encode_xor_delta(self.version_history[self.global_version], base, held,
+                                             **self.round_header())
+            else:
+                delta = payload
+            if len(delta) < len(payload):
+                payload = delta
+            self.round_payloads[held] = payload
+        return self.round_payloads[held]
+
+    # Publica para um cliente a mensagem da rodada atual escolhida por payload_for.
+    def publish_global_parameters(self, client_id, kind):
+        payload = self.payload_for(client_id)
+        self.round_bytes_sent[client_id] = len(payload)
+        self.client.publish(f"{self.topic_prefix}server/{kind}/{client_id}", payload, qos=1)
 
     # Manipulador de mensagens para o tópico 'client/updated_parameters/+'.
     def on_updated_parameters_message(self, client, userdata, msg):
+        # Instante de chegada da atualização (usado na linha do tempo da rodada).
+        recv_at = time.time()
         topic = msg.topic
         payload = msg.payload
         try:
@@ -107,153 +482,480 @@ class Server:
             print(f"Servidor: Tópico inesperado ou mal formatado: {topic}")
             return
 
-        # Des-serializa os parâmetros atualizados recebidos do cliente.
-        parameters = pickle.loads(payload)
-        
-        # Garante que haja um dicionário para a rodada atual nos parâmetros do cliente.
-        if self.current_round not in self.round_client_parameters:
-            self.round_client_parameters[self.current_round] = {}
+        # Reentregas (QoS 1) e reenvios do cliente não podem ser contados duas vezes na média.
+        if client_id in self.received_clients_in_round:
+            print(f"Servidor: Atualização duplicada do cliente {client_id} na rodada {self.current_round} ignorada.")
+            return
+
+        # A primeira atualização recebida abre a rodada no profiler (o trabalho da rodada roda nesta thread).
+        if not self.received_clients_in_round:
+            self.profiler.begin_round(self.current_round)
+
+        # Decodifica a mensagem e copia o modelo plano recebido para a linha do cliente na matriz de atualizações.
+        with self.profiler.span("receive_update", client_id=client_id, bytes=len(payload)):
+            try:
+                header, body = decode_parameters(payload)
+                if header['numel'] != self.num_parameters:
+                    raise ValueError(f"{header['numel']} valores recebidos, {self.num_parameters} esperados")
+                # Atualizações de rodadas anteriores (atrasadas ou reentregues) são descartadas.
+                if header.get('round', self.current_round) != self.current_round:
+                    print(f"Servidor: Atualização do cliente {client_id} para a rodada {header['round']} descartada (rodada atual: {self.current_round}).")
+                    return
+                if self.secure_aggregation:
+                    masked = self.decode_secure_update(client_id, header, body)
+                else:
+                    slot = self.client_slot(client_id)
+            except (ValueError, KeyError) as e:
+                print(f"Servidor: Parâmetros inválidos do cliente {client_id}: {e}")
+                return
+            if self.secure_aggregation:
+                # Soma módulo 2^32: as máscaras pareadas se cancelam quando todos os participantes chegam.
+                self.secure_sum += masked
+                parameters = None
+            else:
+                parameters = self.client_updates[slot]
+                parameters.numpy()[:] = np.frombuffer(body, dtype=np.float32)
 
         # Armazena os parâmetros recebidos do cliente específico para a rodada atual.
         self.round_client_parameters[self.current_round][client_id] = parameters
+        self.round_payload_sizes[self.current_round][client_id] = len(payload)
+        # O cliente treinou a partir dessa versão e a mantém: é a base do delta da próxima rodada.
+        self.client_versions[client_id] = header.get('base_version')
+        # Peso do cliente na média (ver update_weight).
+        self.round_sample_counts[self.current_round][client_id] = self.update_weight(header)
+        # Vazão de treinamento medida pelo cliente nesta rodada.
+        self.registry.record_throughput(client_id, header.get('samples_per_s'))
+        # Avaliação local antes e depois do treino (clientes sem conjunto de validação não a enviam).
+        evaluation = header.get('evaluation')
+        if isinstance(evaluation, dict) and evaluation.get('samples'):
+            self.round_evaluations[self.current_round][client_id] = evaluation
+        if isinstance(header.get('memory'), dict):
+            self.round_client_memory[self.current_round][client_id] = header['memory']
+        # Na agregação paralela, a redução desta linha começa já, enquanto as próximas atualizações chegam.
+        if self.sharded is not None:
+            self.sharded.add(slot, self.round_sample_counts[self.current_round][client_id])
+        # Registra os timestamps ecoados pelo cliente para a linha do tempo da rodada.
+        self.tracer.record_update(client_id, header, self.global_sent_at, recv_at)
         # Adiciona o ID do cliente ao conjunto de clientes que já enviaram pesos nesta rodada.
         self.received_clients_in_round.add(client_id)
+        # Grava a mensagem aceita, como chegou, para a reprodução offline.
+        if self.update_log is not None:
+            self.update_log.record_update(self.current_round, client_id, payload, recv_at,
+                                          self.round_sample_counts[self.current_round][client_id])
         
         print(f"Servidor: Recebido parâmetros do cliente {client_id} para a rodada {self.current_round}.")
 
-        # Verifica se todos os clientes esperados já enviaram seus pesos para a rodada atual.
-        if len(self.received_clients_in_round) == self.num_clients:
-            # Calcula a duração total da rodada.
-            end_round_time = time.time()
-            round_duration = end_round_time - self.round_start_time
+        # Verifica se todos os participantes da rodada já enviaram seus pesos.
+        self.maybe_complete_round()
 
-            print(f"\n{'-'*50}")
-            print(f"Servidor: Rodada {self.current_round} concluída pelos clientes.")
-            print(f"Servidor: Tempo total da Rodada {self.current_round}: {round_duration:.2f} segundos.")
-            
-            aggregation_start_time = time.time() # NOVO: Registra tempo de início da agregação.
-            self.aggregate_parameters() # Chama o método para agregar os pesos.
-            aggregation_end_time = time.time() # NOVO: Registra tempo de fim da agregação.
-            aggregation_time = aggregation_end_time - aggregation_start_time # NOVO: Calcula duração da agregação.
-
-            # NOVO: Coleta de métricas da rodada para registro.
-            # Tamanho dos parâmetros globais enviados pelo servidor (download para clientes).
-            current_round_data_sent_per_client = sys.getsizeof(pickle.dumps(self.global_parameters)) 
-            # Média do tamanho dos parâmetros atualizados recebidos dos clientes (upload de clientes).
-            current_round_data_received_per_client = np.mean([sys.getsizeof(pickle.dumps(p)) for p in self.round_client_parameters[self.current_round].values()])
-            
-            # NOVO: Adiciona as métricas da rodada atual à lista de histórico.
-            self.round_metrics.append({
-                'round_num': self.current_round,
-                'round_duration': round_duration,
-                'aggregation_time': aggregation_time,
-                'data_sent_per_client_kb': current_round_data_sent_per_client / 1024,
-                'data_received_per_client_kb': current_round_data_received_per_client / 1024
-            })
-            
-            # NOVO: Exibe métricas detalhadas da rodada no terminal.
-            print(f"Servidor: Agregação concluída em {aggregation_time:.4f} segundos.")
-            print(f"Servidor: Média de dados enviados aos clientes nesta rodada: {current_round_data_sent_per_client / 1024:.2f} KB/cliente")
-            print(f"Servidor: Média de dados recebidos dos clientes nesta rodada: {current_round_data_received_per_client / 1024:.2f} KB/cliente")
-            # Estimativa do total de dados transferidos (enviado + recebido) para todos os clientes nesta rodada.
-            print(f"Servidor: Total de dados transferidos (aprox.) nesta rodada: {((current_round_data_sent_per_client * self.num_clients) + (current_round_data_received_per_client * self.num_clients)) / 1024:.2f} KB")
+    # Peso de uma atualização na média: o número de amostras de treino (clientes antigos não informam
+    # 'num_samples'; com peso 1 a agregação volta a ser a média simples). Com o ruído de privacidade
+    # diferencial a média é sempre simples, para que a sensibilidade a qualquer cliente seja clip_norm / K.
+    def update_weight(self, header):
+        if self.dp_noise_multiplier is not None:
+            return 1
+        return header.get('num_samples') or 1
+
+    # Avaliação federada da rodada: média das métricas locais dos clientes ponderada pelo tamanho dos seus
+    # conjuntos de validação, do modelo recebido ('before') e do modelo treinado ('after'). None se nenhum
+    # cliente avaliou.
+    def federated_evaluation(self):
+        evaluations = list(self.round_evaluations[self.current_round].values())
+        total = sum(e['samples'] for e in evaluations)
+        if not total:
+            return None
+        result = {'clients': len(evaluations), 'samples': total}
+        for stage in ('before', 'after'):
+            for metric in ('loss', 'accuracy'):
+                result[f'{stage}_{metric}'] = sum(e['samples'] * e[stage][metric] for e in evaluations) / total
+        return result
 
+    # Agregação segura: valida uma atualização mascarada. Só participantes da rodada (com as máscaras
+    # geradas a partir das chaves do cabeçalho) entram na soma, e quem já saiu da rodada não volta a ela:
+    # as sementes dele podem ter sido reveladas.
+    def decode_secure_update(self, client_id, header, body):
+        if header.get('encoding') != ENCODING_SECAGG_U32:
+            raise ValueError(f"atualização '{header.get('encoding', 'full')}' sem máscara na agregação segura")
+        if str(client_id) not in self.secure_round['public_keys'] or client_id not in self.round_participants:
+            raise ValueError("o cliente não é participante da agregação segura desta rodada")
+        if header.get('scale') != self.secure_round['scale']:
+            raise ValueError(f"escala {header.get('scale')} diferente da escala da rodada")
+        return decode_masked_update(header, body)
 
-            self.current_round += 1 # Incrementa o contador da rodada.
-            self.received_clients_in_round.clear() # Limpa o conjunto de clientes recebidos para a próxima rodada.
+    # Fecha a rodada atual: agrega as atualizações, registra as métricas e avança (advance_round).
+    def complete_round(self):
+        # Calcula a duração total da rodada.
+        end_round_time = time.time()
+        round_duration = end_round_time - self.round_start_time
+
+        print(f"\n{'-'*50}")
+        print(f"Servidor: Rodada {self.current_round} concluída pelos clientes.")
+        print(f"Servidor: Tempo total da Rodada {self.current_round}: {round_duration:.2f} segundos.")
+        
+        aggregation_start_time = time.time() # NOVO: Registra tempo de início da agregação.
+        self.aggregate_parameters() # Chama o método para agregar os pesos.
+        aggregation_end_time = time.time() # NOVO: Registra tempo de fim da agregação.
+        aggregation_time = aggregation_end_time - aggregation_start_time # NOVO: Calcula duração da agregação.
+        # Reconstrói a linha do tempo da rodada e identifica o caminho crítico.
+        trace = self.tracer.finish_round(self.current_round, aggregation_start_time, aggregation_end_time)
+        critical_path = trace.get('critical_path')
+        # Avaliação federada: o servidor não tem dados de teste; as métricas vêm da validação local dos clientes.
+        self.last_evaluation = self.federated_evaluation()
+        # Memória do servidor após a agregação e a informada pelos clientes com as atualizações.
+        memory = memory_snapshot(census=census_due(self.current_round, self.memory_census_interval))
+        client_memory = {str(client_id): m for client_id, m in self.round_client_memory[self.current_round].items()}
+
+        # NOVO: Coleta de métricas da rodada para registro.
+        # Tamanho da mensagem com os parâmetros globais enviada pelo servidor nesta rodada (download para clientes).
+        current_round_data_sent_per_client = np.mean(list(self.round_bytes_sent.values())) if self.round_bytes_sent else len(self.global_payload)
+        # Média do tamanho das mensagens recebidas dos clientes (upload de clientes).
+        current_round_data_received_per_client = np.mean(list(self.round_payload_sizes[self.current_round].values()))
+        
+        # NOVO: Adiciona as métricas da rodada atual à lista de histórico.
+        self.round_metrics.append({
+            'round_num': self.current_round,
+            'round_duration': round_duration,
+            'aggregation_time': aggregation_time,
+            'data_sent_per_client_kb': current_round_data_sent_per_client / 1024,
+            'data_received_per_client_kb': current_round_data_received_per_client / 1024,
+            'critical_client': critical_path['client_id'] if critical_path else None,
+            'bottleneck': critical_path['bottleneck'] if critical_path else None,
+            'dp_epsilon': self.dp_epsilon,
+            'evaluation': self.last_evaluation,
+            'memory': memory,
+            'client_memory': client_memory
+        })
+        
+        # NOVO: Exibe métricas detalhadas da rodada no terminal.
+        print(f"Servidor: Agregação concluída em {aggregation_time:.4f} segundos.")
+        client_rss = [m['rss_mb'] for m in client_memory.values() if m.get('rss_mb') is not None]
+        print(f"Servidor: Memória: {format_memory(memory)}"
+              + (f" | RSS máximo dos clientes {max(client_rss):.1f} MB" if client_rss else ""))
+        if self.last_evaluation is not None:
+            ev = self.last_evaluation
+            print(f"Servidor: Avaliação federada ({ev['clients']} clientes, {ev['samples']} amostras): acurácia "
+                  f"{ev['before_accuracy']:.2f}% -> {ev['after_accuracy']:.2f}% | perda {ev['before_loss']:.4f} -> {ev['after_loss']:.4f}")
+        if self.dp_epsilon is not None:
+            print(f"Servidor: Privacidade acumulada após {self.dp_accountant.rounds} rodadas: epsilon = {self.dp_epsilon:.3f} (delta = {self.dp_delta:g}).")
+        if critical_path:
+            stages = ' | '.join(f"{stage} {seconds:.3f}s" for stage, seconds in critical_path['stages'].items())
+            print(f"Servidor: Caminho crítico: cliente {critical_path['client_id']} ({stages}); gargalo: {critical_path['bottleneck']}")
+        print(f"Servidor: Média de dados enviados aos clientes nesta rodada: {current_round_data_sent_per_client / 1024:.2f} KB/cliente")
+        print(f"Servidor: Média de dados recebidos dos clientes nesta rodada: {current_round_data_received_per_client / 1024:.2f} KB/cliente")
+        # Estimativa do total de dados transferidos (enviado + recebido) para todos os clientes nesta rodada.
+        num_received = len(self.received_clients_in_round)
+        print(f"Servidor: Total de dados transferidos (aprox.) nesta rodada: {((current_round_data_sent_per_client * num_received) + (current_round_data_received_per_client * num_received)) / 1024:.2f} KB")
+        self.advance_round()
+        print(f"{'-'*50}\n")
+
+    # Inicia a próxima rodada ou, após a última, encerra o treinamento.
+    def advance_round(self):
+        self.current_round += 1 # Incrementa o contador da rodada.
+        self.received_clients_in_round.clear() # Limpa o conjunto de clientes recebidos para a próxima rodada.
+        self.release_round_state() # Libera o estado por rodada da rodada concluída.
+        
+        # Verifica se ainda há rodadas a serem executadas.
+        if self.current_round < self.num_rounds:
+            print(f"Servidor: Iniciando Rodada {self.current_round + 1} de {self.num_rounds}.")
+            self.distribute_global_parameters() # Distribui os novos parâmetros globais.
+            self.round_start_time = time.time() # Reinicia o timer para a nova rodada.
+            self.profiler.end_round() # Grava o trace da rodada concluída.
+        else:
+            # Se todas as rodadas foram concluídas.
+            print(f"\n{'='*50}")
+            print("Servidor: Treinamento federado concluído!")
+            print(f"Servidor: Total de Rodadas Executadas: {self.num_rounds}")
+            print(f"{'='*50}\n")
             
-            # Verifica se ainda há rodadas a serem executadas.
-            if self.current_round < self.num_rounds:
-                print(f"Servidor: Iniciando Rodada {self.current_round + 1} de {self.num_rounds}.")
-                self.distribute_global_parameters() # Distribui os novos parâmetros globais.
-                self.round_start_time = time.time() # Reinicia o timer para a nova rodada.
-            else:
-                # Se todas as rodadas foram concluídas.
-                print(f"\n{'='*50}")
-                print("Servidor: Treinamento federado concluído!")
-                print(f"Servidor: Total de Rodadas Executadas: {self.num_rounds}")
-                print(f"{'='*50}\n")
-                
-                # NOVO: Exibe o resumo das métricas de todas as rodadas no terminal.
-                print("\n--- RESUMO DAS MÉTRICAS POR RODADA ---")
-                for r_metrics in self.round_metrics:
-                    print(f"Rodada {r_metrics['round_num']}: Tempo Rodada {r_metrics['round_duration']:.2f}s | Agregação {r_metrics['aggregation_time']:.4f}s | Dados enviados {r_metrics['data_sent_per_client_kb']:.2f}KB/c | Dados recebidos {r_metrics['data_received_per_client_kb']:.2f}KB/c")
-                print("--------------------------------------\n")
-
-                self.save_global_parameters() # Salva o modelo global final.
-                # NOVO: Publica uma mensagem no tópico de término para que os clientes encerrem.
-                self.client.publish(self.terminate_clients_topic, "TERMINATE", qos=1) 
-                print(f"Servidor: Sinal de término enviado aos clientes em '{self.terminate_clients_topic}'.")
-                self.client.disconnect() # Desconecta o cliente MQTT do servidor.
-                sys.exit(0) # Termina o script do servidor.
-            print(f"{'-'*50}\n")
+            # NOVO: Exibe o resumo das métricas de todas as rodadas no terminal.
+            print("\n--- RESUMO DAS MÉTRICAS POR RODADA ---")
+            if len(self.round_metrics) < self.num_rounds:
+                print(f"(últimas {len(self.round_metrics)} rodadas)")
+            for r_metrics in self.round_metrics:
+                print(f"Rodada {r_metrics['round_num']}: Tempo Rodada {r_metrics['round_duration']:.2f}s | Agregação {r_metrics['aggregation_time']:.4f}s | Dados enviados {r_metrics['data_sent_per_client_kb']:.2f}KB/c | Dados recebidos {r_metrics['data_received_per_client_kb']:.2f}KB/c")
+            print("--------------------------------------\n")
+
+            self.profiler.end_round() # Grava o trace da última rodada.
+            self.save_global_parameters() # Salva o modelo global final.
+            # O modelo final fecha o registro de atualizações (resultado da última rodada).
+            if self.update_log is not None:
+                self.update_log.record_global(self.current_round, self.global_net.export_shared())
+                self.update_log.close()
+            # NOVO: Publica uma mensagem no tópico de término para que os clientes encerrem.
+            self.client.publish(self.terminate_clients_topic, "TERMINATE", qos=1) 
+            print(f"Servidor: Sinal de término enviado aos clientes em '{self.terminate_clients_topic}'.")
+            self.client.disconnect() # Desconecta o cliente MQTT do servidor.
+            sys.exit(0) # Termina o script do servidor.
+
+    # Descarta o estado por rodada (atualizações, tamanhos, pesos, avaliações e memória dos clientes) das
+    # rodadas anteriores a 'keep_from' (padrão: a rodada atual). As linhas da matriz de atualizações e os
+    # buffers da agregação não são liberados: são reaproveitados na rodada seguinte.
+    def release_round_state(self, keep_from=None):
+        keep_from = self.current_round if keep_from is None else keep_from
+        for state in (self.round_client_parameters, self.round_payload_sizes, self.round_sample_counts,
+                      self.round_evaluations, self.round_client_memory):
+            for round_num in [r for r in state if r < keep_from]:
+                del state[round_num]
 
     # NOVO: Wrapper para on_message para direcionar mensagens para os manipuladores corretos.
     # O paho-mqtt chama apenas um on_message, então este método decide qual manipulador chamar
     # com base no tópico da mensagem recebida.
+    # Os manipuladores rodam sob a trava do estado da rodada (ver check_liveness).
     def _on_message_handler_wrapper(self, client, userdata, msg):
-        # Se a mensagem for um sinal de cliente pronto.
-        if msg.topic == "client/ready":
-            self.on_client_ready_message(client, userdata, msg)
-        # Se a mensagem for de parâmetros atualizados de um cliente.
-        elif msg.topic.startswith("client/updated_parameters/"):
-            self.on_updated_parameters_message(client, userdata, msg)
-        else:
-            print(f"Servidor: Mensagem recebida em tópico não esperado: {msg.topic}")
+        with self.lock:
+            # Se a mensagem for um sinal de cliente pronto.
+            if msg.topic == self.ready_topic:
+                self.on_client_ready_message(client, userdata, msg)
+            # Se a mensagem for de parâmetros atualizados de um cliente.
+            elif msg.topic.startswith(self.updates_topic):
+                self.on_updated_parameters_message(client, userdata, msg)
+            # Heartbeats e avisos de saída.
+            elif msg.topic == self.heartbeat_topic:
+                self.on_heartbeat_message(client, userdata, msg)
+            elif msg.topic == self.offline_topic:
+                self.on_client_offline_message(client, userdata, msg)
+            elif msg.topic.startswith(self.secure_seeds_topic):
+                self.on_secure_seeds_message(client, userdata, msg)
+            else:
+                print(f"Servidor: Mensagem recebida em tópico não esperado: {msg.topic}")
+
+
+    # Retorna a linha da matriz de atualizações reservada para o cliente (a primeira linha livre).
+    def client_slot(self, client_id):
+        if client_id not in self.client_slots:
+            used = set(self.client_slots.values())
+            free = next((row for row in range(self.max_clients) if row not in used), None)
+            if free is None:
+                raise ValueError(f"mais clientes do que os {self.max_clients} suportados")
+            self.client_slots[client_id] = free
+        return self.client_slots[client_id]
 
+    # Define os participantes da rodada que começa: os clientes online, até a capacidade 'max_clients'.
+    # As linhas de clientes que saíram são liberadas (entre rodadas a matriz não está em uso).
+    def select_participants(self):
+        online = self.registry.online_ids()
+        if self.secure_aggregation:
+            # Sem chave pública, o cliente não consegue gerar as máscaras da agregação segura.
+            online = [c for c in online if self.registry.get(c).capabilities.get('secagg_public_key')]
+        for client_id in [c for c in self.client_slots if c not in online]:
+            del self.client_slots[client_id]
+        participants = [c for c in online if c in self.client_slots]
+        for client_id in online:
+            if len(participants) >= self.max_clients:
+                break
+            if client_id not in self.client_slots:
+                self.client_slot(client_id)
+                participants.append(client_id)
+        if len(participants) < len(online):
+            print(f"Servidor: {len(online) - len(participants)} clientes aguardam vaga (capacidade: {self.max_clients}).")
+        self.round_participants = set(participants)
+        return sorted(participants)
 
     # Método para agregar os parâmetros (pesos) recebidos dos clientes.
     def aggregate_parameters(self):
-        # Inicializa um novo dicionário de parâmetros com zeros, com a mesma estrutura do modelo global.
-        new_parameters = {name: {'weight': torch.zeros_like(param['weight']), 'bias': torch.zeros_like(param['bias'])} 
-                          for name, param in self.global_parameters.items()}
-
-        # Agregação ponderada (média simples neste caso, assumindo datasets de tamanhos similares).
-        # Itera sobre os IDs dos clientes que enviaram parâmetros na rodada atual.
-        for client_id in self.round_client_parameters[self.current_round]:
-            client_params = self.round_client_parameters[self.current_round][client_id]
-            # Itera sobre as camadas (nome) e seus parâmetros.
-            for name in client_params:
-                # Soma os pesos de cada cliente e divide pelo número total de clientes (média).
-                new_parameters[name]['weight'] += client_params[name]['weight'] / self.num_clients
-                # Soma os bias de cada cliente e divide pelo número total de clientes (média).
-                new_parameters[name]['bias'] += client_params[name]['bias'] / self.num_clients
-        
-        # Aplica os parâmetros agregados à rede global do servidor.
-        self.global_net.apply_parameters(new_parameters)
-        # Atualiza a referência dos parâmetros globais do servidor.
-        self.global_parameters = new_parameters
+        with self.profiler.span("aggregate", clients=len(self.round_client_parameters[self.current_round]),
+                                aggregator=self.aggregator):
+            self._aggregate_parameters()
         print(f"Servidor: Parâmetros globais atualizados para a rodada {self.current_round}.")
 
+    def _aggregate_parameters(self):
+        if self.secure_aggregation:
+            # Remove as máscaras dos pares com quem saiu e decodifica a soma ponderada. Os pesos da rodada
+            # somam 1 entre todos os participantes; sem os que saíram, a soma é normalizada pelos restantes.
+            remove_masks(self.secure_sum, self.secure_revealed)
+            decode_fixed_point(self.secure_sum, self.secure_round['scale'], self.aggregated_flat.numpy())
+            weights = self.secure_round['weights']
+            self.aggregated_flat.div_(sum(weights[str(c)] for c in self.received_clients_in_round))
+        elif self.sharded is not None:
+            # As atualizações já foram acumuladas pelos workers; resta esperá-los e normalizar.
+            self.sharded.result()
+        else:
+            # Peso de cada cliente: seu número de amostras de treino. Clientes que não enviaram
+            # parâmetros na rodada atual ficam com peso 0.
+            self.aggregation_weights.zero_()
+            for client_id, num_samples in self.round_sample_counts[self.current_round].items():
+                self.aggregation_weights[self.client_slots[client_id]] = num_samples
+            updates, weights = self.client_updates, self.aggregation_weights
+            # O FedAvg ignora linhas com peso 0 (é um único produto vetor-matriz sobre a matriz inteira);
+            # as regras robustas recebem apenas as linhas dos clientes da rodada.
+            rows = sorted(self.client_slots[client_id] for client_id in self.round_sample_counts[self.current_round])
+            aggregator, options = self.aggregator, self.aggregator_options
+            if len(rows) < self.min_round_updates:
+                # Saídas deixaram a rodada com menos atualizações do que a regra exige: usa a mediana, que aceita
+                # qualquer número de linhas, em vez de falhar dentro do callback do MQTT.
+                print(f"Servidor: Rodada {self.current_round} com {len(rows)} atualizações; '{aggregator}' exige "
+                      f"{self.min_round_updates}. Usando a mediana.")
+                aggregator, options = "median", {}
+            if aggregator != "fedavg" and len(rows) < updates.shape[0]:
+                index = torch.tensor(rows)
+                updates, weights = updates.index_select(0, index), weights.index_select(0, index)
+            aggregate(aggregator, updates, weights, self.aggregated_flat, **options)
+
+        self.add_privacy_noise()
+        # Aplica os parâmetros agregados à rede global do servidor (uma única cópia).
+        self.global_net.load_shared(self.aggregated_flat)
+
+    # DP-FedAvg: soma ao modelo agregado (no lugar, sobre o buffer plano) ruído gaussiano calibrado ao
+    # número de atualizações da rodada e contabiliza a rodada no acumulador de privacidade.
+    def add_privacy_noise(self):
+        if self.dp_accountant is None:
+            return
+        std = noise_std(self.dp_noise_multiplier, self.dp_clip_norm, len(self.received_clients_in_round))
+        if std > 0:
+            torch.randn(self.num_parameters, out=self.dp_noise)
+            self.aggregated_flat.add_(self.dp_noise, alpha=std)
+        # A seleção dos participantes é determinística (select_participants), não uma amostragem aleatória:
+        # não há amplificação por subamostragem, então cada rodada é contabilizada com q = 1.
+        self.dp_accountant.step(1.0)
+        self.dp_epsilon = self.dp_accountant.epsilon(self.dp_delta)
+
+    # Serializa o modelo global atual uma única vez; a mesma mensagem é publicada para todos os clientes
+    # que precisam do modelo completo.
+    # Com o broadcast quantizado, o modelo enviado é o reconstruído pelos clientes ('broadcast_flat'):
+    # a cada rodada ele avança pelo delta quantizado (modelo global - broadcast_flat), de modo que o erro
+    # de quantização de uma rodada é compensado na seguinte em vez de se acumular, e a cada
+    # 'keyframe_interval' rodadas volta a ser exatamente o modelo global.
+    def encode_global_parameters(self):
+        with self.profiler.span("encode_global"):
+            flat = self.global_net.export_shared()
+            base_version = self.global_version
+            quantized = None
+            if self.broadcast_flat is not None:
+                quantized = self.quantize_broadcast(flat)
+                flat = memoryview(self.broadcast_flat).cast('B')
+            self.global_version = model_version(flat)
+            self.global_sent_at = time.time()
+            self.global_payload = encode_parameters(flat, **self.round_header())
+            self.broadcast_delta = None
+            if quantized is not None:
+                delta_payload = encode_q8_delta(*quantized, self.quantization_block_size, base_version,
+                                                **self.round_header())
+                self.broadcast_delta = (base_version, delta_payload)
+        self.remember_global_version(flat)
+        return self.global_payload
+
+    # Campos do cabeçalho comuns a todas as mensagens do modelo da rodada (completo, delta ou nada).
+    # A atribuição de trabalho local de todos os participantes vai no cabeçalho, de modo que a mesma
+    # mensagem continua servindo a todos os clientes; cada um lê a própria entrada.
+    def round_header(self):
+        header = {'round': self.current_round, 'version': self.global_version, 'sent_at': self.global_sent_at}
+        if self.round_schedule:
+            header['local_steps'] = self.round_schedule
+        if self.secure_round is not None:
+            header['secure_aggregation'] = self.secure_round
+        if self.dp_clip_norm is not None:
+            header['clip_norm'] = self.dp_clip_norm
+        return header
+
+    # Atribui a cada participante o número de passos de treino local (batches) que ele executa em
+    # 'target_round_time' segundos, a partir da vazão medida (amostras/s, média móvel no registro) e do
+    # tamanho de batch anunciado. Clientes ainda sem medição (ex.: na primeira rodada) treinam suas
+    # épocas padrão e passam a ser escalonados na rodada seguinte.
+    def schedule_local_work(self, participants):
+        self.round_schedule = {}
+        if self.target_round_time is None:
+            return
+        for client_id in participants:
+            info = self.registry.get(client_id)
+            if info is None or not info.samples_per_s or not info.capabilities.get('batch_size'):
+                continue
+            batch_size = info.capabilities['batch_size']
+            steps = max(self.min_local_steps, int(info.samples_per_s * self.target_round_time / batch_size))
+            if self.max_local_epochs is not None and info.capabilities.get('num_samples'):
+                steps_per_epoch = -(-info.capabilities['num_samples'] // batch_size)
+                steps = min(steps, self.max_local_epochs * steps_per_epoch)
+            self.round_schedule[str(client_id)] = steps
+        if self.round_schedule:
+            print(f"Servidor: Passos locais da rodada {self.current_round}: {self.round_schedule}")
+
+    # Agregação segura: zera a soma da rodada e define os dados que vão no cabeçalho: a chave pública e o
+    # peso (fração das amostras da rodada, ver update_weight) de cada participante e a escala do ponto fixo.
+    def prepare_secure_round(self, participants):
+        self.secure_sum.fill(0)
+        self.secure_dropped = None
+        self.secure_revealed = {}
+        infos = {client_id: self.registry.get(client_id) for client_id in participants}
+        samples = {client_id: self.update_weight(info.capabilities) for client_id, info in infos.items()}
+        total = sum(samples.values())
+        self.secure_round = {'public_keys': {str(c): info.capabilities['secagg_public_key'] for c, info in infos.items()},
+                             'weights': {str(c): n / total for c, n in samples.items()}, 'scale': DEFAULT_SCALE}
+
+    # Avança o modelo de broadcast em direção ao modelo global 'flat'. Retorna o delta quantizado
+    # (valores int8, escalas) ou None em uma rodada de keyframe.
+    def quantize_broadcast(self, flat):
+        target = np.frombuffer(flat, dtype=np.float32)
+        if self.global_version is None or self.current_round % self.keyframe_interval == 0:
+            self.broadcast_flat[:] = target
+            return None
+        quantized, scales = quantize_q8(target - self.broadcast_flat, self.quantization_block_size)
+        dequantize_add_q8(quantized, scales, self.quantization_block_size, self.broadcast_flat)
+        return quantized, scales
+
+    # Guarda uma cópia do modelo enviado aos clientes (por padrão, o modelo global atual) no histórico de
+    # versões e descarta as mensagens da rodada anterior. Com o histórico cheio, o buffer da versão mais
+    # antiga é reaproveitado para a cópia (sem alocar um modelo novo por rodada).
+    def remember_global_version(self, flat=None):
+        if flat is None:
+            flat = self.global_net.export_shared()
+        values = np.frombuffer(flat, dtype=np.float32)
+        self.version_history.pop(self.global_version, None)
+        if len(self.version_history) >= self.version_history_size:
+            _, buffer = self.version_history.popitem(last=False)
+            buffer[:] = values
+        else:
+            buffer = values.copy()
+        self.version_history[self.global_version] = buffer
+        self.round_payloads = {}
+        self.round_bytes_sent = {}
+
+    # Escolhe os participantes da rodada, atribui o trabalho local de cada um e, com 'encode', serializa o
+    # modelo da rodada; então publica para cada participante o modelo (completo, delta ou nada, ver
+    # payload_for) no seu tópico exclusivo. Na agregação segura o cabeçalho lista os participantes, então
+    # a mensagem é sempre serializada de novo.
+    def publish_round(self, kind, encode=True):
+        participants = self.select_participants()
+        if encode or self.secure_aggregation:
+            self.schedule_local_work(participants)
+            if self.secure_aggregation:
+                self.prepare_secure_round(participants)
+            # Serializa os parâmetros globais para bytes para envio via MQTT.
+            self.encode_global_parameters()
+            if self.update_log is not None:
+                self.update_log.record_global(self.current_round, self.global_net.export_shared())
+        with self.profiler.span("distribute", clients=len(participants)):
+            for client_id in participants:
+                self.publish_global_parameters(client_id, kind)
+        return participants
+
     # Método para distribuir os parâmetros iniciais aos clientes no começo do treinamento.
     def distribute_initial_parameters(self):
-        # Serializa os parâmetros globais para bytes para envio via MQTT.
-        parameters_bytes = pickle.dumps(self.global_parameters)
-        # Loop para publicar os parâmetros para cada cliente.
-        for client_id in range(self.num_clients):
-            # Publica no tópico exclusivo de cada cliente.
-            self.client.publish(f"server/initial_parameters/{client_id}", parameters_bytes, qos=1)
-            print(f"Servidor: Parâmetros iniciais enviados para o cliente {client_id}")
+        participants = self.publish_round("initial_parameters")
+        print(f"Servidor: Parâmetros iniciais enviados para os clientes {participants}")
         # Reinicia o timer da rodada.
         self.round_start_time = time.time()
 
     # Método para distribuir os parâmetros globais atualizados aos clientes em cada nova rodada.
     def distribute_global_parameters(self):
-        # Serializa os parâmetros globais para bytes.
-        parameters_bytes = pickle.dumps(self.global_parameters)
-        # Loop para publicar os parâmetros para cada cliente.
-        for client_id in range(self.num_clients):
-            # Publica no tópico exclusivo de cada cliente.
-            self.client.publish(f"server/global_parameters/{client_id}", parameters_bytes, qos=1)
+        self.publish_round("global_parameters")
+
+    # Encerra os processos da agregação paralela e libera a memória compartilhada.
+    def close_aggregation(self):
+        if self.sharded is not None:
+            self.sharded.close()
+            self.sharded = None
 
     # Método para salvar o modelo global em um arquivo.
     def save_global_parameters(self):
-        # NOVO: Define o caminho de saída do arquivo na mesma pasta do script do servidor.
-        output_path = os.path.join(os.path.dirname(__file__), "global_parameters.pkl")
+        output_path = self.output_path
         # Abre o arquivo em modo binário de escrita.
         with open(output_path, 'wb') as f:
-            # Serializa e salva os parâmetros globais.
-            pickle.dump(self.global_parameters, f)
+            # Serializa e salva cópias independentes dos parâmetros globais
+            # (as views do buffer plano serializariam o buffer inteiro cada uma). No modo personalizado, só as
+            # camadas compartilhadas: as locais do servidor nunca são treinadas. A normalização das entradas
+            # usada no treino vai junto (ver evaluate_global_model.load_global_model).
+            parameters = {name: tensor.clone() for name, tensor in self.global_parameters.items()
+                          if not self.global_net.is_local(name)}
+            pickle.dump({'normalize': INPUT_NORMALIZATION, 'parameters': parameters}, f)
         print(f"Servidor: Parâmetros do modelo global final salvos em {output_path}")
 
     # Método para iniciar o servidor MQTT e seu loop de execução.
@@ -269,18 +971,22 @@ class Server:
             print(f"{'='*50}\n")
             
             # NOVO: Espera ativa pelos clientes sinalizarem que estão prontos.
-            while len(self.connected_clients) < self.num_clients:
+            while len(self.registry.online_ids()) < self.num_clients:
                 time.sleep(1) # Aguarda 1 segundo para evitar uso excessivo da CPU.
+                self.check_liveness()
             
             print(f"\n{'='*50}")
             print(f"Servidor: Todos os {self.num_clients} clientes estão prontos! Iniciando Rodada 0 de {self.num_rounds}.")
             print(f"{'='*50}\n")
             # Distribui os parâmetros iniciais para começar o treinamento.
-            self.distribute_initial_parameters()
+            with self.lock:
+                self.distribute_initial_parameters()
             
             # Loop principal do servidor que continua até que todas as rodadas sejam concluídas.
             while self.current_round < self.num_rounds:
                 time.sleep(1) # Mantém o servidor ativo aguardando as atualizações dos clientes.
+                # Detecta clientes que pararam de enviar heartbeats.
+                self.check_liveness()
                 
         # Captura qualquer exceção (incluindo KeyboardInterrupt) durante a execução do servidor.
         except Exception as e:
@@ -291,6 +997,10 @@ class Server:
             self.client.loop_stop()
             # Desconecta o cliente do broker MQTT.
             self.client.disconnect()
+            # Encerra os workers da agregação paralela.
+            self.close_aggregation()
+            if self.update_log is not None:
+                self.update_log.close()
             # Condicional para salvar o modelo em caso de interrupção.
             if self.current_round > 0 and self.current_round < self.num_rounds:
                 # Se o treinamento foi interrompido, mas já havia começado.
@@ -300,13 +1010,72 @@ class Server:
                 # Se o treinamento foi interrompido antes mesmo de iniciar a primeira rodada.
                 print("\nServidor: Interrupção detectada antes do início do treinamento. Modelo não salvo.")
 
-# Bloco executado apenas se o script for rodado diretamente.
-if __name__ == "__main__":
+# Ponto de entrada da linha de comando (python -m server.server ou fedavg-server).
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de aprendizado federado (FedAVG via MQTT).")
     # Define o número total de rodadas. Ajuste conforme a necessidade de acurácia.
-    num_rounds_server = 2 
+    parser.add_argument("--rounds", type=int, default=2, help="Número total de rodadas.")
     # Define o número de clientes que se conectarão ao servidor.
-    num_clients_server = 3 
+    parser.add_argument("--clients", type=int, default=3, help="Número de clientes prontos para iniciar o treinamento.")
+    # Participação elástica: capacidade por rodada e prazo dos heartbeats.
+    parser.add_argument("--max-clients", type=int, default=None, help="Máximo de participantes por rodada (padrão: --clients).")
+    parser.add_argument("--heartbeat-timeout", type=float, default=30.0, help="Segundos sem heartbeat até um cliente ser considerado desconectado.")
+    # Escalonamento do trabalho local pela vazão medida de cada cliente.
+    parser.add_argument("--target-round-time", type=float, default=None, help="Tempo alvo (segundos) do treino local de cada rodada.")
+    parser.add_argument("--min-local-steps", type=int, default=1, help="Mínimo de passos locais atribuídos (com --target-round-time).")
+    parser.add_argument("--max-local-epochs", type=int, default=None, help="Máximo de épocas locais atribuídas (com --target-round-time).")
+    parser.add_argument("--model", default="cnn", choices=available_models(), help="Modelo do registro a ser treinado.")
+    # Personalização: camadas mantidas nos clientes (os clientes precisam das mesmas --local-layers).
+    parser.add_argument("--local-layers", nargs="+", default=None, help="Camadas que não são agregadas (ex.: linear).")
+    parser.add_argument("--broker", default="localhost", help="Endereço do broker MQTT.")
+    parser.add_argument("--port", type=int, default=1883, help="Porta do broker MQTT.")
+    # Profiling opcional: traces Chrome por rodada, captura do torch.profiler e dumps do cProfile.
+    parser.add_argument("--profile-dir", default=None, help="Pasta para os traces de profiling por rodada.")
+    parser.add_argument("--torch-profile-round", type=int, default=None, help="Rodada capturada com torch.profiler.")
+    parser.add_argument("--cprofile", action="store_true", help="Grava um dump do cProfile por rodada.")
+    parser.add_argument("--trace-file", default=None, help="Arquivo JSON Lines com a linha do tempo e o caminho crítico de cada rodada.")
+    parser.add_argument("--aggregation-workers", type=int, default=0, help="Processos da agregação paralela por fatias (0 = na thread do MQTT).")
+    # Regras de agregação robustas a clientes com falhas ou maliciosos.
+    parser.add_argument("--aggregator", default="fedavg", choices=available_aggregators(), help="Regra de agregação.")
+    parser.add_argument("--trim-ratio", type=float, default=None, help="Fração aparada em cada extremo (trimmed_mean).")
+    parser.add_argument("--byzantine", type=int, default=None, help="Número de clientes maliciosos tolerados (krum).")
+    # Broadcast do modelo global por deltas quantizados (reduz o download dos clientes).
+    parser.add_argument("--broadcast-quantization", default=None, choices=["int8"], help="Envia deltas quantizados do modelo global.")
+    parser.add_argument("--keyframe-interval", type=int, default=10, help="Rodadas entre envios do modelo completo (com --broadcast-quantization).")
+    # Agregação segura: o servidor só obtém a soma das atualizações mascaradas dos clientes.
+    parser.add_argument("--secure-aggregation", action="store_true", help="Ativa a agregação segura (os clientes também precisam de --secure-aggregation).")
+    # Privacidade diferencial (DP-FedAvg): limite da norma dos deltas nos clientes e ruído no servidor.
+    parser.add_argument("--dp-clip-norm", type=float, default=None, help="Norma L2 máxima do delta de cada cliente.")
+    parser.add_argument("--dp-noise-multiplier", type=float, default=None, help="Ruído gaussiano (múltiplo de --dp-clip-norm) somado à média.")
+    parser.add_argument("--dp-delta", type=float, default=1e-5, help="Delta da garantia (epsilon, delta) reportada.")
+    parser.add_argument("--metrics-history", type=int, default=1000, help="Rodadas mantidas nas métricas em memória (as mais recentes).")
+    parser.add_argument("--memory-census", type=int, default=0, help="Conta os tensores vivos a cada N rodadas (0 = desativado).")
+    parser.add_argument("--update-log", default=None, help="Arquivo onde gravar as atualizações recebidas (reprodução com server.replay).")
+    args = parser.parse_args()
+
+    # Opções da regra de agregação (apenas as informadas).
+    aggregator_options = {}
+    if args.trim_ratio is not None:
+        aggregator_options['trim_ratio'] = args.trim_ratio
+    if args.byzantine is not None:
+        aggregator_options['byzantine'] = args.byzantine
 
     # Cria uma instância do Servidor e a inicia.
-    server_instance = Server(num_rounds=num_rounds_server, num_clients=num_clients_server)
+    server_instance = Server(num_rounds=args.rounds, num_clients=args.clients, broker_address=args.broker,
+                             broker_port=args.port, model_name=args.model, profile_dir=args.profile_dir,
+                             torch_profile_round=args.torch_profile_round, cprofile=args.cprofile,
+                             trace_path=args.trace_file, aggregation_workers=args.aggregation_workers,
+                             aggregator=args.aggregator, aggregator_options=aggregator_options,
+                             broadcast_quantization=args.broadcast_quantization,
+                             keyframe_interval=args.keyframe_interval, max_clients=args.max_clients,
+                             heartbeat_timeout=args.heartbeat_timeout, target_round_time=args.target_round_time,
+                             min_local_steps=args.min_local_steps, max_local_epochs=args.max_local_epochs,
+                             secure_aggregation=args.secure_aggregation, dp_clip_norm=args.dp_clip_norm,
+                             dp_noise_multiplier=args.dp_noise_multiplier, dp_delta=args.dp_delta,
+                             local_layers=args.local_layers, update_log=args.update_log,
+                             metrics_history=args.metrics_history, memory_census_interval=args.memory_census)
     server_instance.start()
+
+# Bloco executado apenas se o script for rodado diretamente.
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# tests/test_aggregation.py
+#
+# Regras de agregação robustas (common/aggregation.py), a validação das suas opções (min_updates) e a
+# substituição pela mediana no servidor quando uma rodada tem atualizações de menos. Precisam do PyTorch.
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from common.aggregation import aggregate, coordinate_median, krum_select, min_updates, multi_krum, trimmed_mean
+
+NUMEL = 1000
+
+# 'honest' atualizações próximas de um centro comum e, opcionalmente, uma distante (índice 0).
+def make_updates(honest, outlier=True, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    center = torch.randn(NUMEL, generator=generator)
+    rows = [center + 0.01 * torch.randn(NUMEL, generator=generator) for _ in range(honest)]
+    if outlier:
+        rows.insert(0, torch.full((NUMEL,), 1e6))
+    return torch.stack(rows), torch.ones(len(rows)), center
+
+@pytest.mark.parametrize("rule", [coordinate_median, lambda u, w, out: trimmed_mean(u, w, out, trim_ratio=0.2)])
+def test_median_and_trimmed_mean_ignore_outlier(rule):
+    updates, weights, center = make_updates(4)
+    out = torch.empty(NUMEL)
+    rule(updates, weights, out)
+    assert (out - center).abs().max() < 0.05
+
+def test_fedavg_is_pulled_by_outlier():
+    updates, weights, center = make_updates(4)
+    out = torch.empty(NUMEL)
+    aggregate('fedavg', updates, weights, out)
+    assert (out - center).abs().min() > 1e4
+
+def test_multi_krum_excludes_far_update():
+    updates, weights, center = make_updates(5)
+    selected = krum_select(updates, byzantine=1)
+    assert 0 not in selected.tolist() and len(selected) == updates.shape[0] - 1
+    out = torch.empty(NUMEL)
+    total = multi_krum(updates, weights.clone(), out, byzantine=1)
+    assert total == updates.shape[0] - 1
+    assert (out - center).abs().max() < 0.05
+
+def test_min_updates():
+    assert min_updates('fedavg') == 1
+    assert min_updates('median') == 1
+    assert min_updates('trimmed_mean', trim_ratio=0.49) == 1
+    assert min_updates('krum') == 3
+    assert min_updates('krum', byzantine=2) == 7
+
+@pytest.mark.parametrize("name,options", [('trimmed_mean', {'trim_ratio': 0.5}), ('trimmed_mean', {'trim_ratio': -0.1}),
+                                          ('krum', {'byzantine': -1})])
+def test_min_updates_rejects_invalid_options(name, options):
+    with pytest.raises(ValueError):
+        min_updates(name, **options)
+
+def test_rules_raise_below_min_updates():
+    updates, weights, _ = make_updates(2, outlier=False)
+    with pytest.raises(ValueError):
+        aggregate('krum', updates, weights, torch.empty(NUMEL))
+    with pytest.raises(ValueError):
+        aggregate('trimmed_mean', updates, weights, torch.empty(NUMEL), trim_ratio=0.5)
+
+# Servidor (sem conexão ao broker) com a regra e as opções dadas.
+def make_server(num_clients, aggregator, **options):
+    server_module = pytest.importorskip("server.server")
+    return server_module.Server(num_rounds=1, num_clients=num_clients, model_name='mlp', aggregator=aggregator,
+                                aggregator_options=options)
+
+@pytest.mark.parametrize("num_clients,aggregator,options", [(4, 'krum', {'byzantine': 1}), (2, 'krum', {}),
+                                                            (5, 'trimmed_mean', {'trim_ratio': 0.5})])
+def test_server_rejects_options_its_clients_cannot_satisfy(num_clients, aggregator, options):
+    with pytest.raises(ValueError):
+        make_server(num_clients, aggregator, **options)
+
+def test_server_falls_back_to_median_on_short_round():
+    server = make_server(5, 'krum', byzantine=1)
+    assert server.min_round_updates == 5
+    # Só dois dos cinco participantes enviaram a atualização (os outros saíram).
+    generator = torch.Generator().manual_seed(1)
+    rows = torch.randn(2, server.num_parameters, generator=generator)
+    for client_id, row in zip((3, 7), rows):
+        server.client_updates[server.client_slot(client_id)] = row
+        server.round_sample_counts[server.current_round][client_id] = 10
+    server._aggregate_parameters()
+    torch.testing.assert_close(server.aggregated_flat, rows.mean(dim=0))
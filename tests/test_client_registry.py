@@ -0,0 +1,91 @@
+# tests/test_client_registry.py
+#
+# Registro dinâmico dos clientes (common/client_registry.py): entrada, saída, "last will", expiração por
+# falta de heartbeat e o número de clientes online que o servidor espera. O relógio é injetado ('now').
+
+from common.client_registry import ClientRegistry
+
+TIMEOUT = 30.0
+
+def make_registry(num_clients=3, now=0.0):
+    registry = ClientRegistry(heartbeat_timeout=TIMEOUT)
+    for client_id in range(num_clients):
+        assert registry.join(client_id, {'cores': 2, 'num_samples': 100}, now=now)
+    return registry
+
+def test_join_counts_clients_online():
+    registry = make_registry(3)
+    assert registry.online_ids() == [0, 1, 2]
+    # Um segundo sinal de "pronto" do mesmo cliente não é uma nova entrada.
+    assert not registry.join(1, {'samples_per_s': 50.0}, now=1.0)
+    assert registry.online_ids() == [0, 1, 2]
+    assert registry.get(1).capabilities == {'cores': 2, 'num_samples': 100, 'samples_per_s': 50.0}
+    assert registry.get(1).samples_per_s == 50.0
+
+def test_server_waits_until_enough_clients_are_online():
+    # O servidor começa quando len(online_ids()) >= num_clients; saídas antes disso voltam a contar.
+    num_clients = 3
+    registry = make_registry(2)
+    assert len(registry.online_ids()) < num_clients
+    registry.leave(0)
+    registry.join(2, now=1.0)
+    assert len(registry.online_ids()) < num_clients
+    registry.join(0, now=2.0)
+    assert len(registry.online_ids()) == num_clients
+
+def test_heartbeat_expiry_after_timeout():
+    registry = make_registry(3)
+    assert registry.seen(0, now=20.0)
+    assert registry.seen(1, now=25.0)
+    # No limite exato do prazo, ninguém expira.
+    assert registry.expire(now=TIMEOUT) == []
+    assert registry.expire(now=TIMEOUT + 1) == [2]
+    assert registry.expire(now=20.0 + TIMEOUT + 1) == [0]
+    assert registry.online_ids() == [1]
+    # Um cliente expirado não expira de novo.
+    assert registry.expire(now=1000.0) == [1]
+    assert registry.expire(now=2000.0) == []
+    assert registry.online_ids() == []
+
+def test_heartbeat_of_expired_client_is_not_enough_to_return():
+    registry = make_registry(1)
+    assert registry.expire(now=TIMEOUT + 1) == [0]
+    # O servidor trata um heartbeat recusado (False) como um novo sinal de "pronto".
+    assert not registry.seen(0, now=TIMEOUT + 2)
+    assert not registry.is_online(0)
+    assert not registry.seen(7, now=TIMEOUT + 2)
+
+def test_rejoin_after_expiry():
+    registry = make_registry(2)
+    registry.record_throughput(0, 40.0)
+    assert registry.expire(now=TIMEOUT + 1) == [0, 1]
+    assert registry.join(0, {'cores': 4}, now=TIMEOUT + 5)
+    assert registry.online_ids() == [0]
+    info = registry.get(0)
+    assert info.last_seen == TIMEOUT + 5 and info.joined_at == 0.0
+    assert info.capabilities['cores'] == 4 and info.samples_per_s == 40.0
+    # O prazo volta a contar a partir do retorno.
+    assert registry.expire(now=TIMEOUT + 5 + TIMEOUT) == []
+    assert registry.expire(now=TIMEOUT + 6 + TIMEOUT) == [0]
+
+def test_last_will_removes_client_once():
+    registry = make_registry(3)
+    # Aviso explícito ou "last will" publicado pelo broker: o mesmo caminho (leave).
+    assert registry.leave(1)
+    assert not registry.leave(1)
+    assert not registry.leave(42)
+    assert registry.online_ids() == [0, 2]
+    assert not registry.seen(1, now=1.0)
+    # Quem saiu não é expirado de novo pelo laço de heartbeats.
+    assert registry.expire(now=TIMEOUT + 1) == [0, 2]
+
+def test_throughput_is_smoothed():
+    registry = ClientRegistry(heartbeat_timeout=TIMEOUT, throughput_smoothing=0.5)
+    registry.join(0, now=0.0)
+    assert registry.get(0).samples_per_s is None
+    registry.record_throughput(0, 100.0)
+    registry.record_throughput(0, 200.0)
+    registry.record_throughput(0, None)
+    assert registry.get(0).samples_per_s == 150.0
+    snapshot = registry.snapshot()
+    assert snapshot[0]['online'] and snapshot[0]['samples_per_s'] == 150.0
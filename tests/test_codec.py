@@ -0,0 +1,167 @@
+# tests/test_codec.py
+#
+# Codec das mensagens de parâmetros (common/codec.py): deltas XOR, deltas quantizados em int8 e
+# reconstrução do modelo global pelo destinatário a partir da versão que ele tem.
+
+import zlib
+
+import numpy as np
+import pytest
+
+from common.codec import (ENCODING_Q8_ZLIB, ENCODING_XOR_ZLIB, apply_delta, apply_xor_delta, decode_parameters,
+                          decode_q8_delta, dequantize_add_q8, encode_q8_delta, encode_xor_delta, model_version,
+                          quantize_q8)
+
+NUMEL = 4099
+
+def random_flat(seed, numel=NUMEL):
+    return np.random.default_rng(seed).standard_normal(numel).astype(np.float32)
+
+# Versão seguinte de 'base': poucos valores alterados, como entre duas rodadas.
+def next_version(base, seed=1):
+    current = base.copy()
+    rng = np.random.default_rng(seed)
+    index = rng.choice(base.size, base.size // 10, replace=False)
+    current[index] += rng.standard_normal(index.size).astype(np.float32) * 0.01
+    return current
+
+def xor_message(current, base):
+    return encode_xor_delta(current, base, model_version(base), version=model_version(current), round=3)
+
+def test_xor_delta_round_trip_is_bit_exact():
+    base = random_flat(0)
+    current = next_version(base)
+    header, body = decode_parameters(xor_message(current, base))
+    assert header['encoding'] == ENCODING_XOR_ZLIB
+    assert header['numel'] == NUMEL and header['base_version'] == model_version(base) and header['round'] == 3
+    target = base.copy()
+    apply_xor_delta(body, target)
+    np.testing.assert_array_equal(target.view(np.uint32), current.view(np.uint32))
+
+def test_xor_delta_preserves_special_values():
+    base = random_flat(2, 8)
+    current = np.array([np.nan, np.inf, -np.inf, -0.0, 0.0, 1e-45, -3.4e38, 1.0], dtype=np.float32)
+    _, body = decode_parameters(xor_message(current, base))
+    np.testing.assert_array_equal(apply_xor_delta(body, base.copy()).view(np.uint32), current.view(np.uint32))
+
+def test_xor_delta_of_unchanged_model_compresses_to_zeros():
+    base = random_flat(3)
+    _, body = decode_parameters(xor_message(base, base))
+    assert len(body) < base.nbytes // 100
+    assert not np.frombuffer(zlib.decompress(body), dtype=np.uint32).any()
+
+def test_xor_delta_rejects_size_mismatch():
+    base = random_flat(4)
+    with pytest.raises(ValueError):
+        encode_xor_delta(base, base[:-1], model_version(base[:-1]))
+    _, body = decode_parameters(xor_message(next_version(base), base))
+    with pytest.raises(ValueError):
+        apply_xor_delta(body, np.zeros(NUMEL + 1, dtype=np.float32))
+
+def test_apply_delta_replaces_model_only_on_matching_version():
+    base = random_flat(5)
+    current = next_version(base)
+    header, body = decode_parameters(xor_message(current, base))
+    held, out = base.copy(), np.empty_like(base)
+    assert apply_delta(header, body, held, out)
+    np.testing.assert_array_equal(out, current)
+    np.testing.assert_array_equal(held, base)
+
+def test_version_mismatch_leaves_base_intact_and_requires_full_model():
+    # O destinatário anuncia a mesma versão base, mas o seu modelo divergiu: o delta produz um modelo cujo
+    # hash não confere, e o modelo que ele tem não pode ser alterado (ele passa a pedir o modelo completo).
+    base = random_flat(6)
+    current = next_version(base)
+    header, body = decode_parameters(xor_message(current, base))
+    held = base.copy()
+    held[0] += 1.0
+    snapshot, out = held.copy(), np.empty_like(held)
+    assert not apply_delta(header, body, held, out)
+    np.testing.assert_array_equal(held, snapshot)
+
+def test_corrupted_delta_raises_without_touching_base():
+    base = random_flat(7)
+    header, body = decode_parameters(xor_message(next_version(base), base))
+    held, out = base.copy(), np.empty_like(base)
+    with pytest.raises(zlib.error):
+        apply_delta(header, bytes(body)[:len(body) // 2], held, out)
+    np.testing.assert_array_equal(held, base)
+
+def test_apply_delta_rejects_full_messages():
+    base = random_flat(8)
+    with pytest.raises(ValueError):
+        apply_delta({'encoding': 'full'}, base.tobytes(), base, np.empty_like(base))
+
+# Delta quantizado que leva 'base' a 'current', como o servidor o envia, e o modelo que o destinatário obtém.
+def q8_message(current, base, block_size):
+    quantized, scales = quantize_q8(current - base, block_size)
+    rebuilt = dequantize_add_q8(quantized, scales, block_size, base.copy())
+    payload = encode_q8_delta(quantized, scales, block_size, model_version(base), version=model_version(rebuilt))
+    return payload, rebuilt
+
+# Erro máximo do arredondamento em cada bloco: meia escala (máximo absoluto do bloco / 254).
+def q8_error_bound(delta, block_size):
+    padded = np.zeros(-(-delta.size // block_size) * block_size, dtype=np.float32)
+    padded[:delta.size] = np.abs(delta)
+    bound = padded.reshape(-1, block_size).max(axis=1) / 254
+    return np.repeat(bound * (1 + 1e-5) + 1e-12, block_size)[:delta.size]
+
+@pytest.mark.parametrize("block_size", [64, 4096])
+def test_q8_round_trip_error_within_half_step(block_size):
+    base = random_flat(10)
+    delta = random_flat(11) * np.float32(0.05)
+    # Blocos com magnitudes bem diferentes: cada um tem a sua escala.
+    delta[:block_size] *= 100
+    payload, rebuilt = q8_message(base + delta, base, block_size)
+    header, body = decode_parameters(payload)
+    assert header['encoding'] == ENCODING_Q8_ZLIB and header['block_size'] == block_size
+    quantized, scales = decode_q8_delta(header, body)
+    assert quantized.dtype == np.int8 and np.abs(quantized.astype(np.int16)).max() <= 127
+    assert scales.size == -(-NUMEL // block_size)
+    error = np.abs(dequantize_add_q8(quantized, scales, block_size, np.zeros(NUMEL, dtype=np.float32)) - delta)
+    assert np.all(error <= q8_error_bound(delta, block_size))
+
+    # O destinatário reconstrói exatamente o modelo do servidor (a versão confere).
+    out = np.empty_like(base)
+    assert apply_delta(header, body, base, out)
+    np.testing.assert_array_equal(out, rebuilt)
+
+def test_q8_final_block_smaller_than_block_size():
+    block_size = 1000
+    numel = 2 * block_size + 7
+    base = random_flat(12, numel)
+    delta = random_flat(13, numel)
+    # O último bloco (7 valores) tem a maior magnitude: a sua escala não pode vir do preenchimento.
+    delta[-7:] = [5.0, -4.0, 3.0, -2.0, 1.0, 0.5, -5.0]
+    payload, rebuilt = q8_message(base + delta, base, block_size)
+    header, body = decode_parameters(payload)
+    quantized, scales = decode_q8_delta(header, body)
+    assert quantized.size == numel and scales.size == 3
+    assert scales[-1] == pytest.approx(5.0 / 127)
+    np.testing.assert_array_equal(quantized[-7:], np.rint(delta[-7:] / scales[-1]).astype(np.int8))
+    assert np.all(np.abs(rebuilt - base - delta) <= q8_error_bound(delta, block_size))
+    # Um corpo truncado não corresponde ao número de valores do cabeçalho.
+    with pytest.raises(ValueError):
+        decode_q8_delta(header, zlib.compress(zlib.decompress(body)[:-1]))
+
+def test_q8_all_zero_blocks():
+    block_size = 128
+    base = random_flat(14, 4 * block_size)
+    delta = np.zeros_like(base)
+    delta[block_size:2 * block_size] = random_flat(15, block_size)
+    quantized, scales = quantize_q8(delta, block_size)
+    # Blocos sem alteração têm escala 0 e valores 0 (sem divisão por zero nem NaN).
+    np.testing.assert_array_equal(scales[[0, 2, 3]], 0)
+    assert not quantized[:block_size].any() and not quantized[2 * block_size:].any()
+    rebuilt = dequantize_add_q8(quantized, scales, block_size, base.copy())
+    assert np.all(np.isfinite(rebuilt))
+    np.testing.assert_array_equal(rebuilt[:block_size], base[:block_size])
+    np.testing.assert_array_equal(rebuilt[2 * block_size:], base[2 * block_size:])
+
+    # Um delta todo nulo mantém o modelo (e a versão) do destinatário.
+    payload, rebuilt = q8_message(base, base, block_size)
+    header, body = decode_parameters(payload)
+    out = np.empty_like(base)
+    assert apply_delta(header, body, base, out)
+    assert header['version'] == model_version(base)
+    np.testing.assert_array_equal(out, base)
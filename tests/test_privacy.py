@@ -0,0 +1,81 @@
+# tests/test_privacy.py
+#
+# Privacidade diferencial (common/privacy.py): limite de norma dos deltas, RDP do mecanismo gaussiano
+# subamostrado e conversão do RDP acumulado em epsilon.
+
+import math
+
+import numpy as np
+import pytest
+
+from common.privacy import (DEFAULT_ORDERS, RDPAccountant, clip_update, noise_std, rdp_sampled_gaussian,
+                            rdp_to_epsilon)
+
+DELTA = 1e-5
+
+def test_clip_update_scales_large_delta_to_clip_norm():
+    rng = np.random.default_rng(0)
+    reference = rng.standard_normal(1000).astype(np.float32)
+    delta = rng.standard_normal(1000).astype(np.float32)
+    flat = reference + delta
+    out = np.empty_like(flat)
+    norm = clip_update(flat, reference, 1.0, out)
+    assert norm == pytest.approx(np.linalg.norm(delta), rel=1e-5)
+    clipped = out - reference
+    assert np.linalg.norm(clipped) == pytest.approx(1.0, rel=1e-4)
+    # A direção do delta é preservada.
+    np.testing.assert_allclose(clipped, delta / np.linalg.norm(delta), atol=1e-5)
+
+def test_clip_update_keeps_small_delta():
+    rng = np.random.default_rng(1)
+    reference = rng.standard_normal(100).astype(np.float32)
+    flat = reference + np.float32(0.01)
+    out = np.empty_like(flat)
+    norm = clip_update(flat, reference, 1.0, out)
+    assert norm <= 1.0
+    np.testing.assert_array_equal(out, flat)
+
+def test_noise_std_is_sensitivity_of_the_mean():
+    assert noise_std(1.1, 2.0, 4) == pytest.approx(1.1 * 2.0 / 4)
+    assert noise_std(1.1, 2.0, 0) == pytest.approx(1.1 * 2.0)
+
+@pytest.mark.parametrize("order", [2, 8, 32, 256])
+@pytest.mark.parametrize("sigma", [0.5, 1.0, 4.0])
+def test_rdp_without_subsampling_is_gaussian_mechanism(order, sigma):
+    assert rdp_sampled_gaussian(1.0, sigma, order) == pytest.approx(order / (2 * sigma ** 2))
+
+def test_rdp_subsampling_amplifies_privacy():
+    for order in (2, 16, 64):
+        full = rdp_sampled_gaussian(1.0, 1.0, order)
+        assert rdp_sampled_gaussian(0.1, 1.0, order) < rdp_sampled_gaussian(0.5, 1.0, order) < full
+        # A expansão binomial converge para o mecanismo sem subamostragem quando q -> 1.
+        assert rdp_sampled_gaussian(1 - 1e-9, 1.0, order) == pytest.approx(full, rel=1e-4)
+    assert rdp_sampled_gaussian(0.0, 1.0, 8) == 0.0
+    assert rdp_sampled_gaussian(0.5, 0.0, 8) == math.inf
+
+def test_rdp_to_epsilon_uses_best_order():
+    rdp = [rdp_sampled_gaussian(1.0, 2.0, order) for order in DEFAULT_ORDERS]
+    epsilon, order = rdp_to_epsilon(rdp, DEFAULT_ORDERS, DELTA)
+    assert order in DEFAULT_ORDERS
+    for value, other in zip(rdp, DEFAULT_ORDERS):
+        bound = value + math.log1p(-1 / other) - (math.log(DELTA) + math.log(other)) / (other - 1)
+        assert epsilon <= max(0.0, bound) + 1e-12
+
+def accumulated_epsilon(sigma, rounds, q=1.0):
+    accountant = RDPAccountant(sigma)
+    for _ in range(rounds):
+        accountant.step(q)
+    assert accountant.rounds == rounds
+    return accountant.epsilon(DELTA)
+
+def test_epsilon_grows_with_rounds():
+    epsilons = [accumulated_epsilon(1.0, rounds) for rounds in (1, 10, 100)]
+    assert 0 < epsilons[0] < epsilons[1] < epsilons[2]
+
+def test_epsilon_falls_with_noise_multiplier():
+    epsilons = [accumulated_epsilon(sigma, 10) for sigma in (0.8, 1.5, 4.0)]
+    assert epsilons[0] > epsilons[1] > epsilons[2]
+
+def test_epsilon_with_deterministic_selection_exceeds_subsampled():
+    # Contabilizar com q = 1 (seleção determinística) nunca subestima o custo de privacidade.
+    assert accumulated_epsilon(1.0, 10, q=1.0) > accumulated_epsilon(1.0, 10, q=0.2)
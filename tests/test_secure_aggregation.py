@@ -0,0 +1,117 @@
+# tests/test_secure_aggregation.py
+#
+# Rodadas completas do protocolo de máscaras pareadas (common/secure_aggregation.py), sem servidor nem
+# broker: cada cliente mascara o seu modelo, a "soma do servidor" é a soma uint32 das linhas recebidas e
+# as máscaras de quem saiu são removidas com as sementes reveladas pelos sobreviventes.
+
+import numpy as np
+import pytest
+
+from common.secure_aggregation import (DEFAULT_SCALE, FIXED_POINT_LIMIT, PairwiseMasker, decode_fixed_point,
+                                       encode_fixed_point, mask_from_seed, remove_masks)
+
+NUMEL = 1000
+ROUND = 7
+
+# Modelos planos (float32) e pesos (somam 1) de 'num_clients' clientes.
+def make_round(num_clients, seed=0):
+    rng = np.random.default_rng(seed)
+    flats = [rng.standard_normal(NUMEL).astype(np.float32) for _ in range(num_clients)]
+    weights = rng.random(num_clients) + 0.5
+    return flats, weights / weights.sum()
+
+# Atualizações mascaradas de todos os clientes ({ID: uint32}) e os mascaradores (para revelar sementes).
+def mask_all(flats, weights, round_num=ROUND):
+    maskers = {i: PairwiseMasker(i) for i in range(len(flats))}
+    public_keys = {str(i): m.public_key_hex for i, m in maskers.items()}
+    # mask() reutiliza o buffer entre rodadas: cada linha é copiada, como o cliente faz ao publicar.
+    masked = {i: m.mask(flats[i].tobytes(), weights[i], DEFAULT_SCALE, public_keys, round_num).copy()
+              for i, m in maskers.items()}
+    return masked, maskers
+
+# Soma módulo 2^32 das atualizações recebidas.
+def server_sum(masked, received):
+    return np.sum([masked[i] for i in received], axis=0, dtype=np.uint32)
+
+def decode(total):
+    return decode_fixed_point(total, DEFAULT_SCALE, np.empty(total.size, dtype=np.float32))
+
+# Tolerância do ponto fixo: meia unidade de arredondamento por cliente.
+def tolerance(num_clients):
+    return num_clients * 0.5 / DEFAULT_SCALE + 1e-6
+
+def test_full_round_masks_cancel():
+    flats, weights = make_round(4)
+    masked, _ = mask_all(flats, weights)
+    expected = sum(w * f for w, f in zip(weights, flats))
+    np.testing.assert_allclose(decode(server_sum(masked, range(4))), expected, rtol=0, atol=tolerance(4))
+    # Uma atualização isolada não revela o modelo do cliente.
+    plain = encode_fixed_point(flats[0], weights[0], DEFAULT_SCALE, np.empty(NUMEL, dtype=np.uint32))
+    assert np.count_nonzero(masked[0] == plain) < NUMEL // 100
+
+def test_dropped_client_recovered_from_revealed_seeds():
+    flats, weights = make_round(4, seed=1)
+    masked, maskers = mask_all(flats, weights)
+    survivors, dropped = [0, 1, 3], 2
+    total = server_sum(masked, survivors)
+    # Sem as sementes, as máscaras dos pares com o cliente 2 ficam na soma.
+    expected = sum(weights[i] * flats[i] for i in survivors)
+    assert np.abs(decode(total.copy()) - expected).max() > 1.0
+
+    revealed = {}
+    for survivor in survivors:
+        seeds = maskers[survivor].reveal(ROUND, [dropped])
+        assert list(seeds) == [str(dropped)]
+        revealed[survivor] = {dropped: bytes.fromhex(seeds[str(dropped)])}
+    remove_masks(total, revealed)
+    np.testing.assert_allclose(decode(total), expected, rtol=0, atol=tolerance(3))
+
+def test_round_unrecoverable_when_survivor_does_not_reveal():
+    flats, weights = make_round(4, seed=2)
+    masked, maskers = mask_all(flats, weights)
+    survivors, dropped = [0, 1, 3], 2
+    total = server_sum(masked, survivors)
+    # O sobrevivente 3 sai durante o desmascaramento: a máscara do par (2, 3) não pode ser removida.
+    revealed = {s: {dropped: bytes.fromhex(maskers[s].reveal(ROUND, [dropped])[str(dropped)])} for s in (0, 1)}
+    remove_masks(total, revealed)
+    expected = sum(weights[i] * flats[i] for i in survivors)
+    assert np.abs(decode(total) - expected).max() > 1.0
+
+def test_single_survivor_unmasking_exposes_its_update():
+    # Motivo do mínimo de dois sobreviventes no servidor: com um só, remover as máscaras revela o modelo
+    # ponderado do próprio cliente.
+    flats, weights = make_round(2, seed=3)
+    masked, maskers = mask_all(flats, weights)
+    total = server_sum(masked, [0])
+    remove_masks(total, {0: {1: bytes.fromhex(maskers[0].reveal(ROUND, [1])['1'])}})
+    np.testing.assert_allclose(decode(total), weights[0] * flats[0], rtol=0, atol=tolerance(1))
+
+def test_reveal_only_for_last_masked_round():
+    flats, weights = make_round(3, seed=4)
+    _, maskers = mask_all(flats, weights)
+    assert maskers[0].reveal(ROUND - 1, [2]) == {}
+    assert maskers[0].reveal(ROUND, [0]) == {}
+
+def test_fixed_point_wraps_around_uint32():
+    # Valores negativos viram complemento de dois, e a soma com máscaras transborda o uint32 várias vezes
+    # sem alterar o resultado decodificado.
+    values = np.array([-1.5, -0.25, 0.0, 0.75, 511.0, -511.0], dtype=np.float32)
+    encoded = encode_fixed_point(values, 1.0, DEFAULT_SCALE, np.empty(values.size, dtype=np.uint32))
+    assert encoded[0] > np.uint32(1 << 31)
+    np.testing.assert_array_equal(decode(encoded.copy()), values)
+
+    mask = mask_from_seed(b'\x01' * 32, values.size)
+    wrapped = encoded + mask
+    assert np.any(wrapped < encoded)
+    np.testing.assert_array_equal(decode(wrapped - mask), values)
+
+def test_fixed_point_clips_out_of_range_values():
+    limit = FIXED_POINT_LIMIT / DEFAULT_SCALE
+    values = np.array([4 * limit, -4 * limit], dtype=np.float32)
+    decoded = decode(encode_fixed_point(values, 1.0, DEFAULT_SCALE, np.empty(2, dtype=np.uint32)))
+    np.testing.assert_allclose(decoded, [limit, -limit])
+
+@pytest.mark.parametrize("numel", [1, 2, 3])
+def test_mask_length_matches_model(numel):
+    # A máscara usa 64 bits por chamada do gerador; tamanhos ímpares são cortados.
+    assert mask_from_seed(b'\x02' * 32, numel).shape == (numel,)
@@ -0,0 +1,93 @@
+# tests/test_update_log.py
+#
+# Registro das atualizações do servidor (common/update_log.py): escrita e leitura com mmap, agrupamento em
+# rodadas e recuperação de um arquivo cortado no meio de um registro.
+
+import os
+
+import numpy as np
+import pytest
+
+from common.update_log import LOG_MAGIC, UpdateLogReader, UpdateLogWriter
+
+NUM_ROUNDS = 3
+CLIENTS = 4
+
+def flat(seed, numel=257):
+    return np.random.default_rng(seed).standard_normal(numel).astype(np.float32)
+
+# Grava NUM_ROUNDS rodadas com CLIENTS atualizações cada e o modelo final; retorna o que foi gravado, na
+# ordem ([(cabeçalho esperado, corpo)]), e a posição do arquivo onde começa o último registro.
+def write_log(path):
+    written = []
+    writer = UpdateLogWriter(path)
+    for round_num in range(NUM_ROUNDS + 1):
+        body = flat(round_num).tobytes()
+        last_start = writer.file.tell()
+        writer.record_global(round_num, body, version=f"v{round_num}")
+        written.append(({'kind': 'global', 'round': round_num, 'version': f"v{round_num}"}, body))
+        if round_num == NUM_ROUNDS:
+            break
+        for client_id in range(CLIENTS):
+            # Corpos de tamanhos diferentes, como mensagens MQTT com cabeçalhos diferentes.
+            body = bytes(range(256)) * (client_id + 1) + flat(100 * round_num + client_id).tobytes()
+            meta = {'round': round_num, 'client_id': client_id, 'recv_at': 1000.0 + client_id, 'weight': 10 * (client_id + 1)}
+            writer.record_update(round_num, client_id, body, meta['recv_at'], meta['weight'])
+            written.append((dict(meta, kind='update'), body))
+    writer.close()
+    assert writer.records == len(written)
+    return written, last_start
+
+def read_records(path):
+    with UpdateLogReader(path) as reader:
+        return [(meta, bytes(body)) for meta, body in reader]
+
+def test_round_trip_returns_identical_headers_and_bytes(tmp_path):
+    path = tmp_path / "updates.log"
+    written, _ = write_log(path)
+    records = read_records(path)
+    assert len(records) == len(written)
+    for (meta, body), (expected, expected_body) in zip(records, written):
+        assert body == expected_body
+        assert meta.pop('body_bytes') == len(expected_body)
+        assert meta == expected
+
+def test_rounds_group_updates_with_global_models(tmp_path):
+    path = tmp_path / "updates.log"
+    write_log(path)
+    with UpdateLogReader(path) as reader:
+        rounds = [(r.round_num, bytes(r.global_flat), [(m['client_id'], m['weight']) for m, _ in r.updates],
+                   bytes(r.next_global_flat)) for r in reader.rounds()]
+    assert [r[0] for r in rounds] == list(range(NUM_ROUNDS))
+    for round_num, global_flat, updates, next_global_flat in rounds:
+        assert global_flat == flat(round_num).tobytes()
+        assert updates == [(c, 10 * (c + 1)) for c in range(CLIENTS)]
+        assert next_global_flat == flat(round_num + 1).tobytes()
+
+@pytest.mark.parametrize("cut", ["length", "header", "body"])
+def test_truncated_tail_returns_complete_prefix(tmp_path, cut):
+    path = tmp_path / "updates.log"
+    written, last_start = write_log(path)
+    # O último registro é o modelo final, [4 bytes][cabeçalho][corpo]: o arquivo é cortado no meio de cada parte.
+    offsets = {'length': last_start + 2, 'header': last_start + 4 + 5,
+               'body': os.path.getsize(path) - len(written[-1][1]) // 2}
+    with open(path, 'r+b') as f:
+        f.truncate(offsets[cut])
+    records = read_records(path)
+    assert [bytes(body) for _, body in records] == [body for _, body in written[:-1]]
+
+    # A última rodada completa continua disponível (sem o modelo resultante).
+    with UpdateLogReader(path) as reader:
+        rounds = list(reader.rounds())
+        assert rounds[-1].round_num == NUM_ROUNDS - 1 and rounds[-1].next_global_flat is None
+        assert len(rounds[-1].updates) == CLIENTS
+
+def test_rejects_files_that_are_not_logs(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b'x' * (len(LOG_MAGIC) + 10))
+    with pytest.raises(ValueError):
+        UpdateLogReader(path)
+    empty = tmp_path / "empty.log"
+    empty.write_bytes(LOG_MAGIC)
+    with pytest.raises(ValueError):
+        UpdateLogReader(empty)